@@ -7,12 +7,14 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.database import Base
-from app.models import room, booking, user, history
-from app.config import settings
+from app.database import Base, SQLALCHEMY_DATABASE_URL
+from app.models import room, booking, user, history, daily_stats, notification_outbox
 
 config = context.config
-config.set_main_option('sqlalchemy.url', settings.database_url)
+# Тот же URL, что и у приложения (postgres:// уже заменён на postgresql://),
+# если вызывающий код (например, тест миграций) не передал свой
+if not config.get_main_option('sqlalchemy.url'):
+    config.set_main_option('sqlalchemy.url', SQLALCHEMY_DATABASE_URL)
 
 target_metadata = Base.metadata
 
@@ -0,0 +1,92 @@
+"""Baseline schema: tables that existed before migrations were introduced
+
+Revision ID: 0000_baseline_schema
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0000_baseline_schema"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Базы, созданные через create_all, уже имеют эти таблицы — их не трогаем.
+    # Колонки и индексы, появившиеся позже, добавляют следующие миграции
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("rooms"):
+        op.create_table(
+            "rooms",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("room_number", sa.String(), nullable=True),
+            sa.Column("room_type", sa.String(), nullable=False),
+            sa.Column("capacity", sa.Integer(), nullable=False),
+            sa.Column("price_per_night", sa.Float(), nullable=True),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("amenities", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_rooms_id", "rooms", ["id"])
+        op.create_index("ix_rooms_room_number", "rooms", ["room_number"], unique=True)
+
+    if not inspector.has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("telegram_id", sa.Integer(), nullable=True),
+            sa.Column("first_name", sa.String(), nullable=True),
+            sa.Column("last_name", sa.String(), nullable=True),
+            sa.Column("username", sa.String(), nullable=True),
+            sa.Column("phone", sa.String(), nullable=True),
+            sa.Column("email", sa.String(), nullable=True),
+            sa.Column(
+                "role",
+                sa.Enum("SUPER_ADMIN", "ADMIN", "MANAGER", "OPERATOR", "USER", name="userrole"),
+                nullable=True
+            ),
+            sa.Column("is_admin", sa.Boolean(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
+
+    if not inspector.has_table("bookings"):
+        op.create_table(
+            "bookings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id"), nullable=True),
+            sa.Column("start_date", sa.Date(), nullable=False),
+            sa.Column("end_date", sa.Date(), nullable=False),
+            sa.Column("guest_name", sa.String(), nullable=True),
+            sa.Column("notes", sa.String(), nullable=True),
+            sa.Column("created_by", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_bookings_id", "bookings", ["id"])
+
+    if not inspector.has_table("history_logs"):
+        op.create_table(
+            "history_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+            sa.Column("entity_type", sa.String(), nullable=False),
+            sa.Column("entity_id", sa.Integer(), nullable=False),
+            sa.Column("action", sa.String(), nullable=False),
+            sa.Column("changes", sa.JSON(), nullable=True),
+            sa.Column("description", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_history_logs_id", "history_logs", ["id"])
+
+
+def downgrade():
+    for table in ("history_logs", "bookings", "users", "rooms"):
+        op.drop_table(table)
@@ -0,0 +1,33 @@
+"""Composite indexes for booking and history hot paths
+
+Revision ID: 0001_booking_history_indexes
+Revises: 0000_baseline_schema
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0001_booking_history_indexes"
+down_revision = "0000_baseline_schema"
+branch_labels = None
+depends_on = None
+
+# Те же индексы, что в __table_args__ моделей Booking и HistoryLog.
+# if_not_exists: базы, созданные через create_all, уже могут их иметь.
+INDEXES = [
+    ("ix_bookings_room_dates", "bookings", ["room_id", "start_date", "end_date"]),
+    ("ix_bookings_dates", "bookings", ["start_date", "end_date"]),
+    ("ix_bookings_created_at", "bookings", ["created_at"]),
+    ("ix_history_logs_entity", "history_logs", ["entity_type", "entity_id", "created_at"]),
+    ("ix_history_logs_user_created_at", "history_logs", ["user_id", "created_at"]),
+    ("ix_history_logs_created_at", "history_logs", ["created_at"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,39 @@
+"""Notification outbox table
+
+Revision ID: 0002_notification_outbox
+Revises: 0001_booking_history_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_notification_outbox"
+down_revision = "0001_booking_history_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблицу уже мог создать create_all при старте приложения
+    if not sa.inspect(op.get_bind()).has_table("notification_outbox"):
+        op.create_table(
+            "notification_outbox",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("event", sa.String(), nullable=False),
+            sa.Column("chat_id", sa.Integer(), nullable=False),
+            sa.Column("text", sa.Text(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+            sa.Column("last_error", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("sent_at", sa.DateTime(), nullable=True),
+        )
+    op.create_index("ix_notification_outbox_id", "notification_outbox", ["id"], if_not_exists=True)
+    op.create_index(
+        "ix_notification_outbox_due", "notification_outbox", ["status", "next_attempt_at"], if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table("notification_outbox")
@@ -0,0 +1,24 @@
+"""Notification preferences of users
+
+Revision ID: 0003_user_notification_preferences
+Revises: 0002_notification_outbox
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_user_notification_preferences"
+down_revision = "0002_notification_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}
+    if "notification_preferences" not in columns:
+        op.add_column("users", sa.Column("notification_preferences", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("notification_preferences")
@@ -0,0 +1,28 @@
+"""Deduplication key of notification outbox messages
+
+Revision ID: 0004_notification_outbox_dedup_key
+Revises: 0003_user_notification_preferences
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_notification_outbox_dedup_key"
+down_revision = "0003_user_notification_preferences"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("notification_outbox")}
+    if "dedup_key" not in columns:
+        op.add_column("notification_outbox", sa.Column("dedup_key", sa.String(), nullable=True))
+    op.create_index(
+        "ux_notification_outbox_dedup_key", "notification_outbox", ["dedup_key"], unique=True, if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index("ux_notification_outbox_dedup_key", table_name="notification_outbox")
+    with op.batch_alter_table("notification_outbox") as batch_op:
+        batch_op.drop_column("dedup_key")
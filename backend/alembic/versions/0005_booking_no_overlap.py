@@ -0,0 +1,39 @@
+"""Exclusion constraint against overlapping bookings of a room (PostgreSQL)
+
+Revision ID: 0005_booking_no_overlap
+Revises: 0004_notification_outbox_dedup_key
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_booking_no_overlap"
+down_revision = "0004_notification_outbox_dedup_key"
+branch_labels = None
+depends_on = None
+
+# То же имя, что BOOKING_NO_OVERLAP_CONSTRAINT в app/models/booking.py
+CONSTRAINT = "bookings_no_overlap"
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    exists = bind.execute(
+        sa.text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {"name": CONSTRAINT}
+    ).first()
+    if not exists:
+        # daterange по умолчанию полуоткрытый [start, end), как и проверка в BookingService.
+        # Если в таблице уже есть пересекающиеся брони, миграция упадёт: их нужно развести вручную
+        op.execute(
+            f"ALTER TABLE bookings ADD CONSTRAINT {CONSTRAINT} "
+            "EXCLUDE USING gist (room_id WITH =, daterange(start_date, end_date) WITH &&)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(f"ALTER TABLE bookings DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
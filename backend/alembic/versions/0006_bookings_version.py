@@ -0,0 +1,31 @@
+"""Version counter of the bookings table
+
+Revision ID: 0006_bookings_version
+Revises: 0005_booking_no_overlap
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_bookings_version"
+down_revision = "0005_booking_no_overlap"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблицу уже мог создать create_all при старте приложения
+    if not sa.inspect(op.get_bind()).has_table("bookings_version"):
+        op.create_table(
+            "bookings_version",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+        )
+    op.execute(
+        "INSERT INTO bookings_version (id, version) "
+        "SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM bookings_version WHERE id = 1)"
+    )
+
+
+def downgrade():
+    op.drop_table("bookings_version")
@@ -0,0 +1,31 @@
+"""Daily occupancy and revenue rollup
+
+Revision ID: 0007_daily_room_stats
+Revises: 0006_bookings_version
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_daily_room_stats"
+down_revision = "0006_bookings_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Таблицу уже мог создать create_all; заполняет её python -m app.rebuild_daily_stats
+    if not sa.inspect(op.get_bind()).has_table("daily_room_stats"):
+        op.create_table(
+            "daily_room_stats",
+            sa.Column("date", sa.Date(), primary_key=True),
+            sa.Column("room_id", sa.Integer(), sa.ForeignKey("rooms.id"), primary_key=True),
+            sa.Column("occupied", sa.Integer(), nullable=False),
+            sa.Column("revenue", sa.Float(), nullable=False),
+            sa.Column("check_ins", sa.Integer(), nullable=False),
+            sa.Column("check_outs", sa.Integer(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("daily_room_stats")
@@ -0,0 +1,21 @@
+"""Drop unused ix_bookings_updated_at
+
+Revision ID: 0008_drop_bookings_updated_at_index
+Revises: 0007_daily_room_stats
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0008_drop_bookings_updated_at_index"
+down_revision = "0007_daily_room_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Индекс создавали прежняя 0001 и create_all; ни один запрос по updated_at не фильтрует
+    op.drop_index("ix_bookings_updated_at", table_name="bookings", if_exists=True)
+
+
+def downgrade():
+    op.create_index("ix_bookings_updated_at", "bookings", ["updated_at"], if_not_exists=True)
@@ -0,0 +1,31 @@
+"""Nightly price stored on bookings
+
+Revision ID: 0009_booking_price_per_night
+Revises: 0008_drop_bookings_updated_at_index
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009_booking_price_per_night"
+down_revision = "0008_drop_bookings_updated_at_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("bookings")}
+    if "price_per_night" not in columns:
+        op.add_column("bookings", sa.Column("price_per_night", sa.Float(), nullable=True))
+    # Существующие брони получают текущую цену комнаты. Если цены менялись,
+    # после миграции пересчитайте rollup: python -m app.rebuild_daily_stats
+    op.execute(
+        "UPDATE bookings SET price_per_night = "
+        "(SELECT rooms.price_per_night FROM rooms WHERE rooms.id = bookings.room_id) "
+        "WHERE price_per_night IS NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("bookings") as batch_op:
+        batch_op.drop_column("price_per_night")
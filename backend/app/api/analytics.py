@@ -4,11 +4,30 @@ from typing import Optional
 from datetime import date, datetime
 from ..database import get_db
 from ..services.analytics_service import AnalyticsService
+from ..services.dashboard_cache import dashboard_cache
+from ..utils.concurrency import run_sync
 from ..utils.dependencies import require_admin
 
 router = APIRouter()
 
 
+@router.get("/dashboard")
+async def get_dashboard_stats(
+        db: Session = Depends(get_db),
+        current_user=Depends(require_admin)
+):
+    """Get dashboard statistics (cached until the next booking change)"""
+    return await run_sync(dashboard_cache.get_stats, db)
+
+
+@router.get("/dashboard/cache")
+async def get_dashboard_cache_stats(
+        current_user=Depends(require_admin)
+):
+    """Dashboard cache hit/miss counters"""
+    return dashboard_cache.counters()
+
+
 @router.get("/occupancy")
 async def get_occupancy_stats(
         start_date: Optional[date] = Query(None),
@@ -17,7 +36,7 @@ async def get_occupancy_stats(
         current_user=Depends(require_admin)
 ):
     """Get occupancy statistics"""
-    return AnalyticsService.get_occupancy_stats(db, start_date, end_date)
+    return await run_sync(AnalyticsService.get_occupancy_stats, db, start_date, end_date)
 
 
 @router.get("/room-types")
@@ -28,7 +47,7 @@ async def get_room_type_stats(
         current_user=Depends(require_admin)
 ):
     """Get statistics by room type"""
-    return AnalyticsService.get_room_type_stats(db, start_date, end_date)
+    return await run_sync(AnalyticsService.get_room_type_stats, db, start_date, end_date)
 
 
 @router.get("/trends")
@@ -38,7 +57,7 @@ async def get_booking_trends(
         current_user=Depends(require_admin)
 ):
     """Get booking trends"""
-    return AnalyticsService.get_booking_trends(db, months)
+    return await run_sync(AnalyticsService.get_booking_trends, db, months)
 
 
 @router.get("/users")
@@ -47,7 +66,7 @@ async def get_user_activity_stats(
         current_user=Depends(require_admin)
 ):
     """Get user activity statistics"""
-    return AnalyticsService.get_user_activity_stats(db)
+    return await run_sync(AnalyticsService.get_user_activity_stats, db)
 
 
 @router.get("/revenue-forecast")
@@ -69,4 +88,4 @@ async def get_revenue_forecast(
         "Prezident apartamenti (8 kishi uchun)": 3000000
     }
 
-    return AnalyticsService.get_revenue_forecast(db, room_prices, days_ahead)
\ No newline at end of file
+    return await run_sync(AnalyticsService.get_revenue_forecast, db, room_prices, days_ahead)
\ No newline at end of file
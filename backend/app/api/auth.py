@@ -10,6 +10,9 @@ from datetime import timedelta
 from ..database import get_db
 from ..models.user import User, UserRole
 from ..config.settings import get_settings
+from ..services.auth_cache import auth_cache
+from ..services.recipient_registry import recipient_registry
+from ..utils.concurrency import run_sync
 from ..utils.dependencies import create_access_token
 from ..schemas.user import TelegramAuthData
 
@@ -49,16 +52,8 @@ def verify_telegram_auth(init_data: str) -> dict:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid authentication data")
 
 
-@router.post("/telegram", response_model=dict)
-async def telegram_auth(auth_data: TelegramAuthData, db: Session = Depends(get_db)):
-    """Финальная версия аутентификации."""
-
-    user_data = verify_telegram_auth(auth_data.initData)
-    telegram_id = user_data.get("id")
-
-    if not telegram_id:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user data from Telegram")
-
+def _sync_telegram_user(db: Session, telegram_id: int, user_data: dict) -> User:
+    """Находит или создаёт пользователя Telegram и обновляет его данные"""
     user = db.query(User).filter(User.telegram_id == telegram_id).first()
 
     if not user:
@@ -85,6 +80,24 @@ async def telegram_auth(auth_data: TelegramAuthData, db: Session = Depends(get_d
     user.first_name = user_data.get("first_name", user.first_name)
     user.last_name = user_data.get("last_name", user.last_name)
     db.commit()
+    return user
+
+
+@router.post("/telegram", response_model=dict)
+async def telegram_auth(auth_data: TelegramAuthData, db: Session = Depends(get_db)):
+    """Финальная версия аутентификации."""
+
+    user_data = verify_telegram_auth(auth_data.initData)
+    telegram_id = user_data.get("id")
+
+    if not telegram_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user data from Telegram")
+
+    user = await run_sync(_sync_telegram_user, db, telegram_id, user_data)
+    # Вход снова активирует пользователя и обновляет имя — старый снимок в кэше не годится
+    auth_cache.invalidate(user.id)
+    if user.is_admin:
+        recipient_registry.invalidate()
 
     # Создаем токен доступа
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import date
 
@@ -7,14 +7,46 @@ from ..database import get_db
 from ..schemas.booking import Booking, BookingCreate, BookingUpdate
 from ..models.booking import Booking as BookingModel
 from ..models.room import Room
-from ..services.booking_service import BookingService
+from ..services.booking_service import BookingService, BookingConflictError
 from ..services.history_service import HistoryService
 from ..services.notification_service import notification_service
+from ..services.notification_outbox import notification_outbox
 from ..websocket.manager import manager
-from ..utils.dependencies import get_current_user, require_admin
+from ..utils.concurrency import run_sync
+from ..models.user import Permission
+from ..utils.dependencies import (
+    get_current_user, require_admin, require_permission, require_booking_permission
+)
 
 router = APIRouter()
 
+# Создание — по маске роли из models/user.py; менять и удалять бронь
+# может администратор (is_admin) или её создатель
+can_create_booking = require_permission(Permission.CREATE_BOOKING)
+editable_booking = require_booking_permission("update")
+deletable_booking = require_booking_permission("delete")
+
+
+def _get_booking_with_room(db: Session, booking_id: int) -> Optional[BookingModel]:
+    """Бронь вместе с комнатой: room сериализуется в ответе уже в event loop"""
+    return db.query(BookingModel).options(
+        selectinload(BookingModel.room)
+    ).filter(BookingModel.id == booking_id).first()
+
+
+def _log_created(db: Session, user_id: int, room: Room, booking: BookingCreate):
+    """История создания брони: пишется в транзакции самой брони, когда уже известен её id"""
+    def log(new_booking: BookingModel):
+        HistoryService.log_action(
+            db=db,
+            user_id=user_id,
+            entity_type="booking",
+            entity_id=new_booking.id,
+            action="create",
+            description=f"Created booking for room №{room.room_number} from {booking.start_date} to {booking.end_date}"
+        )
+    return log
+
 
 @router.get("/", response_model=List[Booking])
 async def get_bookings(
@@ -27,19 +59,22 @@ async def get_bookings(
         current_user=Depends(get_current_user)
 ):
     """Get all bookings with optional filters"""
-    query = db.query(BookingModel)
+    def list_bookings():
+        # room входит в ответ — грузим все комнаты одним запросом, а не по одной на бронь
+        query = db.query(BookingModel).options(selectinload(BookingModel.room))
 
-    if room_id:
-        query = query.filter(BookingModel.room_id == room_id)
+        if room_id:
+            query = query.filter(BookingModel.room_id == room_id)
 
-    if start_date:
-        query = query.filter(BookingModel.end_date >= start_date)
+        if start_date:
+            query = query.filter(BookingModel.end_date >= start_date)
 
-    if end_date:
-        query = query.filter(BookingModel.start_date <= end_date)
+        if end_date:
+            query = query.filter(BookingModel.start_date <= end_date)
 
-    bookings = query.order_by(BookingModel.start_date).offset(skip).limit(limit).all()
-    return bookings
+        return query.order_by(BookingModel.start_date).offset(skip).limit(limit).all()
+
+    return await run_sync(list_bookings)
 
 
 @router.get("/{booking_id}", response_model=Booking)
@@ -49,7 +84,7 @@ async def get_booking(
         current_user=Depends(get_current_user)
 ):
     """Get specific booking by ID"""
-    booking = BookingService.get_booking(db, booking_id)
+    booking = await run_sync(_get_booking_with_room, db, booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     return booking
@@ -59,159 +94,157 @@ async def get_booking(
 async def create_booking(
         booking: BookingCreate,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(can_create_booking)
 ):
     """Create new booking"""
-    # Check if room exists
-    room = db.query(Room).filter(Room.id == booking.room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-
-    # Check availability
-    if not BookingService.check_availability(db, booking.room_id, booking.start_date, booking.end_date):
-        raise HTTPException(status_code=400, detail="Room is not available for selected dates")
-
-    # Create booking
-    new_booking = BookingService.create_booking(db, booking, current_user.id)
-
-    # Log history
-    HistoryService.log_action(
-        db=db,
-        user_id=current_user.id,
-        entity_type="booking",
-        entity_id=new_booking.id,
-        action="create",
-        description=f"Created booking for room №{room.room_number} from {booking.start_date} to {booking.end_date}"
-    )
+    def create():
+        # Check if room exists
+        room = db.query(Room).filter(Room.id == booking.room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+
+        # Уведомление попадёт в outbox в той же транзакции, что и бронь
+        notification_service.enqueue_booking_created(db, booking, room, current_user)
+
+        # Create booking (availability is enforced atomically inside the service)
+        try:
+            new_booking = BookingService.create_booking(
+                db, booking, current_user.id, before_commit=_log_created(db, current_user.id, room, booking)
+            )
+        except BookingConflictError:
+            raise HTTPException(status_code=400, detail="Room is not available for selected dates")
+        return room, new_booking
 
-    # Send notification
-    await notification_service.send_booking_created(db, new_booking, room, current_user)
+    room, new_booking = await run_sync(create)
+
+    # Notification is delivered by the outbox worker
+    notification_outbox.wake()
 
     # Broadcast via WebSocket
     await manager.broadcast_booking_update(new_booking.id, "create", {
         "room_id": room.id,
         "start_date": str(booking.start_date),
         "end_date": str(booking.end_date)
-    })
+    }, room_id=room.id, periods=[(booking.start_date, booking.end_date)])
 
     return new_booking
 
 
 # Общая функция для обновления бронирования
 async def _update_booking_handler(
-        booking_id: int,
+        booking: BookingModel,
         booking_update: BookingUpdate,
         db: Session,
         current_user
 ):
-    """Common handler for updating booking"""
-    booking = BookingService.get_booking(db, booking_id)
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-
-    # Check if user can update (admin or creator)
-    if not current_user.is_admin and booking.created_by != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to update this booking")
-
-    # Store old values for history
-    old_values = {
-        "start_date": str(booking.start_date),
-        "end_date": str(booking.end_date),
-        "guest_name": booking.guest_name,
-        "notes": booking.notes
-    }
-
-    # If dates are being updated, check availability
-    if booking_update.start_date or booking_update.end_date:
-        start = booking_update.start_date or booking.start_date
-        end = booking_update.end_date or booking.end_date
-
-        if not BookingService.check_availability(db, booking.room_id, start, end, exclude_booking_id=booking_id):
+    """Common handler for updating booking (access is checked by editable_booking)"""
+    booking_id = booking.id
+
+    def update():
+        # Store old values for history
+        old_values = {
+            "start_date": str(booking.start_date),
+            "end_date": str(booking.end_date),
+            "guest_name": booking.guest_name,
+            "notes": booking.notes
+        }
+
+        # Log history (committed together with the update, discarded on conflict)
+        new_values = {}
+        for key, value in update_dict.items():
+            new_values[key] = str(value) if value is not None else None
+
+        HistoryService.log_action(
+            db=db,
+            user_id=current_user.id,
+            entity_type="booking",
+            entity_id=booking_id,
+            action="update",
+            changes={"old": old_values, "new": new_values},
+            description=f"Updated booking for room №{booking.room.room_number}"
+        )
+
+        # Update booking (if dates change, availability is enforced atomically inside the service)
+        try:
+            updated_booking = BookingService.update_booking(db, booking_id, booking_update)
+        except BookingConflictError:
             raise HTTPException(status_code=400, detail="Room is not available for selected dates")
+        return updated_booking
 
-    # Update booking
-    updated_booking = BookingService.update_booking(db, booking_id, booking_update)
-
-    # Log history
-    new_values = {}
     update_dict = booking_update.dict(exclude_unset=True)
-    for key, value in update_dict.items():
-        new_values[key] = str(value) if value is not None else None
-
-    HistoryService.log_action(
-        db=db,
-        user_id=current_user.id,
-        entity_type="booking",
-        entity_id=booking_id,
-        action="update",
-        changes={"old": old_values, "new": new_values},
-        description=f"Updated booking for room №{booking.room.room_number}"
-    )
+    old_period = (booking.start_date, booking.end_date)
+    updated_booking = await run_sync(update)
 
     # Broadcast via WebSocket
-    await manager.broadcast_booking_update(booking_id, "update", update_dict)
+    await manager.broadcast_booking_update(
+        booking_id, "update", update_dict,
+        room_id=updated_booking.room_id,
+        periods=[old_period, (updated_booking.start_date, updated_booking.end_date)]
+    )
 
     return updated_booking
 
 
 @router.patch("/{booking_id}", response_model=Booking)
 async def update_booking_patch(
-        booking_id: int,
         booking_update: BookingUpdate,
+        booking: BookingModel = Depends(editable_booking),
         db: Session = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
     """Update booking using PATCH method"""
-    return await _update_booking_handler(booking_id, booking_update, db, current_user)
+    return await _update_booking_handler(booking, booking_update, db, current_user)
 
 
 @router.put("/{booking_id}", response_model=Booking)
 async def update_booking_put(
-        booking_id: int,
         booking_update: BookingUpdate,
+        booking: BookingModel = Depends(editable_booking),
         db: Session = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
     """Update booking using PUT method"""
-    return await _update_booking_handler(booking_id, booking_update, db, current_user)
+    return await _update_booking_handler(booking, booking_update, db, current_user)
 
 
 @router.delete("/{booking_id}")
 async def delete_booking(
-        booking_id: int,
+        booking: BookingModel = Depends(deletable_booking),
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)  # Изменено: теперь не требует админа
+        current_user=Depends(get_current_user)
 ):
-    """Delete booking"""
-    booking = BookingService.get_booking(db, booking_id)
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
+    """Delete booking (access is checked by deletable_booking)"""
+    booking_id = booking.id
 
-    # Проверяем права: админ может удалять любые брони, обычный пользователь - только свои
-    if not current_user.is_admin and booking.created_by != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this booking")
+    def delete():
+        room = booking.room
 
-    room = booking.room
+        # Log history (committed together with the deletion)
+        HistoryService.log_action(
+            db=db,
+            user_id=current_user.id,
+            entity_type="booking",
+            entity_id=booking_id,
+            action="delete",
+            description=f"Deleted booking for room №{room.room_number} from {booking.start_date} to {booking.end_date}"
+        )
 
-    # Log history before deletion
-    HistoryService.log_action(
-        db=db,
-        user_id=current_user.id,
-        entity_type="booking",
-        entity_id=booking_id,
-        action="delete",
-        description=f"Deleted booking for room №{room.room_number} from {booking.start_date} to {booking.end_date}"
-    )
+        # Delete booking (notification is committed together with the deletion)
+        notification_service.enqueue_booking_cancelled(db, booking, room, current_user)
+        if not BookingService.delete_booking(db, booking_id):
+            raise HTTPException(status_code=404, detail="Booking not found")
+        return room
 
-    # Delete booking
-    if not BookingService.delete_booking(db, booking_id):
-        raise HTTPException(status_code=404, detail="Booking not found")
+    room = await run_sync(delete)
 
-    # Send notification
-    await notification_service.send_booking_cancelled(db, booking, room, current_user)
+    # Notification is delivered by the outbox worker
+    notification_outbox.wake()
 
     # Broadcast via WebSocket
-    await manager.broadcast_booking_update(booking_id, "delete", {"room_id": room.id})
+    await manager.broadcast_booking_update(
+        booking_id, "delete", {"room_id": room.id},
+        room_id=room.id, periods=[(booking.start_date, booking.end_date)]
+    )
 
     return {"message": "Booking deleted successfully"}
 
@@ -226,8 +259,8 @@ async def check_availability(
         current_user=Depends(get_current_user)
 ):
     """Check if room is available for given dates"""
-    is_available = BookingService.check_availability(
-        db, room_id, start_date, end_date, exclude_booking_id
+    is_available = await run_sync(
+        BookingService.check_availability, db, room_id, start_date, end_date, exclude_booking_id
     )
 
     return {
@@ -244,52 +277,43 @@ async def check_availability(
 async def create_booking_v2(
         booking: BookingCreate,
         db: Session = Depends(get_db),
-        current_user=Depends(get_current_user)
+        current_user=Depends(can_create_booking)
 ):
     """
     Create new booking with improved logic for room availability.
     This endpoint ensures that only the specific room being booked is checked.
     """
-    # Check if room exists
-    room = db.query(Room).filter(Room.id == booking.room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-
-    # КРИТИЧЕСКИ ВАЖНО: Проверяем доступность ТОЛЬКО для указанной комнаты
-    # Не должны проверять другие комнаты!
-    if not BookingService.check_availability(db, booking.room_id, booking.start_date, booking.end_date):
-        # Получаем конфликтующие бронирования для более детального сообщения
-        conflicts = db.query(BookingModel).filter(
-            BookingModel.room_id == booking.room_id,  # ТОЛЬКО эта комната
-            BookingModel.start_date <= booking.end_date,
-            BookingModel.end_date >= booking.start_date
-        ).all()
-
-        conflict_details = []
-        for conflict in conflicts:
-            conflict_details.append(f"{conflict.start_date} - {conflict.end_date}")
-
-        error_message = f"Room №{room.room_number} is not available for selected dates. "
-        if conflict_details:
-            error_message += f"Conflicts with existing bookings: {', '.join(conflict_details)}"
-
-        raise HTTPException(status_code=400, detail=error_message)
-
-    # Create booking
-    new_booking = BookingService.create_booking(db, booking, current_user.id)
-
-    # Log history
-    HistoryService.log_action(
-        db=db,
-        user_id=current_user.id,
-        entity_type="booking",
-        entity_id=new_booking.id,
-        action="create",
-        description=f"Created booking for room №{room.room_number} from {booking.start_date} to {booking.end_date}"
-    )
-
-    # Send notification
-    await notification_service.send_booking_created(db, new_booking, room, current_user)
+    def create():
+        # Check if room exists
+        room = db.query(Room).filter(Room.id == booking.room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+
+        # КРИТИЧЕСКИ ВАЖНО: Проверяем доступность ТОЛЬКО для указанной комнаты
+        # Не должны проверять другие комнаты! Проверка и вставка атомарны в сервисе.
+        # Уведомление попадёт в outbox в той же транзакции, что и бронь.
+        notification_service.enqueue_booking_created(db, booking, room, current_user)
+        try:
+            new_booking = BookingService.create_booking(
+                db, booking, current_user.id, before_commit=_log_created(db, current_user.id, room, booking)
+            )
+        except BookingConflictError as e:
+            # Конфликтующие бронирования для более детального сообщения
+            conflict_details = []
+            for conflict in e.conflicts:
+                conflict_details.append(f"{conflict.start_date} - {conflict.end_date}")
+
+            error_message = f"Room №{room.room_number} is not available for selected dates. "
+            if conflict_details:
+                error_message += f"Conflicts with existing bookings: {', '.join(conflict_details)}"
+
+            raise HTTPException(status_code=400, detail=error_message)
+        return room, new_booking
+
+    room, new_booking = await run_sync(create)
+
+    # Notification is delivered by the outbox worker
+    notification_outbox.wake()
 
     # Broadcast via WebSocket
     await manager.broadcast_booking_update(new_booking.id, "create", {
@@ -297,6 +321,6 @@ async def create_booking_v2(
         "room_number": room.room_number,
         "start_date": str(booking.start_date),
         "end_date": str(booking.end_date)
-    })
+    }, room_id=room.id, periods=[(booking.start_date, booking.end_date)])
 
     return new_booking
\ No newline at end of file
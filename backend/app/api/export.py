@@ -1,32 +1,53 @@
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import date, datetime
 from typing import Optional
 import io
 from ..database import get_db
-from ..services.export_service import ExportService
+from ..services.export_service import (
+    ExportService, ExportFormat, MEDIA_TYPES,
+    BOOKING_COLUMNS, ROOM_COLUMNS, OCCUPANCY_COLUMNS
+)
+from ..services.export_jobs import export_jobs
+from ..schemas.export import ExportJob, ExportJobCreate
+from ..utils.concurrency import run_sync
 from ..utils.dependencies import get_current_user
 
 router = APIRouter()
 
 
+def _export_response(content, export_format: ExportFormat, filename: str) -> StreamingResponse:
+    # Синхронные генераторы StreamingResponse итерирует в пуле потоков,
+    # так что построение файла не блокирует event loop
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}.{export_format.value}"
+        }
+    )
+
+
+def _check_format(export_format: ExportFormat):
+    if export_format == ExportFormat.parquet and not ExportService.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+
+
 @router.get("/rooms")
 async def export_rooms(
+        format: ExportFormat = Query(ExportFormat.xlsx),
         db: Session = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
-    """Export all rooms to Excel"""
-    excel_data = ExportService.export_rooms_to_excel(db)
+    """Export all rooms (xlsx, csv, jsonl or parquet)"""
+    _check_format(format)
+    filename = f"xonalar_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-    filename = f"xonalar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-    return StreamingResponse(
-        io.BytesIO(excel_data),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+    return _export_response(
+        ExportService.stream(format, "Xonalar", ROOM_COLUMNS, ExportService.iter_room_rows(db)),
+        format,
+        filename
     )
 
 
@@ -34,20 +55,20 @@ async def export_rooms(
 async def export_bookings(
         start_date: Optional[date] = Query(None),
         end_date: Optional[date] = Query(None),
+        format: ExportFormat = Query(ExportFormat.xlsx),
         db: Session = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
-    """Export bookings to Excel"""
-    excel_data = ExportService.export_bookings_to_excel(db, start_date, end_date)
-
-    filename = f"bronlar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    """Export bookings (streamed, constant memory; xlsx, csv, jsonl or parquet)"""
+    _check_format(format)
+    filename = f"bronlar_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-    return StreamingResponse(
-        io.BytesIO(excel_data),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+    return _export_response(
+        ExportService.stream(
+            format, "Bronlar", BOOKING_COLUMNS, ExportService.iter_booking_rows(db, start_date, end_date)
+        ),
+        format,
+        filename
     )
 
 
@@ -55,18 +76,77 @@ async def export_bookings(
 async def export_analytics(
         start_date: date = Query(...),
         end_date: date = Query(...),
+        format: ExportFormat = Query(ExportFormat.xlsx),
         db: Session = Depends(get_db),
         current_user=Depends(get_current_user)
 ):
-    """Export analytics report to Excel"""
-    excel_data = ExportService.export_analytics_to_excel(db, start_date, end_date)
+    """
+    Export analytics report.
+    xlsx — полный отчёт из нескольких листов, остальные форматы — дневная занятость.
+    """
+    _check_format(format)
+    filename = f"hisobot_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}"
 
-    filename = f"hisobot_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.xlsx"
+    if format == ExportFormat.xlsx:
+        excel_data = await run_sync(ExportService.export_analytics_to_excel, db, start_date, end_date)
+        return _export_response(io.BytesIO(excel_data), format, filename)
 
-    return StreamingResponse(
-        io.BytesIO(excel_data),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
-    )
\ No newline at end of file
+    return _export_response(
+        ExportService.stream(
+            format, "Bandlik", OCCUPANCY_COLUMNS, ExportService.iter_occupancy_rows(db, start_date, end_date)
+        ),
+        format,
+        filename
+    )
+
+
+def _get_own_job(job_id: str, current_user) -> dict:
+    job = export_jobs.get(job_id)
+    if not job or (job["user_id"] != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post("/jobs", response_model=ExportJob)
+async def create_export_job(
+        job: ExportJobCreate,
+        current_user=Depends(get_current_user)
+):
+    """Queue a background export; poll GET /jobs/{id} and download when done"""
+    export_format = ExportFormat(job.format)
+    _check_format(export_format)
+    if job.kind == "analytics" and not (job.start_date and job.end_date):
+        raise HTTPException(status_code=400, detail="start_date and end_date are required for analytics")
+
+    params = {
+        "start_date": job.start_date.isoformat() if job.start_date else None,
+        "end_date": job.end_date.isoformat() if job.end_date else None
+    }
+    return export_jobs.submit(job.kind, export_format, params, current_user.id)
+
+
+@router.get("/jobs/{job_id}", response_model=ExportJob)
+async def get_export_job(
+        job_id: str,
+        current_user=Depends(get_current_user)
+):
+    """Export job status and progress"""
+    return _get_own_job(job_id, current_user)
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export_job(
+        job_id: str,
+        current_user=Depends(get_current_user)
+):
+    """Download a finished export file"""
+    job = _get_own_job(job_id, current_user)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Export job is {job['status']}")
+
+    export_format = ExportFormat(job["format"])
+    return FileResponse(
+        export_jobs.file_path(job),
+        media_type=MEDIA_TYPES[export_format],
+        filename=f"{job['kind']}_{job['id'][:8]}.{export_format.value}"
+    )
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from ..database import get_db
 from ..services.history_service import HistoryService
+from ..utils.concurrency import run_sync
 from ..utils.dependencies import get_current_user
 
 router = APIRouter()
@@ -16,7 +17,7 @@ async def get_entity_history(
     current_user = Depends(get_current_user)
 ):
     """Get history for a specific entity"""
-    history = HistoryService.get_entity_history(db, entity_type, entity_id, limit)
+    history = await run_sync(HistoryService.get_entity_history, db, entity_type, entity_id, limit)
     return history
 
 @router.get("/user/{user_id}")
@@ -27,7 +28,7 @@ async def get_user_history(
     current_user = Depends(get_current_user)
 ):
     """Get history of actions by a user"""
-    history = HistoryService.get_user_history(db, user_id, limit)
+    history = await run_sync(HistoryService.get_user_history, db, user_id, limit)
     return history
 
 @router.get("/recent")
@@ -38,5 +39,5 @@ async def get_recent_history(
     current_user = Depends(get_current_user)
 ):
     """Get recent history"""
-    history = HistoryService.get_recent_history(db, hours, limit)
+    history = await run_sync(HistoryService.get_recent_history, db, hours, limit)
     return history
\ No newline at end of file
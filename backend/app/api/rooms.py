@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import date
 
 from ..database import get_db
 from ..services.room_service import RoomService
-from ..schemas.room import Room as RoomSchema  # Убедитесь, что у вас есть Pydantic-схема Room
+from ..schemas.room import Room as RoomSchema, AvailableRoom  # Убедитесь, что у вас есть Pydantic-схема Room
+from ..utils.concurrency import run_sync
 from ..utils.dependencies import get_current_user
-from ..models.user import User  # Импортируем модель User для current_user
+from ..services.auth_cache import UserPrincipal  # Пользователь из get_current_user
 
 # Создаем роутер
 router = APIRouter()
@@ -20,7 +22,7 @@ async def get_all_rooms(
         status: Optional[str] = None,
         db: Session = Depends(get_db),
         # Защищаем эндпоинт. Без валидного токена сюда попасть нельзя.
-        current_user: User = Depends(get_current_user)
+        current_user: UserPrincipal = Depends(get_current_user)
 ):
     """
     Получает список всех комнат с актуальным статусом (свободна/занята) и фильтрами.
@@ -28,7 +30,8 @@ async def get_all_rooms(
     """
     try:
         # Вызываем метод из сервиса, который умеет фильтровать и определять статус
-        rooms = RoomService.get_rooms_with_status(
+        rooms = await run_sync(
+            RoomService.get_rooms_with_status,
             db=db,
             room_type_filter=room_type,
             status_filter=status
@@ -39,17 +42,44 @@ async def get_all_rooms(
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
 
+# Должен быть объявлен до /{room_id}, иначе "available" попадёт в room_id
+@router.get("/available", response_model=List[AvailableRoom])
+async def get_available_rooms(
+        start: date = Query(...),
+        end: date = Query(...),
+        room_type: Optional[str] = None,
+        min_capacity: Optional[int] = Query(None, ge=1),
+        db: Session = Depends(get_db),
+        current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Все свободные комнаты на период за один запрос,
+    с ценой за ночь и полной стоимостью проживания.
+    """
+    if end <= start:
+        raise HTTPException(status_code=400, detail="End date must be after start date")
+
+    return await run_sync(
+        RoomService.get_available_rooms,
+        db,
+        start_date=start,
+        end_date=end,
+        room_type=room_type,
+        min_capacity=min_capacity
+    )
+
+
 @router.get("/{room_id}", response_model=RoomSchema)
 async def get_single_room(
         room_id: int,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: UserPrincipal = Depends(get_current_user)
 ):
     """
     Получает одну конкретную комнату по её ID.
     """
     # Вызываем метод из сервиса для получения одной комнаты
-    room = RoomService.get_room_with_status(db, room_id=room_id)
+    room = await run_sync(RoomService.get_room_with_status, db, room_id=room_id)
 
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
@@ -4,18 +4,26 @@ from typing import List
 
 from ..database import get_db
 from ..models.user import User, UserRole
-from ..utils.dependencies import get_current_user, require_super_admin
+from ..utils.concurrency import run_sync
+from ..schemas.user import NotificationPreferences
+from ..services.auth_cache import UserPrincipal, auth_cache
+from ..services.recipient_registry import recipient_registry
+from ..utils.dependencies import get_current_user_model, require_super_admin
 
 router = APIRouter()
 
 
+def _get_user(db: Session, user_id: int) -> User:
+    return db.query(User).filter(User.id == user_id).first()
+
+
 @router.get("/", response_model=List[dict])
 async def get_all_users(
         db: Session = Depends(get_db),
-        current_user: User = Depends(require_super_admin)
+        current_user: UserPrincipal = Depends(require_super_admin)
 ):
     """Получить список всех пользователей (только для Super Admin)"""
-    users = db.query(User).all()
+    users = await run_sync(db.query(User).all)
 
     result = []
     for user in users:
@@ -47,10 +55,10 @@ async def update_user_role(
         user_id: int,
         role_data: dict,
         db: Session = Depends(get_db),
-        current_user: User = Depends(require_super_admin)
+        current_user: UserPrincipal = Depends(require_super_admin)
 ):
     """Изменить роль пользователя (только для Super Admin)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_sync(_get_user, db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -75,7 +83,9 @@ async def update_user_role(
         # Обновляем флаг is_admin для обратной совместимости
         user.is_admin = user.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]
 
-        db.commit()
+        await run_sync(db.commit)
+        auth_cache.invalidate(user.id)
+        recipient_registry.invalidate()
 
         return {
             "message": "Role updated successfully",
@@ -94,10 +104,10 @@ async def update_user_status(
         user_id: int,
         status_data: dict,
         db: Session = Depends(get_db),
-        current_user: User = Depends(require_super_admin)
+        current_user: UserPrincipal = Depends(require_super_admin)
 ):
     """Активировать/деактивировать пользователя (только для Super Admin)"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_sync(_get_user, db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -109,7 +119,9 @@ async def update_user_status(
         )
 
     user.is_active = status_data.get("is_active", user.is_active)
-    db.commit()
+    await run_sync(db.commit)
+    auth_cache.invalidate(user.id)
+    recipient_registry.invalidate()
 
     return {
         "message": "Status updated successfully",
@@ -120,7 +132,7 @@ async def update_user_status(
 
 @router.get("/me", response_model=dict)
 async def get_current_user_info(
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user_model)
 ):
     """Получить информацию о текущем пользователе"""
     return {
@@ -155,7 +167,7 @@ async def get_current_user_info(
 async def update_current_user(
         user_data: dict,
         db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user_model)
 ):
     """Обновить свои данные"""
     # Пользователь может обновить только свои контактные данные
@@ -168,7 +180,8 @@ async def update_current_user(
     if "phone" in user_data:
         current_user.phone = user_data["phone"]
 
-    db.commit()
+    await run_sync(db.commit)
+    auth_cache.invalidate(current_user.id)
 
     return {
         "message": "Profile updated successfully",
@@ -179,4 +192,28 @@ async def update_current_user(
             "email": current_user.email,
             "phone": current_user.phone
         }
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/me/notifications", response_model=NotificationPreferences)
+async def get_notification_preferences(
+        current_user: User = Depends(get_current_user_model)
+):
+    """Get own notification preferences (events and quiet hours)"""
+    return NotificationPreferences(**(current_user.notification_preferences or {}))
+
+
+@router.put("/me/notifications", response_model=NotificationPreferences)
+async def update_notification_preferences(
+        preferences: NotificationPreferences,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user_model)
+):
+    """Update own notification preferences"""
+    if (preferences.quiet_hours_start is None) != (preferences.quiet_hours_end is None):
+        raise HTTPException(status_code=400, detail="quiet_hours_start and quiet_hours_end must be set together")
+
+    current_user.notification_preferences = preferences.model_dump(mode="json")
+    await run_sync(db.commit)
+    recipient_registry.invalidate()
+    return preferences
@@ -23,8 +23,8 @@ async def websocket_endpoint(
 
         await manager.connect(websocket, user.id)
 
-        # Send initial connection success
-        await websocket.send_json({
+        # Send initial connection success (через очередь соединения, как и рассылки)
+        await manager.send(websocket, {
             "type": "connection",
             "status": "connected",
             "user_id": user.id
@@ -38,9 +38,27 @@ async def websocket_endpoint(
 
                 # Handle ping/pong for connection keepalive
                 if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
+                    await manager.send(websocket, {"type": "pong"})
+
+                # Подписка на темы: {"type": "subscribe", "topics": ["room:12", "bookings:2026-10", "analytics"]}.
+                # Без подписок соединение получает все события, как раньше.
+                elif message.get("type") in ("subscribe", "unsubscribe"):
+                    topics = message.get("topics") or []
+                    try:
+                        if not isinstance(topics, list):
+                            raise ValueError("topics must be a list")
+                        if message["type"] == "subscribe":
+                            current = manager.subscribe(websocket, topics)
+                        else:
+                            current = manager.unsubscribe(websocket, topics)
+                    except ValueError as e:
+                        await manager.send(websocket, {"type": "error", "detail": str(e)})
+                    else:
+                        await manager.send(websocket, {"type": "subscriptions", "topics": sorted(current)})
 
         except WebSocketDisconnect:
+            pass
+        finally:
             manager.disconnect(websocket, user.id)
 
     except Exception as e:
@@ -0,0 +1,151 @@
+"""
+Замер поиска свободных комнат: один запрос RoomService.get_available_rooms
+против проверки каждой комнаты по отдельности (как раньше делал клиент).
+Запустите: python -m app.bench_available_rooms [--rooms 50] [--bookings-per-room 200] [--searches 300]
+
+Сравниваются три способа на одних и тех же случайных периодах:
+- batched: get_available_rooms — anti-join по bookings одним запросом;
+- per-room index: список комнат и N вызовов BookingService.check_availability
+  (in-process индекс, запрос к БД только за версией bookings);
+- per-room SQL: список комнат и N запросов BookingService.get_conflicts —
+  так check_availability работал до in-process индекса.
+Данные пишутся во временную SQLite-базу, рабочая БД не затрагивается.
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+from .database import Base, create_db_engine
+from .models import room, booking, user, history, daily_stats, notification_outbox
+from .models.booking import Booking, BookingsVersion
+from .models.room import Room
+from .models.user import User
+from .services.availability_index import availability_index
+from .services.booking_service import BookingService
+from .services.room_service import RoomService
+
+
+def _seed(db: Session, rooms: int, bookings_per_room: int, rng: random.Random):
+    db_rooms = [
+        Room(room_number=str(100 + i), room_type="standard", capacity=2, price_per_night=500000)
+        for i in range(rooms)
+    ]
+    creator = User(telegram_id=1, first_name="Bench")
+    db.add_all(db_rooms + [creator, BookingsVersion(id=1, version=0)])
+    db.flush()
+    start = date.today()
+    for db_room in db_rooms:
+        # Брони идут подряд с промежутками, без пересечений внутри комнаты
+        offset = 0
+        for _ in range(bookings_per_room):
+            offset += rng.randint(0, 4)
+            nights = rng.randint(1, 5)
+            db.add(Booking(
+                room_id=db_room.id, guest_name="Guest", created_by=creator.id,
+                start_date=start + timedelta(days=offset), end_date=start + timedelta(days=offset + nights)
+            ))
+            offset += nights
+    db.commit()
+
+
+def _per_room(check: Callable[[Session, int, date, date], bool]):
+    def search(db: Session, start_date: date, end_date: date) -> List[int]:
+        return [
+            room_id for (room_id,) in db.query(Room.id).order_by(Room.id)
+            if check(db, room_id, start_date, end_date)
+        ]
+    return search
+
+
+def _batched(db: Session, start_date: date, end_date: date) -> List[int]:
+    return [room["id"] for room in RoomService.get_available_rooms(db, start_date, end_date)]
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def run_benchmark(rooms: int = 50, bookings_per_room: int = 200,
+                  searches: int = 300, seed: int = 7) -> Dict[str, Dict[str, Any]]:
+    rng = random.Random(seed)
+    db_dir = tempfile.mkdtemp(prefix="bench-available-rooms-")
+    db_engine = create_db_engine(f"sqlite:///{os.path.join(db_dir, 'bench.db')}")
+    Base.metadata.create_all(bind=db_engine)
+
+    statements: List[str] = []
+    event.listen(db_engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    session_factory = sessionmaker(autoflush=False, expire_on_commit=False, bind=db_engine)
+    db = session_factory()
+    try:
+        _seed(db, rooms, bookings_per_room, rng)
+        availability_index.load(db)
+        horizon = bookings_per_room * 5
+        today = date.today()
+        periods = [
+            (today + timedelta(days=start), today + timedelta(days=start + rng.randint(1, 7)))
+            for start in (rng.randint(0, horizon) for _ in range(searches))
+        ]
+
+        scenarios = {
+            "before: per-room SQL (get_conflicts)": _per_room(
+                lambda session, room_id, start, end: not BookingService.get_conflicts(session, room_id, start, end)
+            ),
+            "per-room index (check_availability)": _per_room(BookingService.check_availability),
+            "after: batched (get_available_rooms)": _batched,
+        }
+
+        results = {}
+        expected = None
+        # check_availability печатает найденные конфликты — в замере это только шум
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for name, search in scenarios.items():
+                timings: List[float] = []
+                found = []
+                statements.clear()
+                for start_date, end_date in periods:
+                    started = time.perf_counter()
+                    found.append(search(db, start_date, end_date))
+                    timings.append((time.perf_counter() - started) * 1000)
+                if expected is None:
+                    expected = found
+                results[name] = {
+                    "p50_ms": round(statistics.median(timings), 3),
+                    "p99_ms": round(_percentile(timings, 99), 3),
+                    "searches_per_s": round(len(periods) / (sum(timings) / 1000), 1),
+                    "statements_per_search": round(len(statements) / len(periods), 2),
+                    "same_result": found == expected,
+                }
+    finally:
+        db.close()
+        db_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--bookings-per-room", type=int, default=200)
+    parser.add_argument("--searches", type=int, default=300)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rooms, args.bookings_per_room, args.searches)
+    for name, result in results.items():
+        print(name)
+        for key, value in result.items():
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
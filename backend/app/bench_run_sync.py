@@ -0,0 +1,193 @@
+"""
+Нагрузочный замер: синхронная работа с Session прямо в event loop и
+expire_on_commit=True (как было) против run_sync и expire_on_commit=False.
+Запустите: python -m app.bench_run_sync [--requests 1000] [--rate 300] [--concurrency 20] [--rooms-share 0.5]
+
+Поток запросов смешанный. Доля rooms_share повторяет GET /api/rooms
+(RoomService.get_rooms_with_status: все комнаты со статусом на сегодня),
+остальные — PATCH /api/bookings/{id}: загрузка брони с комнатой, изменение
+заметки и коммит. Ответ в обоих случаях сериализуется в event loop. Запросы
+приходят с постоянной частотой rate, задержка считается от момента прихода,
+так что в неё входит и ожидание занятого event loop. Параллельно работает
+"пульс" — корутина, которая просыпается каждую миллисекунду; его опоздание
+показывает, насколько event loop занят чужой работой.
+Данные пишутся во временную SQLite-базу, рабочая БД не затрагивается.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+
+from .database import Base, create_db_engine
+from .models import room, booking, user, history, daily_stats, notification_outbox
+from .models.booking import Booking
+from .models.room import Room
+from .models.user import User
+from .schemas.booking import Booking as BookingSchema
+from .schemas.room import Room as RoomSchema
+from .services.occupancy_calendar import occupancy_calendar
+from .services.room_service import RoomService
+from .utils.concurrency import run_sync, shutdown_sync_executor
+
+ROOMS = 20
+BOOKINGS_PER_ROOM = 50
+
+
+def _seed(session_factory: sessionmaker):
+    db = session_factory()
+    try:
+        rooms = [
+            Room(room_number=str(100 + i), room_type="standard", capacity=2, price_per_night=500000)
+            for i in range(ROOMS)
+        ]
+        creator = User(telegram_id=1, first_name="Bench")
+        db.add_all(rooms + [creator])
+        db.flush()
+        start = date.today()
+        db.add_all(
+            Booking(
+                room_id=db_room.id, guest_name="Guest", created_by=creator.id,
+                start_date=start + timedelta(days=7 * i), end_date=start + timedelta(days=7 * i + 3)
+            )
+            for db_room in rooms for i in range(BOOKINGS_PER_ROOM)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _update(db: Session, booking_id: int, request_number: int) -> Booking:
+    db_booking = db.query(Booking).options(selectinload(Booking.room)).filter(Booking.id == booking_id).one()
+    db_booking.notes = f"request {request_number}"
+    db.commit()
+    return db_booking
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def _is_rooms_request(number: int, rooms_share: float) -> bool:
+    """Запросы GET /rooms равномерно вперемешку с PATCH, в доле rooms_share"""
+    return int((number + 1) * rooms_share) > int(number * rooms_share)
+
+
+async def _scenario(session_factory: sessionmaker, offload: bool, requests: int, rate: float,
+                    concurrency: int, rooms_share: float, statements: List[str]) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {"rooms": [], "patch": []}
+    lags: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - started - 0.001) * 1000)
+
+    async def request(number: int, arrives_at: float):
+        await asyncio.sleep(max(0.0, arrives_at - time.perf_counter()))
+        async with semaphore:
+            kind = "rooms" if _is_rooms_request(number, rooms_share) else "patch"
+            db = session_factory()
+            try:
+                if kind == "rooms":
+                    if offload:
+                        rooms = await run_sync(RoomService.get_rooms_with_status, db)
+                    else:
+                        rooms = RoomService.get_rooms_with_status(db)
+                    # Сериализация ответа — в event loop, как у FastAPI
+                    [RoomSchema.model_validate(db_room) for db_room in rooms]
+                else:
+                    booking_id = number % (ROOMS * BOOKINGS_PER_ROOM) + 1
+                    if offload:
+                        db_booking = await run_sync(_update, db, booking_id, number)
+                    else:
+                        db_booking = _update(db, booking_id, number)
+                    BookingSchema.model_validate(db_booking)
+            finally:
+                db.close()
+            latencies[kind].append((time.perf_counter() - arrives_at) * 1000)
+
+    pulse = asyncio.create_task(heartbeat())
+    statements.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(request(number, started + number / rate) for number in range(requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await pulse
+
+    result: Dict[str, Any] = {}
+    for kind, values in (("all", latencies["rooms"] + latencies["patch"]), *latencies.items()):
+        if values:
+            result[f"{kind}_p50_ms"] = round(statistics.median(values), 2)
+            result[f"{kind}_p99_ms"] = round(_percentile(values, 99), 2)
+    return {
+        **result,
+        "loop_lag_p99_ms": round(_percentile(lags, 99), 2) if lags else None,
+        "requests_per_s": round(requests / elapsed, 1),
+        "statements_per_request": round(len(statements) / requests, 2),
+    }
+
+
+def run_benchmark(requests: int = 1000, rate: float = 300, concurrency: int = 20,
+                  rooms_share: float = 0.5) -> Dict[str, Dict[str, Any]]:
+    db_dir = tempfile.mkdtemp(prefix="bench-run-sync-")
+    db_engine = create_db_engine(f"sqlite:///{os.path.join(db_dir, 'bench.db')}")
+    Base.metadata.create_all(bind=db_engine)
+
+    statements: List[str] = []
+    event.listen(db_engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    scenarios = {
+        "before: inline, expire_on_commit=True": (True, False),
+        "run_sync, expire_on_commit=True": (True, True),
+        "after: run_sync, expire_on_commit=False": (False, True),
+    }
+    _seed(sessionmaker(autoflush=False, bind=db_engine))
+    # GET /rooms берёт занятость из календаря, как в приложении после старта
+    db = sessionmaker(autoflush=False, bind=db_engine)()
+    try:
+        occupancy_calendar.load(db)
+    finally:
+        db.close()
+
+    results = {}
+    for name, (expire_on_commit, offload) in scenarios.items():
+        session_factory = sessionmaker(autoflush=False, expire_on_commit=expire_on_commit, bind=db_engine)
+        results[name] = asyncio.run(_scenario(
+            session_factory, offload, requests, rate, concurrency, rooms_share, statements
+        ))
+    db_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=300, help="requests per second")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rooms-share", type=float, default=0.5, help="share of GET /rooms requests, 0..1")
+    args = parser.parse_args()
+
+    try:
+        results = run_benchmark(args.requests, args.rate, args.concurrency, args.rooms_share)
+    finally:
+        shutdown_sync_executor()
+    for name, result in results.items():
+        print(name)
+        for key, value in result.items():
+            print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,80 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24 * 7  # 7 дней
 
+    # Индекс доступности комнат: как часто (в секундах) сверять его версию с БД.
+    # Изменения в своём процессе применяются сразу, интервал важен только
+    # для бронирований, созданных другими воркерами.
+    availability_index_ttl_seconds: float = 2.0
+
+    # Календарь занятости: сколько дней назад и вперёд от сегодня держать в памяти
+    occupancy_calendar_past_days: int = 365
+    occupancy_calendar_horizon_days: int = 730
+
+    # Кэш дашборда сбрасывается событиями броней, TTL — страховка
+    dashboard_cache_ttl_seconds: float = 300
+
+    # Фоновые выгрузки: каталог для файлов, размер пула процессов, время хранения
+    export_jobs_dir: str = "./export_jobs"
+    export_jobs_workers: int = 2
+    export_jobs_ttl_seconds: int = 60 * 60
+
+    # Потоки для синхронной работы с БД из async-обработчиков (utils/concurrency.py)
+    sync_worker_threads: int = 20
+
+    # Кэш пользователей для get_current_user: роль/статус сбрасываются сразу,
+    # TTL ограничивает устаревание в других воркерах
+    auth_cache_ttl_seconds: float = 30
+    auth_cache_max_size: int = 1024
+
+    # WebSocket: сколько сообщений может ждать отправки одному клиенту,
+    # прежде чем он будет отключён как медленный, и таймаут одной отправки
+    websocket_queue_size: int = 100
+    websocket_send_timeout_seconds: float = 10
+    # Шина событий между воркерами: local (один процесс) или postgres (LISTEN/NOTIFY)
+    websocket_backplane: str = "local"
+    websocket_backplane_channel: str = "oqtoshsoy_ws"
+
+    # Telegram Bot API: базовый URL (можно указать локальный фейковый сервер),
+    # сколько сообщений отправлять параллельно и сколько раз повторять при 429/5xx
+    telegram_api_url: str = "https://api.telegram.org"
+    notification_max_concurrency: int = 10
+    notification_max_retries: int = 3
+    notification_timeout_seconds: float = 10
+    # Outbox уведомлений: размер пачки, интервал опроса, число попыток до dead,
+    # на сколько секунд захваченная пачка скрыта от других воркеров и сколько
+    # ждать отправки всей пачки (должно быть намного меньше lease)
+    notification_outbox_batch_size: int = 50
+    notification_outbox_poll_seconds: float = 5
+    notification_outbox_max_attempts: int = 8
+    notification_outbox_lease_seconds: float = 120
+    notification_outbox_send_timeout_seconds: float = 30
+    # Список получателей уведомлений сбрасывается при смене роли/статуса/настроек,
+    # TTL ограничивает устаревание в других воркерах
+    recipient_registry_ttl_seconds: float = 300
+
+    # История изменений: буферизованная запись пачками вместо строки в каждой
+    # транзакции изменения; как часто сбрасывать буфер и при каком размере сразу
+    history_buffered: bool = False
+    history_flush_interval_seconds: float = 2
+    history_buffer_max_size: int = 500
+
+    # Ежедневный отчёт администраторам: время запуска (локальное время сервера)
+    daily_report_enabled: bool = True
+    daily_report_hour: int = 8
+    daily_report_minute: int = 0
+
+    # Пул соединений с БД: pool_size + max_overflow должно покрывать sync_worker_threads
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30
+    # Только PostgreSQL: пересоздавать соединения старше recycle секунд и проверять перед выдачей
+    db_pool_recycle: int = 30 * 60
+    db_pool_pre_ping: bool = True
+
+    # PRAGMA для SQLite (WAL и synchronous=NORMAL включаются всегда)
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
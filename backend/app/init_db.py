@@ -6,7 +6,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from .database import Base, engine
-from .models import room, booking, user, history
+from .models import room, booking, user, history, daily_stats, notification_outbox
 from .services.room_service import RoomService
 
 def init_database():
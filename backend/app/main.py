@@ -2,23 +2,78 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
-from .database import engine, Base
+from .database import engine, Base, SessionLocal, pool_metrics
 from .api import auth, rooms, bookings, users, websocket, analytics, export # ✅ Импортируем все роутеры
+from .models.booking import check_booking_constraints
+from .services.availability_index import availability_index
+from .services.occupancy_calendar import occupancy_calendar
+from .services.daily_stats_service import DailyStatsService
+from .services.dashboard_cache import dashboard_cache
+from .services.export_jobs import export_jobs
+from .services.history_writer import history_writer
+from .services.notification_service import notification_service
+from .services.notification_outbox import notification_outbox
+from .services.report_scheduler import report_scheduler
+from .utils.concurrency import run_sync, shutdown_sync_executor
+from .websocket.manager import manager
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Создаем все таблицы в БД при старте (если их нет)
+# Кэш дашборда сбрасывается теми же событиями, что уходят в WebSocket
+manager.add_booking_listener(dashboard_cache.on_booking_update)
+
+# Создаем все таблицы в БД при старте (если их нет). Новые колонки и индексы
+# в существующих таблицах добавляют миграции (alembic upgrade head)
 Base.metadata.create_all(bind=engine)
+check_booking_constraints(engine)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Приложение запускается...")
+
+    # Загружаем индекс доступности и календарь занятости один раз при старте
+    db = SessionLocal()
+    try:
+        availability_index.load(db)
+        occupancy_calendar.load(db)
+        # Rollup для аналитики: заполняем, если база уже была до его появления
+        DailyStatsService.ensure_backfilled(db)
+    finally:
+        db.close()
+
+    # Очистка устаревших файлов фоновых выгрузок
+    cleanup_task = asyncio.create_task(export_jobs.run_cleanup_loop())
+
+    # Доставка уведомлений из notification_outbox
+    outbox_task = asyncio.create_task(notification_outbox.run_loop())
+
+    # Буферизованная история: периодический сброс пачкой
+    history_task = asyncio.create_task(history_writer.run_flush_loop()) if history_writer.buffered else None
+
+    # Ежедневный отчёт администраторам по расписанию
+    report_scheduler.start()
+
+    # Шина WebSocket-событий между воркерами
+    await manager.start()
+
     yield
     logger.info("Приложение останавливается...")
+    report_scheduler.shutdown()
+    cleanup_task.cancel()
+    outbox_task.cancel()
+    if history_task is not None:
+        history_task.cancel()
+        # Остаток буфера истории пишем до остановки пула потоков
+        await run_sync(history_writer.flush)
+    export_jobs.shutdown()
+    await manager.stop()
+    await notification_service.close()
+    shutdown_sync_executor()
 
 app = FastAPI(
     title="Oqtoshsoy Resort Management API",
@@ -52,6 +107,18 @@ async def health_check():
     """Проверка работоспособности API"""
     return {"status": "ok", "version": app.version}
 
+
+@app.get("/api/health/db", tags=["System"])
+async def db_health_check():
+    """Состояние пула соединений: занятые соединения, ожидание, таймауты"""
+    return pool_metrics.snapshot(engine)
+
+
+@app.get("/api/health/scheduler", tags=["System"])
+async def scheduler_health_check():
+    """Задачи планировщика, время следующего запуска и журнал последних запусков"""
+    return report_scheduler.status()
+
 @app.get("/", tags=["System"])
 async def root():
     return {"message": "Welcome to Oqtoshsoy Resort API"}
@@ -1,11 +1,23 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Date, Index, text
 from sqlalchemy.orm import relationship
 from ..database import Base
 from datetime import datetime
 
+# Имя EXCLUDE-ограничения, запрещающего пересечение броней одной комнаты
+# (PostgreSQL, создаётся миграцией 0005)
+BOOKING_NO_OVERLAP_CONSTRAINT = "bookings_no_overlap"
+
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Доступность и конфликты одной комнаты: room_id + пересечение дат
+        Index("ix_bookings_room_dates", "room_id", "start_date", "end_date"),
+        # Занятость на дату и брони, пересекающие период, по всем комнатам
+        Index("ix_bookings_dates", "start_date", "end_date"),
+        # Статистика и тренды по дате создания
+        Index("ix_bookings_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     room_id = Column(Integer, ForeignKey("rooms.id"))
@@ -13,9 +25,43 @@ class Booking(Base):
     end_date = Column(Date, nullable=False)
     guest_name = Column(String, nullable=True)
     notes = Column(String, nullable=True)
+    # Цена ночи на момент создания брони: по ней бронь входит в выручку
+    # daily_room_stats и по ней же вычитается, даже если цена комнаты изменилась
+    price_per_night = Column(Float, nullable=True)
     created_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     room = relationship("Room", back_populates="bookings")
-    user = relationship("User", back_populates="bookings")
\ No newline at end of file
+    user = relationship("User", back_populates="bookings")
+
+
+class BookingsVersion(Base):
+    """
+    Версия таблицы bookings (одна строка, id = 1). Растёт в транзакции каждой
+    записи брони; по ней in-process копии узнают об изменениях других воркеров.
+    """
+    __tablename__ = "bookings_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+def check_booking_constraints(engine):
+    """
+    В PostgreSQL BookingService не блокирует комнату и полагается на
+    EXCLUDE-ограничение, поэтому без него приложение не запускается.
+    Ограничение создаёт миграция 0005 (alembic upgrade head).
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.connect() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+            {"name": BOOKING_NO_OVERLAP_CONSTRAINT}
+        ).first()
+    if not exists:
+        raise RuntimeError(
+            f"Constraint {BOOKING_NO_OVERLAP_CONSTRAINT} is missing, run 'alembic upgrade head'"
+        )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+from ..database import Base
+
+
+class DailyRoomStat(Base):
+    """
+    Rollup по броням: одна строка на (дата, комната).
+    Счётчики, а не флаги, чтобы снятие брони было точным вычитанием.
+    """
+    __tablename__ = "daily_room_stats"
+
+    date = Column(Date, primary_key=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"), primary_key=True)
+    occupied = Column(Integer, nullable=False, default=0)  # брони, занимающие эту ночь
+    revenue = Column(Float, nullable=False, default=0)  # выручка за эту ночь
+    check_ins = Column(Integer, nullable=False, default=0)  # заезды в этот день
+    check_outs = Column(Integer, nullable=False, default=0)  # выезды в этот день
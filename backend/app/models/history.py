@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 from datetime import datetime
@@ -6,6 +6,13 @@ from datetime import datetime
 
 class HistoryLog(Base):
     __tablename__ = "history_logs"
+    __table_args__ = (
+        # История сущности и история пользователя, новые записи первыми
+        Index("ix_history_logs_entity", "entity_type", "entity_id", "created_at"),
+        Index("ix_history_logs_user_created_at", "user_id", "created_at"),
+        # Последние действия за период
+        Index("ix_history_logs_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
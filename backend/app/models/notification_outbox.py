@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from ..database import Base
+from datetime import datetime
+
+
+class OutboxMessage(Base):
+    """
+    Сообщение в Telegram, записанное в той же транзакции, что и изменение,
+    о котором оно сообщает. Доставляет фоновый воркер (services/notification_outbox.py).
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Выборка очередной пачки: pending с наступившим next_attempt_at
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+        # Одно и то же сообщение из нескольких процессов ставится в очередь один раз
+        Index("ux_notification_outbox_dedup_key", "dedup_key", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event = Column(String, nullable=False)  # 'booking_created', 'booking_cancelled', 'daily_report'
+    chat_id = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # 'pending', 'sent', 'dead'
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    # Ключ периодических сообщений ('daily_report:2026-10-17:1:<chat_id>'); NULL — без дедупликации
+    dedup_key = Column(String, nullable=True)
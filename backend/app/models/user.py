@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from ..database import Base
 from datetime import datetime
@@ -13,6 +13,66 @@ class UserRole(enum.Enum):
     USER = "user"  # Обычный пользователь
 
 
+class Permission(enum.IntFlag):
+    """Разрешения как биты: набор разрешений роли — одно целое число"""
+    VIEW_ALL = 1 << 0
+    VIEW_OWN = 1 << 1
+    CREATE_BOOKING = 1 << 2
+    EDIT_BOOKING = 1 << 3
+    EDIT_OWN_BOOKING = 1 << 4
+    DELETE_BOOKING = 1 << 5
+    DELETE_OWN_BOOKING = 1 << 6
+    VIEW_ANALYTICS = 1 << 7
+    MANAGE_USERS = 1 << 8
+    SYSTEM_SETTINGS = 1 << 9
+    EXPORT_DATA = 1 << 10
+
+
+# Маска разрешений каждой роли (строится один раз при импорте)
+ROLE_PERMISSIONS = {
+    role: int(mask) for role, mask in {
+        UserRole.SUPER_ADMIN: (
+            Permission.VIEW_ALL | Permission.CREATE_BOOKING | Permission.EDIT_BOOKING
+            | Permission.DELETE_BOOKING | Permission.VIEW_ANALYTICS | Permission.MANAGE_USERS
+            | Permission.SYSTEM_SETTINGS | Permission.EXPORT_DATA
+        ),
+        UserRole.ADMIN: (
+            Permission.VIEW_ALL | Permission.CREATE_BOOKING | Permission.EDIT_BOOKING
+            | Permission.DELETE_BOOKING | Permission.VIEW_ANALYTICS | Permission.MANAGE_USERS
+            | Permission.EXPORT_DATA
+        ),
+        UserRole.MANAGER: (
+            Permission.VIEW_ALL | Permission.CREATE_BOOKING | Permission.EDIT_BOOKING
+            | Permission.DELETE_OWN_BOOKING | Permission.VIEW_ANALYTICS | Permission.EXPORT_DATA
+        ),
+        UserRole.OPERATOR: (
+            Permission.VIEW_ALL | Permission.CREATE_BOOKING | Permission.EDIT_OWN_BOOKING
+        ),
+        UserRole.USER: (
+            Permission.VIEW_OWN | Permission.CREATE_BOOKING
+        ),
+    }.items()
+}
+
+# Старые строковые имена ("edit_booking") -> бит
+PERMISSION_BITS = {permission.name.lower(): permission.value for permission in Permission}
+
+
+def mask_allows(mask: int, permission) -> bool:
+    """Проверка бита; permission — Permission или строковое имя"""
+    bit = PERMISSION_BITS.get(permission, 0) if isinstance(permission, str) else permission.value
+    return mask & bit != 0
+
+
+def mask_allows_booking(mask: int, user_id: int, booking, any_permission: Permission,
+                        own_permission: Permission) -> bool:
+    """Право на любую бронь или только на свою (созданную этим пользователем)"""
+    return (
+        mask & any_permission.value != 0
+        or (mask & own_permission.value != 0 and booking.created_by == user_id)
+    )
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -29,51 +89,40 @@ class User(Base):
     is_admin = Column(Boolean, default=False)  # Для обратной совместимости
     is_active = Column(Boolean, default=True)
 
+    # Настройки уведомлений: {"events": [...], "quiet_hours_start": "22:00", "quiet_hours_end": "08:00"}
+    notification_preferences = Column(JSON, nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Связи
     bookings = relationship("Booking", back_populates="user")
 
-    def has_permission(self, permission: str) -> bool:
+    @staticmethod
+    def format_full_name(first_name: str, last_name: str) -> str:
+        """Имя и фамилия через пробел (для выборок без загрузки объекта User)"""
+        return " ".join(part for part in (first_name, last_name) if part)
+
+    @property
+    def full_name(self) -> str:
+        return User.format_full_name(self.first_name, self.last_name)
+
+    @property
+    def permission_mask(self) -> int:
+        return ROLE_PERMISSIONS.get(self.role, 0)
+
+    def has_permission(self, permission) -> bool:
         """Проверка разрешений на основе роли"""
-        permissions = {
-            UserRole.SUPER_ADMIN: [
-                "view_all", "create_booking", "edit_booking", "delete_booking",
-                "view_analytics", "manage_users", "system_settings", "export_data"
-            ],
-            UserRole.ADMIN: [
-                "view_all", "create_booking", "edit_booking", "delete_booking",
-                "view_analytics", "manage_users", "export_data"
-            ],
-            UserRole.MANAGER: [
-                "view_all", "create_booking", "edit_booking", "delete_own_booking",
-                "view_analytics", "export_data"
-            ],
-            UserRole.OPERATOR: [
-                "view_all", "create_booking", "edit_own_booking"
-            ],
-            UserRole.USER: [
-                "view_own", "create_booking"
-            ]
-        }
-
-        return permission in permissions.get(self.role, [])
+        return mask_allows(self.permission_mask, permission)
 
     def can_delete_booking(self, booking) -> bool:
         """Проверка может ли пользователь удалить бронирование"""
-        if self.role in [UserRole.SUPER_ADMIN, UserRole.ADMIN]:
-            return True
-        elif self.role == UserRole.MANAGER:
-            return booking.created_by == self.id
-        else:
-            return False
+        return mask_allows_booking(
+            self.permission_mask, self.id, booking, Permission.DELETE_BOOKING, Permission.DELETE_OWN_BOOKING
+        )
 
     def can_edit_booking(self, booking) -> bool:
         """Проверка может ли пользователь редактировать бронирование"""
-        if self.role in [UserRole.SUPER_ADMIN, UserRole.ADMIN, UserRole.MANAGER]:
-            return True
-        elif self.role == UserRole.OPERATOR:
-            return booking.created_by == self.id
-        else:
-            return False
\ No newline at end of file
+        return mask_allows_booking(
+            self.permission_mask, self.id, booking, Permission.EDIT_BOOKING, Permission.EDIT_OWN_BOOKING
+        )
@@ -0,0 +1,129 @@
+"""
+Проверка планов запросов горячих путей: EXPLAIN для запросов BookingService,
+RoomService, AnalyticsService и HistoryService на текущей БД.
+Запустите: python -m app.query_plans
+Код возврата 1, если какой-то запрос читает bookings, history_logs или
+daily_room_stats полным сканированием таблицы.
+"""
+
+import re
+import sys
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .database import Base, engine, SessionLocal
+from .models import room, booking, user, history, daily_stats
+from .services.analytics_service import AnalyticsService
+from .services.booking_service import BookingService
+from .services.daily_report import DailyReportService
+from .services.history_service import HistoryService
+from .services.occupancy_calendar import occupancy_calendar
+from .services.room_service import RoomService
+
+# Таблицы, которые растут со временем; справочники rooms и users не проверяем
+CHECKED_TABLES = {"bookings", "history_logs", "daily_room_stats"}
+
+
+def _key_queries() -> List[Tuple[str, Callable[[Session], Any]]]:
+    today = date.today()
+    week = today + timedelta(days=7)
+    # Даты за горизонтом календаря занятости, чтобы сервисы пошли в БД, а не в память
+    far = today + timedelta(days=occupancy_calendar.horizon_days + 30)
+    return [
+        ("BookingService.get_booking", lambda db: BookingService.get_booking(db, 1)),
+        ("BookingService.get_conflicts", lambda db: BookingService.get_conflicts(db, 1, today, week)),
+        ("RoomService._occupied_room_ids", lambda db: RoomService._occupied_room_ids(db, far)),
+        ("RoomService.get_available_rooms", lambda db: RoomService.get_available_rooms(db, today, week)),
+        ("AnalyticsService.get_dashboard_stats", AnalyticsService.get_dashboard_stats),
+        ("AnalyticsService.get_room_type_stats", lambda db: AnalyticsService.get_room_type_stats(db, today, week)),
+        ("AnalyticsService.get_booking_trends", AnalyticsService.get_booking_trends),
+        ("AnalyticsService.get_revenue_stats", AnalyticsService.get_revenue_stats),
+        ("AnalyticsService.get_occupancy_stats", lambda db: AnalyticsService.get_occupancy_stats(db, far, far + timedelta(days=7))),
+        ("DailyReportService.collect", lambda db: DailyReportService.collect(db, today)),
+        ("HistoryService.get_entity_history", lambda db: HistoryService.get_entity_history(db, "booking", 1)),
+        ("HistoryService.get_user_history", lambda db: HistoryService.get_user_history(db, 1)),
+        ("HistoryService.get_recent_history", HistoryService.get_recent_history),
+    ]
+
+
+def _capture(db: Session, query: Callable[[Session], Any]) -> List[Tuple[str, Any]]:
+    """Выполняет запрос сервиса и возвращает отправленные им SELECT с параметрами"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        query(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def _plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _full_scans(connection: Connection, statement: str, parameters: Any) -> List[str]:
+    if connection.dialect.name == "sqlite":
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        scans = []
+        for row in plan:
+            detail = row[-1]
+            # "SCAN bookings" — таблица целиком; "SCAN ... USING INDEX" и "SEARCH" — по индексу
+            match = re.match(r"SCAN (\w+)(.*)", detail)
+            if match and "USING" not in match.group(2) and re.sub(r"_\d+$", "", match.group(1)) in CHECKED_TABLES:
+                scans.append(detail)
+        return scans
+
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    return [
+        f"Seq Scan on {node['Relation Name']}"
+        for node in _plan_nodes(plan[0]["Plan"])
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in CHECKED_TABLES
+    ]
+
+
+def check_query_plans() -> int:
+    """Печатает результат по каждому запросу и возвращает число проблемных"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    failures = 0
+
+    try:
+        # Календарь загружается заранее, чтобы его полная загрузка не попала в проверку
+        occupancy_calendar.load(db)
+
+        with engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                # На маленькой таблице планировщик честно выберет Seq Scan;
+                # с enable_seqscan=off он останется, только если подходящего индекса нет
+                connection.exec_driver_sql("SET enable_seqscan = off")
+
+            for name, query in _key_queries():
+                problems = []
+                for statement, parameters in _capture(db, query):
+                    for scan in _full_scans(connection, statement, parameters):
+                        problems.append(f"{scan}\n        {' '.join(statement.split())}")
+
+                print(f"{'FAIL' if problems else 'ok  '} {name}")
+                for problem in problems:
+                    print(f"     - {problem}")
+                failures += bool(problems)
+    finally:
+        db.close()
+
+    print(f"\n{failures} queries with full table scans" if failures else "\nAll plans use indexes")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check_query_plans() else 0)
@@ -0,0 +1,28 @@
+"""
+Скрипт для пересчёта таблицы daily_room_stats из bookings
+Запустите: python -m app.rebuild_daily_stats
+"""
+
+from .database import Base, engine, SessionLocal
+from .models import room, booking, user, history, daily_stats
+from .services.daily_stats_service import DailyStatsService
+
+
+def rebuild_daily_stats():
+    """Пересоздаёт rollup занятости и выручки по дням"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+
+    try:
+        print("Rebuilding daily_room_stats...")
+        count = DailyStatsService.rebuild(db)
+        print(f"Done: {count} rows")
+    except Exception as e:
+        print(f"Error rebuilding daily_room_stats: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild_daily_stats()
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from datetime import date
+from typing import Literal, Optional
+
+
+class ExportJobCreate(BaseModel):
+    kind: Literal["bookings", "rooms", "analytics"]
+    format: Literal["xlsx", "csv", "jsonl", "parquet"] = "xlsx"
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+class ExportJob(BaseModel):
+    id: str
+    kind: str
+    format: str
+    status: str  # queued, running, done, failed
+    progress: int = 0
+    rows: int = 0
+    size: Optional[int] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
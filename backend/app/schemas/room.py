@@ -38,4 +38,14 @@ class Room(RoomBase):
 
     class Config:
         from_attributes = True
-        arbitrary_types_allowed = True  # Разрешаем произвольные типы
\ No newline at end of file
+        arbitrary_types_allowed = True  # Разрешаем произвольные типы
+
+
+class AvailableRoom(BaseModel):
+    id: int
+    room_number: str
+    room_type: str
+    capacity: int
+    price_per_night: float
+    nights: int
+    total_price: float
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from typing import List, Literal, Optional
+from datetime import datetime, time
 
 
 class UserBase(BaseModel):
@@ -41,6 +41,14 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class NotificationPreferences(BaseModel):
+    # None — все события
+    events: Optional[List[Literal["booking_created", "booking_cancelled", "daily_report"]]] = None
+    # Тихие часы по времени сервера, окно может переходить через полночь
+    quiet_hours_start: Optional[time] = None
+    quiet_hours_end: Optional[time] = None
+
+
 class TelegramAuthData(BaseModel):
     id: int
     first_name: str
@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func, extract, literal, Date
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from ..models.room import Room  # Убираем импорт RoomType
 from ..models.booking import Booking
 from ..models.user import User
+from ..models.daily_stats import DailyRoomStat
+from ..utils.sql import days_between, greatest, least
+from .occupancy_calendar import occupancy_calendar
 
 
 class AnalyticsService:
@@ -16,11 +19,11 @@ class AnalyticsService:
         # Total rooms
         total_rooms = db.query(Room).count()
 
-        # Occupied rooms today
-        occupied_rooms = db.query(Booking).filter(
-            Booking.start_date <= today,
-            Booking.end_date >= today
-        ).count()
+        # Occupied rooms today (из rollup daily_room_stats)
+        occupied_rooms = db.query(func.count(DailyRoomStat.room_id)).filter(
+            DailyRoomStat.date == today,
+            DailyRoomStat.occupied > 0
+        ).scalar() or 0
 
         # Occupancy rate
         occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
@@ -31,14 +34,11 @@ class AnalyticsService:
             Booking.created_at >= current_month_start
         ).count()
 
-        # Revenue this month (примерный расчет)
-        monthly_revenue = db.query(
-            func.sum(
-                func.coalesce(Room.price_per_night, 0) *
-                (func.julianday(Booking.end_date) - func.julianday(Booking.start_date))
-            )
-        ).join(Room).filter(
-            Booking.created_at >= current_month_start
+        # Revenue this month: выручка за ночи текущего месяца
+        next_month_start = (current_month_start + timedelta(days=32)).replace(day=1)
+        monthly_revenue = db.query(func.sum(DailyRoomStat.revenue)).filter(
+            DailyRoomStat.date >= current_month_start,
+            DailyRoomStat.date < next_month_start
         ).scalar() or 0
 
         return {
@@ -51,31 +51,58 @@ class AnalyticsService:
         }
 
     @staticmethod
-    def get_room_type_stats(db: Session) -> List[Dict[str, Any]]:
-        """Get statistics by room type"""
-        # Получаем статистику по типам комнат
+    def get_room_type_stats(
+            db: Session,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get statistics by room type for nights from start_date to end_date inclusive
+        (по умолчанию — только сегодняшняя ночь).
+        Один сгруппированный запрос, ночи обрезаются по границам периода.
+        """
+        start_date = start_date or end_date or date.today()
+        end_date = end_date or start_date
+        range_start = literal(start_date, Date)
+        range_end = literal(end_date + timedelta(days=1), Date)  # не включая
+        period_days = (end_date - start_date).days + 1
+
+        # Брони каждой комнаты, пересекающие период, и их ночи внутри периода
+        per_room = db.query(
+            Booking.room_id.label("room_id"),
+            func.count(Booking.id).label("bookings_count"),
+            func.sum(
+                days_between(least(Booking.end_date, range_end), greatest(Booking.start_date, range_start))
+            ).label("nights")
+        ).filter(
+            Booking.start_date < range_end,
+            Booking.end_date > range_start
+        ).group_by(Booking.room_id).subquery()
+
+        nights = func.coalesce(per_room.c.nights, 0)
         room_stats = db.query(
             Room.room_type,
-            func.count(Room.id).label('total'),
-            func.avg(Room.price_per_night).label('avg_price')
+            func.count(Room.id).label("total"),
+            func.avg(Room.price_per_night).label("avg_price"),
+            func.sum(func.coalesce(per_room.c.bookings_count, 0)).label("bookings_count"),
+            func.sum(nights).label("nights"),
+            func.sum(nights * func.coalesce(Room.price_per_night, 0)).label("revenue")
+        ).outerjoin(
+            per_room, per_room.c.room_id == Room.id
         ).group_by(Room.room_type).all()
 
         result = []
         for stat in room_stats:
-            # Считаем занятость для каждого типа
-            occupied = db.query(Booking).join(Room).filter(
-                Room.room_type == stat.room_type,
-                Booking.start_date <= date.today(),
-                Booking.end_date >= date.today()
-            ).count()
-
+            capacity_nights = stat.total * period_days
+            booked_nights = int(stat.nights or 0)
             result.append({
                 "room_type": stat.room_type,
                 "total_rooms": stat.total,
-                "occupied": occupied,
-                "available": stat.total - occupied,
+                "bookings_count": int(stat.bookings_count or 0),
+                "total_booked_days": booked_nights,
+                "revenue": float(stat.revenue or 0),
                 "avg_price": float(stat.avg_price) if stat.avg_price else 0,
-                "occupancy_rate": round((occupied / stat.total * 100) if stat.total > 0 else 0, 1)
+                "occupancy_rate": round((booked_nights / capacity_nights * 100) if capacity_nights > 0 else 0, 1)
             })
 
         return result
@@ -114,17 +141,15 @@ class AnalyticsService:
         if not year:
             year = datetime.now().year
 
-        # Получаем помесячную выручку
+        # Получаем помесячную выручку по ночам проживания из rollup
         monthly_revenue = db.query(
-            extract('month', Booking.created_at).label('month'),
-            func.sum(
-                Room.price_per_night *
-                (func.julianday(Booking.end_date) - func.julianday(Booking.start_date))
-            ).label('revenue')
-        ).join(Room).filter(
-            extract('year', Booking.created_at) == year
+            extract('month', DailyRoomStat.date).label('month'),
+            func.sum(DailyRoomStat.revenue).label('revenue')
+        ).filter(
+            DailyRoomStat.date >= date(year, 1, 1),
+            DailyRoomStat.date < date(year + 1, 1, 1)
         ).group_by(
-            extract('month', Booking.created_at)
+            extract('month', DailyRoomStat.date)
         ).all()
 
         # Формируем результат
@@ -166,25 +191,103 @@ class AnalyticsService:
         return result
 
     @staticmethod
-    def get_occupancy_forecast(db: Session, days: int = 7) -> List[Dict[str, Any]]:
-        """Get occupancy forecast for next N days"""
-        forecast = []
+    def _daily_occupancy_by_type(db: Session, start: date, days: int) -> Dict[str, List[int]]:
+        """
+        Занятость по типам комнат на каждую ночь [start, start + days):
+        из календаря занятости или одним запросом к daily_room_stats.
+        """
+        end = start + timedelta(days=days)
+        if occupancy_calendar.ready(db, start, end):
+            return {
+                room_type: [int(v) for v in counts]
+                for room_type, counts in occupancy_calendar.daily_occupancy_by_type(start, end).items()
+            }
+
+        # Иначе — диапазонное чтение rollup daily_room_stats
+        rows = db.query(
+            DailyRoomStat.date,
+            Room.room_type,
+            func.count(DailyRoomStat.room_id)
+        ).join(Room).filter(
+            DailyRoomStat.date >= start,
+            DailyRoomStat.date < end,
+            DailyRoomStat.occupied > 0
+        ).group_by(DailyRoomStat.date, Room.room_type).all()
+
+        result: Dict[str, List[int]] = {}
+        for day, room_type, occupied in rows:
+            result.setdefault(room_type, [0] * days)[(day - start).days] = occupied
+        return result
+
+    @staticmethod
+    def get_occupancy_stats(
+            db: Session,
+            start_date: Optional[date] = None,
+            end_date: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Get daily occupancy for nights from start_date to end_date inclusive"""
+        end_date = end_date or date.today()
+        start_date = start_date or end_date - timedelta(days=29)
+        days = max((end_date - start_date).days + 1, 0)
+
         total_rooms = db.query(Room).count()
+        occupied_by_type = AnalyticsService._daily_occupancy_by_type(db, start_date, days)
 
+        daily_stats = []
         for i in range(days):
-            target_date = date.today() + timedelta(days=i)
+            occupied = sum(counts[i] for counts in occupied_by_type.values())
+            daily_stats.append({
+                "date": str(start_date + timedelta(days=i)),
+                "occupied": occupied,
+                "available": total_rooms - occupied,
+                "occupancy_rate": round((occupied / total_rooms * 100) if total_rooms > 0 else 0, 1)
+            })
+
+        average = sum(day["occupancy_rate"] for day in daily_stats) / len(daily_stats) if daily_stats else 0
+        return {
+            "start_date": str(start_date),
+            "end_date": str(end_date),
+            "total_rooms": total_rooms,
+            "average_occupancy": round(average, 1),
+            "daily_stats": daily_stats
+        }
+
+    @staticmethod
+    def get_occupancy_forecast(db: Session, days: int = 7) -> List[Dict[str, Any]]:
+        """
+        Get occupancy forecast for next N days.
+        Число запросов не зависит от days: комнаты по типам + одно чтение занятости.
+        """
+        today = date.today()
+        rooms_by_type = dict(
+            db.query(Room.room_type, func.count(Room.id)).group_by(Room.room_type).all()
+        )
+        total_rooms = sum(rooms_by_type.values())
+        occupied_by_type = AnalyticsService._daily_occupancy_by_type(db, today, days)
 
-            # Считаем занятые комнаты на эту дату
-            occupied = db.query(Booking).filter(
-                Booking.start_date <= target_date,
-                Booking.end_date >= target_date
-            ).count()
+        def rate(occupied: int, total: int) -> float:
+            return round((occupied / total * 100) if total > 0 else 0, 1)
 
+        forecast = []
+        for i in range(days):
+            by_type = []
+            for room_type, type_total in rooms_by_type.items():
+                type_occupied = occupied_by_type.get(room_type, [0] * days)[i]
+                by_type.append({
+                    "room_type": room_type,
+                    "total_rooms": type_total,
+                    "occupied": type_occupied,
+                    "available": type_total - type_occupied,
+                    "occupancy_rate": rate(type_occupied, type_total)
+                })
+
+            occupied = sum(item["occupied"] for item in by_type)
             forecast.append({
-                "date": str(target_date),
+                "date": str(today + timedelta(days=i)),
                 "occupied": occupied,
                 "available": total_rooms - occupied,
-                "occupancy_rate": round((occupied / total_rooms * 100) if total_rooms > 0 else 0, 1)
+                "occupancy_rate": rate(occupied, total_rooms),
+                "by_room_type": by_type
             })
 
-        return forecast
\ No newline at end of file
+        return forecast
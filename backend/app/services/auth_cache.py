@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from ..config.settings import get_settings
+from ..models.user import User, UserRole, ROLE_PERMISSIONS, mask_allows
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """
+    Неизменяемый снимок пользователя для проверок доступа.
+    Подменяет ORM-объект User в зависимостях: id, роль, флаги и имя
+    для уведомлений есть, ленивых обращений к БД нет.
+    """
+    id: int
+    role: UserRole
+    is_active: bool
+    is_admin: bool
+    permissions: int  # битовая маска Permission
+    telegram_id: Optional[int] = None
+    full_name: str = ""
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            role=user.role,
+            is_active=bool(user.is_active),
+            is_admin=bool(user.is_admin),
+            permissions=ROLE_PERMISSIONS.get(user.role, 0),
+            telegram_id=user.telegram_id,
+            full_name=user.full_name
+        )
+
+    def has_permission(self, permission) -> bool:
+        return mask_allows(self.permissions, permission)
+
+    def can_change_booking(self, booking) -> bool:
+        """Менять и удалять бронь может администратор (is_admin) или её создатель"""
+        return self.is_admin or booking.created_by == self.id
+
+
+class AuthCache:
+    """
+    user_id из токена -> UserPrincipal с коротким TTL и LRU-вытеснением.
+    Изменения роли и статуса сбрасывают запись сразу (invalidate); в других
+    воркерах запись доживает не дольше ttl_seconds. Принципал, загруженный
+    во время сброса, не сохраняется: он мог не увидеть изменение (см. generation).
+    """
+
+    def __init__(self, ttl_seconds: float = settings.auth_cache_ttl_seconds,
+                 max_size: int = settings.auth_cache_max_size):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._items: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Номер сброса: растёт в invalidate и clear, сверяется в put
+        self.generation = 0
+
+    def get(self, user_id: int) -> Optional[UserPrincipal]:
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None or item[1] < time.monotonic():
+                self._items.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._items.move_to_end(user_id)
+            self.hits += 1
+            return item[0]
+
+    def put(self, principal: UserPrincipal, generation: int):
+        """generation — значение self.generation до чтения пользователя из БД"""
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._items[principal.id] = (principal, time.monotonic() + self.ttl_seconds)
+            self._items.move_to_end(principal.id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self.generation += 1
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._items.clear()
+
+    def counters(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 1) if total else 0
+        }
+
+
+auth_cache = AuthCache()
@@ -0,0 +1,236 @@
+import threading
+import time
+from bisect import bisect_right, insort
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from ..config.settings import get_settings
+from ..models.booking import Booking, BookingsVersion
+
+settings = get_settings()
+
+
+def dates_overlap(booked_start: date, booked_end: date, start_date: date, end_date: date) -> bool:
+    """Та же проверка пересечения, что и в BookingService.check_availability"""
+    return (
+        (booked_start <= start_date < booked_end)
+        or (booked_start < end_date <= booked_end)
+        or (booked_start >= start_date and booked_end <= end_date)
+    )
+
+
+def bookings_version(db: Session) -> int:
+    """Текущая версия bookings: чтение одной строки по первичному ключу"""
+    return db.query(BookingsVersion.version).filter(BookingsVersion.id == 1).scalar() or 0
+
+
+def bump_bookings_version(db: Session):
+    """
+    Увеличивает версию bookings в транзакции записи брони. Версия только
+    растёт, поэтому никакая комбинация чужих изменений её не "обнулит".
+    В PostgreSQL строка версии блокируется до коммита, так что записи броней
+    идут по очереди и версия после нашего коммита равна прежней + 1, только
+    если между сверками никто другой ничего не записал.
+    """
+    result = db.execute(
+        update(BookingsVersion.__table__).where(BookingsVersion.id == 1).values(version=BookingsVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        # Строку создаёт миграция; в базе из create_all её ещё нет
+        db.execute(insert(BookingsVersion.__table__).values(id=1, version=1))
+
+
+class _RoomIntervals:
+    """Отсортированные по началу интервалы одной комнаты"""
+
+    __slots__ = ("entries", "max_end")
+
+    def __init__(self):
+        self.entries: List[Tuple[date, date, int]] = []  # (start, end, booking_id)
+        self.max_end: List[date] = []  # max(end) для префикса entries[:i + 1]
+
+    def _rebuild_max_end(self, start_index: int = 0):
+        del self.max_end[start_index:]
+        current = self.max_end[-1] if self.max_end else None
+        for _, end, _ in self.entries[start_index:]:
+            current = end if current is None or end > current else current
+            self.max_end.append(current)
+
+    def add(self, start: date, end: date, booking_id: int):
+        entry = (start, end, booking_id)
+        insort(self.entries, entry)
+        self._rebuild_max_end(self.entries.index(entry))
+
+    def remove(self, booking_id: int) -> bool:
+        for i, entry in enumerate(self.entries):
+            if entry[2] == booking_id:
+                del self.entries[i]
+                self._rebuild_max_end(i)
+                return True
+        return False
+
+    def conflicts(self, start: date, end: date, exclude_booking_id: Optional[int]) -> List[Tuple[date, date, int]]:
+        # Кандидаты только с booked_start <= end, идём назад, пока префиксный
+        # максимум окончаний ещё может задеть start
+        i = bisect_right(self.entries, (end, date.max, float("inf")))
+        found = []
+        for j in range(i - 1, -1, -1):
+            if self.max_end[j] < start:
+                break
+            booked_start, booked_end, booking_id = self.entries[j]
+            if booking_id == exclude_booking_id:
+                continue
+            if dates_overlap(booked_start, booked_end, start, end):
+                found.append(self.entries[j])
+        found.reverse()
+        return found
+
+
+class BookingMirror:
+    """
+    Основа для in-process копий таблицы bookings (индекс доступности,
+    календарь занятости). Изменения из BookingService применяются сразу.
+    Чтобы видеть изменения других воркеров, копия раз в ttl_seconds сверяет
+    bookings_version с БД и при расхождении перезагружается. Проверка
+    перед записью брони идёт по БД, а не по копии (BookingService._ensure_available).
+    """
+
+    def __init__(self, ttl_seconds: float = settings.availability_index_ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def _build(self, db: Session):
+        """Загружает данные из БД и подменяет ими состояние (под self._lock)"""
+        raise NotImplementedError
+
+    def _is_current(self) -> bool:
+        """Можно ли пользоваться уже загруженным состоянием"""
+        return True
+
+    def load(self, db: Session):
+        """Полная загрузка из БД (при старте или после рассинхронизации)"""
+        version = bookings_version(db)
+        with self._lock:
+            self._build(db)
+            self._version = version
+            self._checked_at = time.monotonic()
+            self._loaded = True
+
+    def sync(self, db: Session, force: bool = False):
+        """Сверяет версию с БД не чаще раза в ttl_seconds и перезагружается при изменениях"""
+        if not self._loaded or not self._is_current():
+            self.load(db)
+            return
+        if not force and time.monotonic() - self._checked_at < self.ttl_seconds:
+            return
+
+        if bookings_version(db) != self._version:
+            self.load(db)
+        else:
+            self._checked_at = time.monotonic()
+
+    def _remember(self, db: Session):
+        """
+        После собственного коммита: каждая запись брони увеличивает версию
+        на 1, так что копия верна, только если версия выросла ровно на 1.
+        Иначе между сверками что-то записал другой воркер — сразу перезагружаемся.
+        """
+        version = bookings_version(db)
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+            self._checked_at = time.monotonic()
+        else:
+            self.load(db)
+
+    def _apply_add(self, booking: Booking):
+        """Добавляет или заменяет бронь"""
+        raise NotImplementedError
+
+    def _apply_remove(self, booking_id: int):
+        raise NotImplementedError
+
+    def add_booking(self, db: Session, booking: Booking):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._apply_add(booking)
+            self._remember(db)
+
+    def update_booking(self, db: Session, booking: Booking):
+        self.add_booking(db, booking)
+
+    def remove_booking(self, db: Session, booking_id: int):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._apply_remove(booking_id)
+            self._remember(db)
+
+
+class RoomAvailabilityIndex(BookingMirror):
+    """
+    In-process индекс бронирований по комнатам для проверки доступности
+    за O(log n) без запросов к БД.
+    """
+
+    def __init__(self, ttl_seconds: float = settings.availability_index_ttl_seconds):
+        super().__init__(ttl_seconds)
+        self._rooms: Dict[int, _RoomIntervals] = {}
+        self._locations: Dict[int, int] = {}  # booking_id -> room_id
+
+    def _build(self, db: Session):
+        rows = db.query(Booking.id, Booking.room_id, Booking.start_date, Booking.end_date).all()
+
+        rooms: Dict[int, _RoomIntervals] = {}
+        locations: Dict[int, int] = {}
+        for booking_id, room_id, start, end in rows:
+            intervals = rooms.setdefault(room_id, _RoomIntervals())
+            intervals.entries.append((start, end, booking_id))
+            locations[booking_id] = room_id
+        for intervals in rooms.values():
+            intervals.entries.sort()
+            intervals._rebuild_max_end()
+
+        self._rooms = rooms
+        self._locations = locations
+
+    def _apply_add(self, booking: Booking):
+        self._apply_remove(booking.id)
+        self._rooms.setdefault(booking.room_id, _RoomIntervals()).add(
+            booking.start_date, booking.end_date, booking.id
+        )
+        self._locations[booking.id] = booking.room_id
+
+    def _apply_remove(self, booking_id: int):
+        room_id = self._locations.pop(booking_id, None)
+        if room_id is not None and room_id in self._rooms:
+            self._rooms[room_id].remove(booking_id)
+
+    def find_conflicts(
+            self,
+            db: Session,
+            room_id: int,
+            start_date: date,
+            end_date: date,
+            exclude_booking_id: Optional[int] = None
+    ) -> List[Tuple[date, date, int]]:
+        """Возвращает пересекающиеся брони комнаты как (start, end, booking_id)"""
+        self.sync(db)
+        with self._lock:
+            intervals = self._rooms.get(room_id)
+            if intervals is None:
+                return []
+            return intervals.conflicts(start_date, end_date, exclude_booking_id)
+
+
+availability_index = RoomAvailabilityIndex()
@@ -1,18 +1,139 @@
+import threading
+from contextlib import contextmanager
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+from typing import Callable, Dict, List, Optional
 from datetime import date
-from ..models.booking import Booking
+from ..models.booking import Booking, BOOKING_NO_OVERLAP_CONSTRAINT
+from ..models.room import Room
 from ..schemas.booking import BookingCreate, BookingUpdate
+from .availability_index import availability_index, bump_bookings_version
+from .daily_stats_service import DailyStatsService
+from .occupancy_calendar import occupancy_calendar
+
+# In-process копии bookings, которые обновляются после каждого коммита
+_booking_mirrors = (availability_index, occupancy_calendar)
+
+
+class BookingConflictError(Exception):
+    """Бронирование пересекается с уже существующими бронями этой комнаты"""
+
+    def __init__(self, room_id: int, conflicts: Optional[List[Booking]] = None):
+        self.room_id = room_id
+        self.conflicts = conflicts or []
+        super().__init__(f"Room {room_id} is not available for selected dates")
+
+
+# Локи на комнату для SQLite, где нет EXCLUDE-ограничения
+_room_locks: Dict[int, threading.Lock] = {}
+_room_locks_guard = threading.Lock()
+
+
+def _get_room_lock(room_id: int) -> threading.Lock:
+    with _room_locks_guard:
+        return _room_locks.setdefault(room_id, threading.Lock())
+
+
+def _is_overlap_violation(error: IntegrityError) -> bool:
+    # 23P01 = exclusion_violation в PostgreSQL
+    return (
+        getattr(error.orig, "pgcode", None) == "23P01"
+        or BOOKING_NO_OVERLAP_CONSTRAINT in str(error.orig)
+    )
 
 
 class BookingService:
     @staticmethod
-    def create_booking(db: Session, booking: BookingCreate, user_id: int) -> Booking:
-        db_booking = Booking(**booking.dict(), created_by=user_id)
-        db.add(db_booking)
-        db.commit()
-        db.refresh(db_booking)
+    @contextmanager
+    def _room_guard(db: Session, room_id: int):
+        """
+        Критическая секция на одну комнату.
+        В PostgreSQL пересечения отсекает EXCLUDE-ограничение bookings_no_overlap,
+        поэтому здесь ничего не блокируется. В SQLite берём лок комнаты в процессе
+        и сразу захватываем блокировку записи в БД (UPDATE без изменений), чтобы
+        проверка и вставка шли в одной транзакции и для других воркеров тоже.
+        """
+        if db.get_bind().dialect.name != "sqlite":
+            yield
+            return
+
+        with _get_room_lock(room_id):
+            try:
+                db.execute(update(Room.__table__).where(Room.id == room_id).values(id=Room.id))
+                yield
+            except BaseException:
+                db.rollback()
+                raise
+
+    @staticmethod
+    def _ensure_available(
+            db: Session,
+            room_id: int,
+            start_date: date,
+            end_date: date,
+            exclude_booking_id: Optional[int] = None
+    ):
+        # Перед записью проверяем по БД, а не по in-process индексу: копия может
+        # отставать от других воркеров, а в SQLite блокировка записи уже взята
+        # (_room_guard), так что ответ останется верным до коммита
+        conflicts = BookingService.get_conflicts(db, room_id, start_date, end_date, exclude_booking_id)
+        if conflicts:
+            db.rollback()
+            raise BookingConflictError(room_id, conflicts)
+
+    @staticmethod
+    @contextmanager
+    def _overlap_as_conflict(db: Session, room_id: int, start_date: date, end_date: date,
+                             exclude_booking_id: Optional[int] = None):
+        """
+        Запись в БД (flush или commit), где нарушение bookings_no_overlap
+        превращается в BookingConflictError
+        """
+        try:
+            yield
+        except IntegrityError as e:
+            db.rollback()
+            if not _is_overlap_violation(e):
+                raise
+            raise BookingConflictError(
+                room_id,
+                BookingService.get_conflicts(db, room_id, start_date, end_date, exclude_booking_id)
+            )
+
+    @staticmethod
+    def _commit(db: Session, room_id: int, start_date: date, end_date: date,
+                exclude_booking_id: Optional[int] = None):
+        """Коммит, превращающий нарушение bookings_no_overlap в BookingConflictError"""
+        with BookingService._overlap_as_conflict(db, room_id, start_date, end_date, exclude_booking_id):
+            db.commit()
+
+    @staticmethod
+    def create_booking(db: Session, booking: BookingCreate, user_id: int,
+                       before_commit: Optional[Callable[[Booking], None]] = None) -> Booking:
+        """
+        Создаёт бронирование без гонок между проверкой и вставкой.
+        При пересечении с другими бронями бросает BookingConflictError.
+        before_commit получает бронь с уже назначенным id и может добавить
+        в сессию связанные записи (историю), которые закоммитятся вместе с ней.
+        """
+        with BookingService._room_guard(db, booking.room_id):
+            BookingService._ensure_available(db, booking.room_id, booking.start_date, booking.end_date)
+
+            price = DailyStatsService.room_price(db, booking.room_id)
+            db_booking = Booking(**booking.dict(), price_per_night=price, created_by=user_id)
+            db.add(db_booking)
+            DailyStatsService.apply_booking(db, booking.room_id, booking.start_date, booking.end_date, price)
+            bump_bookings_version(db)
+            with BookingService._overlap_as_conflict(db, booking.room_id, booking.start_date, booking.end_date):
+                if before_commit is not None:
+                    # В PostgreSQL EXCLUDE-ограничение срабатывает уже здесь, на flush
+                    db.flush()
+                    before_commit(db_booking)
+                db.commit()
+            db.refresh(db_booking)
+            for mirror in _booking_mirrors:
+                mirror.add_booking(db, db_booking)
         return db_booking
 
     @staticmethod
@@ -21,24 +142,93 @@ class BookingService:
 
     @staticmethod
     def update_booking(db: Session, booking_id: int, booking_update: BookingUpdate) -> Optional[Booking]:
+        """
+        Обновляет бронирование. Если меняются даты, проверка и запись
+        выполняются так же атомарно, как в create_booking.
+        """
         booking = db.query(Booking).filter(Booking.id == booking_id).first()
-        if booking:
-            update_data = booking_update.dict(exclude_unset=True)
+        if not booking:
+            return None
+
+        update_data = booking_update.dict(exclude_unset=True)
+        start = update_data.get("start_date") or booking.start_date
+        end = update_data.get("end_date") or booking.end_date
+
+        with BookingService._room_guard(db, booking.room_id):
+            if "start_date" in update_data or "end_date" in update_data:
+                BookingService._ensure_available(db, booking.room_id, start, end, exclude_booking_id=booking_id)
+
+            if (start, end) != (booking.start_date, booking.end_date):
+                price = DailyStatsService.booking_price(db, booking)
+                DailyStatsService.apply_booking(
+                    db, booking.room_id, booking.start_date, booking.end_date, price, sign=-1
+                )
+                DailyStatsService.apply_booking(db, booking.room_id, start, end, price)
+                booking.price_per_night = price
+
             for field, value in update_data.items():
                 setattr(booking, field, value)
-            db.commit()
+            bump_bookings_version(db)
+            BookingService._commit(db, booking.room_id, start, end, exclude_booking_id=booking_id)
             db.refresh(booking)
+            for mirror in _booking_mirrors:
+                mirror.update_booking(db, booking)
         return booking
 
     @staticmethod
     def delete_booking(db: Session, booking_id: int) -> bool:
         booking = db.query(Booking).filter(Booking.id == booking_id).first()
         if booking:
+            DailyStatsService.apply_booking(
+                db, booking.room_id, booking.start_date, booking.end_date,
+                DailyStatsService.booking_price(db, booking), sign=-1
+            )
             db.delete(booking)
+            bump_bookings_version(db)
             db.commit()
+            for mirror in _booking_mirrors:
+                mirror.remove_booking(db, booking_id)
             return True
         return False
 
+    @staticmethod
+    def overlap_filter(start_date: date, end_date: date):
+        """SQL-условие пересечения брони с периодом (то же, что dates_overlap)"""
+        return or_(
+            # Новое бронирование начинается во время существующего
+            and_(
+                Booking.start_date <= start_date,
+                Booking.end_date > start_date  # end_date > start_date, не >=
+            ),
+            # Новое бронирование заканчивается во время существующего
+            and_(
+                Booking.start_date < end_date,  # start_date < end_date, не <=
+                Booking.end_date >= end_date
+            ),
+            # Новое бронирование полностью покрывает существующее
+            and_(
+                Booking.start_date >= start_date,
+                Booking.end_date <= end_date
+            )
+        )
+
+    @staticmethod
+    def get_conflicts(
+            db: Session,
+            room_id: int,
+            start_date: date,
+            end_date: date,
+            exclude_booking_id: Optional[int] = None
+    ) -> List[Booking]:
+        """Конфликтующие брони из БД (нужны только для текста ошибки)"""
+        query = db.query(Booking).filter(
+            Booking.room_id == room_id,
+            BookingService.overlap_filter(start_date, end_date)
+        )
+        if exclude_booking_id:
+            query = query.filter(Booking.id != exclude_booking_id)
+        return query.order_by(Booking.start_date).all()
+
     @staticmethod
     def check_availability(
             db: Session,
@@ -50,41 +240,17 @@ class BookingService:
         """
         Проверяет доступность КОНКРЕТНОЙ комнаты для заданных дат.
         ВАЖНО: Проверяем только указанную комнату по room_id!
+        Пересечение считается так же, как в availability_index.dates_overlap.
         """
-        # Строим запрос для проверки пересечений дат ТОЛЬКО для указанной комнаты
-        query = db.query(Booking).filter(
-            Booking.room_id == room_id,  # Проверяем ТОЛЬКО эту комнату
-            or_(
-                # Новое бронирование начинается во время существующего
-                and_(
-                    Booking.start_date <= start_date,
-                    Booking.end_date > start_date  # end_date > start_date, не >=
-                ),
-                # Новое бронирование заканчивается во время существующего
-                and_(
-                    Booking.start_date < end_date,  # start_date < end_date, не <=
-                    Booking.end_date >= end_date
-                ),
-                # Новое бронирование полностью покрывает существующее
-                and_(
-                    Booking.start_date >= start_date,
-                    Booking.end_date <= end_date
-                )
-            )
+        # Проверяем по in-process индексу, без запроса к bookings
+        conflicts = availability_index.find_conflicts(
+            db, room_id, start_date, end_date, exclude_booking_id
         )
 
-        # Исключаем текущее бронирование при редактировании
-        if exclude_booking_id:
-            query = query.filter(Booking.id != exclude_booking_id)
-
-        # Если нет пересечений - комната доступна
-        conflicts_count = query.count()
-
         # Логирование для отладки
-        if conflicts_count > 0:
-            conflicts = query.all()
-            print(f"[BookingService] Найдено {conflicts_count} конфликтов для комнаты {room_id}")
-            for conflict in conflicts:
-                print(f"  - Booking #{conflict.id}: {conflict.start_date} - {conflict.end_date}")
+        if conflicts:
+            print(f"[BookingService] Найдено {len(conflicts)} конфликтов для комнаты {room_id}")
+            for conflict_start, conflict_end, conflict_id in conflicts:
+                print(f"  - Booking #{conflict_id}: {conflict_start} - {conflict_end}")
 
-        return conflicts_count == 0
\ No newline at end of file
+        return not conflicts
@@ -0,0 +1,109 @@
+import html
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.booking import Booking
+from ..models.room import Room
+
+# Ограничение Telegram на длину одного сообщения
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Запас под строку "(2/3)", которая добавляется к частям длинного отчёта
+_PART_HEADER_RESERVE = 16
+
+
+def _telegram_length(text: str) -> int:
+    # Telegram считает длину в UTF-16: эмодзи занимают две единицы
+    return len(text.encode("utf-16-le")) // 2
+
+
+@dataclass
+class DailyReport:
+    """Брони на день: кто живёт сегодня, кто заезжает и выезжает завтра"""
+    day: date
+    in_house: List[Tuple[str, Optional[str]]] = field(default_factory=list)  # (номер комнаты, гость)
+    arrivals: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+    departures: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+
+
+class DailyReportService:
+    @staticmethod
+    def collect(db: Session, day: date) -> DailyReport:
+        """
+        Один запрос по индексу дат вместе с номерами комнат: брони,
+        задевающие сегодня или завтра, раскладываются по спискам в памяти.
+        """
+        tomorrow = day + timedelta(days=1)
+        rows = db.query(
+            Booking.start_date, Booking.end_date, Booking.guest_name, Room.room_number
+        ).join(Room, Room.id == Booking.room_id).filter(
+            Booking.start_date <= tomorrow,
+            Booking.end_date >= day
+        ).order_by(Room.room_number, Booking.start_date).all()
+
+        report = DailyReport(day=day)
+        for start_date, end_date, guest_name, room_number in rows:
+            entry = (room_number, guest_name)
+            if start_date <= day:
+                report.in_house.append(entry)
+            if start_date == tomorrow:
+                report.arrivals.append(entry)
+            if end_date == tomorrow:
+                report.departures.append(entry)
+        return report
+
+    @staticmethod
+    def render(report: DailyReport) -> List[str]:
+        """Строки отчёта в HTML-разметке Telegram"""
+        lines = ["📊 <b>Kunlik hisobot</b>", ""]
+        lines.append(f"📅 Sana: {report.day.strftime('%d.%m.%Y')}")
+
+        sections = (
+            ("🏠 Bugun band xonalar", report.in_house),
+            ("➡️ Ertaga kirish", report.arrivals),
+            ("⬅️ Ertaga chiqish", report.departures),
+        )
+        for title, entries in sections:
+            lines.append("")
+            lines.append(f"{title}: {len(entries)}")
+            for room_number, guest_name in entries:
+                # Имя гостя вводят пользователи — экранируем для parse_mode=HTML
+                lines.append(f"  • №{html.escape(str(room_number))} - {html.escape(guest_name or 'Mehmon')}")
+        return lines
+
+    @staticmethod
+    def split(lines: List[str], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+        """
+        Склеивает строки в сообщения не длиннее limit, разрывая только между
+        строками. Если частей несколько, каждая начинается с "(i/n)".
+        """
+        budget = limit - _PART_HEADER_RESERVE
+        parts: List[List[str]] = [[]]
+        size = 0
+        for line in lines:
+            # Строка длиннее лимита сама по себе — режем по символам
+            while _telegram_length(line) > budget:
+                cut = budget
+                while _telegram_length(line[:cut]) > budget:
+                    cut -= 1
+                head, line = line[:cut], line[cut:]
+                if parts[-1]:
+                    parts.append([])
+                parts[-1].append(head)
+                parts.append([])
+                size = 0
+
+            line_size = _telegram_length(line) + 1  # + перевод строки
+            if parts[-1] and size + line_size > budget:
+                parts.append([])
+                size = 0
+            parts[-1].append(line)
+            size += line_size
+
+        messages = ["\n".join(part) for part in parts if part]
+        if len(messages) > 1:
+            total = len(messages)
+            messages = [f"({number}/{total})\n{message}" for number, message in enumerate(messages, 1)]
+        return messages
@@ -0,0 +1,108 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Dict, Optional, Tuple
+from datetime import date, timedelta
+import logging
+
+from ..models.daily_stats import DailyRoomStat
+from ..models.booking import Booking
+from ..models.room import Room
+
+logger = logging.getLogger(__name__)
+
+_COUNTERS = ("occupied", "revenue", "check_ins", "check_outs")
+
+
+def _upsert(db: Session, rows: list):
+    """INSERT ... ON CONFLICT (date, room_id) DO UPDATE SET counter = counter + excluded.counter"""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    table = DailyRoomStat.__table__
+
+    stmt = insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.date, table.c.room_id],
+        set_={name: table.c[name] + stmt.excluded[name] for name in _COUNTERS}
+    )
+    db.execute(stmt)
+
+
+class DailyStatsService:
+    @staticmethod
+    def _booking_rows(room_id: int, start_date: date, end_date: date, price: float, sign: int) -> Dict[Tuple, dict]:
+        rows: Dict[Tuple, dict] = {}
+
+        def row(day: date) -> dict:
+            return rows.setdefault((day, room_id), {
+                "date": day, "room_id": room_id,
+                "occupied": 0, "revenue": 0.0, "check_ins": 0, "check_outs": 0
+            })
+
+        day = start_date
+        while day < end_date:
+            night = row(day)
+            night["occupied"] += sign
+            night["revenue"] += sign * price
+            day += timedelta(days=1)
+        row(start_date)["check_ins"] += sign
+        row(end_date)["check_outs"] += sign
+        return rows
+
+    @staticmethod
+    def room_price(db: Session, room_id: int) -> float:
+        """Текущая цена ночи комнаты — для новой брони"""
+        return db.query(Room.price_per_night).filter(Room.id == room_id).scalar() or 0
+
+    @staticmethod
+    def booking_price(db: Session, booking: Booking) -> float:
+        """Цена ночи, с которой бронь вошла в rollup (у броней до миграции 0009 её может не быть)"""
+        if booking.price_per_night is not None:
+            return booking.price_per_night
+        return DailyStatsService.room_price(db, booking.room_id)
+
+    @staticmethod
+    def apply_booking(db: Session, room_id: int, start_date: date, end_date: date,
+                      price: Optional[float], sign: int = 1):
+        """
+        Добавляет (sign=1) или вычитает (sign=-1) бронь из rollup по цене ночи
+        самой брони: вычитается ровно та выручка, что была добавлена.
+        Выполняется в транзакции самой брони, коммит делает вызывающий код.
+        """
+        rows = DailyStatsService._booking_rows(room_id, start_date, end_date, price or 0, sign)
+        _upsert(db, list(rows.values()))
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Полностью пересчитывает daily_room_stats из bookings, возвращает число строк"""
+        bookings = db.query(
+            Booking.room_id,
+            Booking.start_date,
+            Booking.end_date,
+            func.coalesce(Booking.price_per_night, Room.price_per_night)
+        ).join(Room).yield_per(1000)
+
+        totals: Dict[Tuple, dict] = {}
+        for room_id, start_date, end_date, price in bookings:
+            for key, delta in DailyStatsService._booking_rows(room_id, start_date, end_date, price or 0, 1).items():
+                total = totals.setdefault(key, dict(delta, **{name: 0 for name in _COUNTERS}))
+                for name in _COUNTERS:
+                    total[name] += delta[name]
+
+        db.query(DailyRoomStat).delete(synchronize_session=False)
+        rows = list(totals.values())
+        if rows:
+            db.execute(DailyRoomStat.__table__.insert(), rows)
+        db.commit()
+        return len(rows)
+
+    @staticmethod
+    def ensure_backfilled(db: Session):
+        """Заполняет rollup при первом запуске на базе, где брони уже есть"""
+        has_stats = db.query(DailyRoomStat.date).first() is not None
+        has_bookings = db.query(Booking.id).first() is not None
+        if has_bookings and not has_stats:
+            count = DailyStatsService.rebuild(db)
+            logger.info(f"daily_room_stats backfilled: {count} rows")
@@ -0,0 +1,118 @@
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config.settings import get_settings
+from .analytics_service import AnalyticsService
+
+settings = get_settings()
+
+# Поля брони, от которых зависят показатели дашборда
+_DASHBOARD_FIELDS = {"room_id", "start_date", "end_date"}
+
+
+class CacheBackend:
+    """Интерфейс хранилища снимков. Общий backend (например, Redis) реализует те же методы."""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """In-process backend: словарь с временем жизни записей"""
+
+    def __init__(self):
+        self._items: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + ttl_seconds)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class DashboardCache:
+    """
+    Снимок AnalyticsService.get_dashboard_stats на текущий день.
+    Сбрасывается событиями броней из manager.broadcast_booking_update,
+    TTL — лишь страховка для изменений, прошедших мимо этих событий.
+    Снимок, который считался во время сброса, не сохраняется: он мог не
+    увидеть изменение (см. generation).
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None,
+                 ttl_seconds: float = settings.dashboard_cache_ttl_seconds):
+        self.backend = backend or LocalCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Номер сброса: растёт в invalidate, сверяется перед сохранением снимка
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(day: date) -> str:
+        return f"dashboard:{day.isoformat()}"
+
+    def get_stats(self, db: Session) -> Dict[str, Any]:
+        key = self._key(date.today())
+        stats = self.backend.get(key)
+        if stats is not None:
+            self.hits += 1
+            return stats
+
+        self.misses += 1
+        generation = self.generation
+        stats = AnalyticsService.get_dashboard_stats(db)
+        with self._lock:
+            if generation == self.generation:
+                self.backend.set(key, stats, self.ttl_seconds)
+        return stats
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self.backend.delete(self._key(date.today()))
+
+    def on_booking_update(self, booking_id: int, action: str, data: dict):
+        """Слушатель событий броней: правки только имени гостя или заметок дашборд не меняют"""
+        if action == "update" and not _DASHBOARD_FIELDS.intersection(data or {}):
+            return
+        self.invalidate()
+
+    def counters(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total * 100, 1) if total else 0
+        }
+
+
+dashboard_cache = DashboardCache()
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from ..config.settings import get_settings
+from ..utils.concurrency import run_sync
+from .export_service import (
+    ExportService, ExportFormat,
+    BOOKING_COLUMNS, ROOM_COLUMNS, OCCUPANCY_COLUMNS
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Как часто (в строках) дочерний процесс обновляет прогресс в файле состояния
+PROGRESS_EVERY_ROWS = 5000
+# Задача в статусе queued/running, чьё состояние не менялось столько секунд,
+# считается брошенной (процесс пула погиб) и удаляется очисткой
+ABANDONED_JOB_SECONDS = 24 * 60 * 60
+# Статусы, при которых файлы задачи ещё нужны дочернему процессу
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _state_path(jobs_dir: str, job_id: str) -> str:
+    return os.path.join(jobs_dir, f"{job_id}.json")
+
+
+def _read_state(jobs_dir: str, job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_state_path(jobs_dir, job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_state(jobs_dir: str, state: Dict[str, Any]):
+    # Атомарная запись: состояние читают другие процессы и воркеры
+    path = _state_path(jobs_dir, state["id"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _update_state(jobs_dir: str, job_id: str, **changes):
+    state = _read_state(jobs_dir, job_id) or {"id": job_id}
+    state.update(changes)
+    _write_state(jobs_dir, state)
+
+
+def _counting(rows: Iterable, total: int, jobs_dir: str, job_id: str) -> Iterator:
+    """Пропускает строки насквозь и периодически пишет прогресс"""
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_EVERY_ROWS == 0:
+            percent = min(int(done / total * 100), 99) if total else 0
+            _update_state(jobs_dir, job_id, progress=percent, rows=done)
+
+
+def _run_export_job(job_id: str, kind: str, export_format: str, params: Dict[str, Any], jobs_dir: str):
+    """
+    Выполняется в дочернем процессе пула (spawn: свой engine и пул соединений,
+    ничего не наследуется от родителя). Результат пишется во временный файл
+    и переименовывается по готовности.
+    """
+    from ..database import SessionLocal
+    from ..models.booking import Booking
+    from ..models.room import Room
+
+    export_format = ExportFormat(export_format)
+    start_date = date.fromisoformat(params["start_date"]) if params.get("start_date") else None
+    end_date = date.fromisoformat(params["end_date"]) if params.get("end_date") else None
+    path = os.path.join(jobs_dir, f"{job_id}.{export_format.value}")
+    _update_state(jobs_dir, job_id, status="running", started_at=datetime.utcnow().isoformat())
+
+    db = SessionLocal()
+    try:
+        with open(f"{path}.part", "wb") as output:
+            if kind == "analytics" and export_format == ExportFormat.xlsx:
+                output.write(ExportService.export_analytics_to_excel(
+                    db, start_date, end_date,
+                    progress=lambda percent: _update_state(jobs_dir, job_id, progress=percent)
+                ))
+            else:
+                if kind == "bookings":
+                    query = db.query(Booking.id)
+                    if start_date:
+                        query = query.filter(Booking.end_date >= start_date)
+                    if end_date:
+                        query = query.filter(Booking.start_date <= end_date)
+                    total = query.count()
+                    title, columns = "Bronlar", BOOKING_COLUMNS
+                    rows = ExportService.iter_booking_rows(db, start_date, end_date)
+                elif kind == "rooms":
+                    total = db.query(Room.id).count()
+                    title, columns = "Xonalar", ROOM_COLUMNS
+                    rows = ExportService.iter_room_rows(db)
+                else:
+                    total = (end_date - start_date).days + 1
+                    title, columns = "Bandlik", OCCUPANCY_COLUMNS
+                    rows = ExportService.iter_occupancy_rows(db, start_date, end_date)
+
+                rows = _counting(rows, total, jobs_dir, job_id)
+                for chunk in ExportService.stream(export_format, title, columns, rows):
+                    output.write(chunk)
+
+        os.replace(f"{path}.part", path)
+        _update_state(
+            jobs_dir, job_id,
+            status="done", progress=100, size=os.path.getsize(path),
+            finished_at=datetime.utcnow().isoformat()
+        )
+    except Exception as e:
+        logger.exception(f"Export job {job_id} failed")
+        if os.path.exists(f"{path}.part"):
+            os.remove(f"{path}.part")
+        _update_state(jobs_dir, job_id, status="failed", error=str(e), finished_at=datetime.utcnow().isoformat())
+    finally:
+        db.close()
+
+
+class ExportJobManager:
+    """
+    Фоновые выгрузки в пуле процессов. Состояние задач и готовые файлы лежат
+    на диске в jobs_dir, поэтому статус виден из любого воркера uvicorn.
+    """
+
+    def __init__(
+            self,
+            jobs_dir: str = settings.export_jobs_dir,
+            max_workers: int = settings.export_jobs_workers,
+            ttl_seconds: int = settings.export_jobs_ttl_seconds
+    ):
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers
+        self.ttl_seconds = ttl_seconds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Задачи этого воркера, ещё не завершённые в пуле: job_id -> Future
+        self._pending: Dict[str, Future] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, а не fork: дочерний процесс не наследует потоки, блокировки
+            # и соединения БД родителя
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, kind: str, export_format: ExportFormat, params: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        state = {
+            "id": job_id,
+            "kind": kind,
+            "format": export_format.value,
+            "params": params,
+            "user_id": user_id,
+            "status": "queued",
+            "progress": 0,
+            "rows": 0,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        _write_state(self.jobs_dir, state)
+        future = self._get_executor().submit(
+            _run_export_job, job_id, kind, export_format.value, params, self.jobs_dir
+        )
+        self._pending[job_id] = future
+        future.add_done_callback(lambda _: self._pending.pop(job_id, None))
+        return state
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # job_id приходит из URL — пускаем только hex, чтобы не выйти из каталога
+        if not job_id.isalnum():
+            return None
+        return _read_state(self.jobs_dir, job_id)
+
+    def file_path(self, state: Dict[str, Any]) -> str:
+        return os.path.join(self.jobs_dir, f"{state['id']}.{state['format']}")
+
+    def _is_active(self, job_id: str, now: float) -> bool:
+        """Задача ещё выполняется (или ждёт в очереди) и не брошена"""
+        state = _read_state(self.jobs_dir, job_id)
+        if state is None or state.get("status") not in ACTIVE_STATUSES:
+            return False
+        try:
+            return os.path.getmtime(_state_path(self.jobs_dir, job_id)) >= now - ABANDONED_JOB_SECONDS
+        except FileNotFoundError:
+            return False
+
+    def cleanup_expired(self) -> int:
+        """
+        Удаляет файлы старше ttl_seconds, возвращает число удалённых. Файлы
+        задач в статусе queued/running не трогает: долгая выгрузка может
+        не менять .part-файл дольше ttl_seconds.
+        """
+        if not os.path.isdir(self.jobs_dir):
+            return 0
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+        active: Dict[str, bool] = {}
+        removed = 0
+        for name in os.listdir(self.jobs_dir):
+            path = os.path.join(self.jobs_dir, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                # {job_id}.json, {job_id}.json.tmp, {job_id}.{format}[.part]
+                job_id = name.split(".", 1)[0]
+                if job_id not in active:
+                    active[job_id] = self._is_active(job_id, now)
+                if active[job_id]:
+                    continue
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    async def run_cleanup_loop(self, interval_seconds: float = 600):
+        """Периодическая очистка, запускается из lifespan"""
+        while True:
+            try:
+                removed = await run_sync(self.cleanup_expired)
+                if removed:
+                    logger.info(f"Removed {removed} expired export files")
+            except Exception as e:
+                logger.error(f"Export cleanup failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def shutdown(self):
+        """
+        Останавливает пул. Задачи, которые так и не начались, отменяются
+        и помечаются failed — иначе они навсегда остались бы в queued.
+        """
+        if self._executor is not None:
+            pending = list(self._pending.items())
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            for job_id, future in pending:
+                if future.cancelled():
+                    _update_state(
+                        self.jobs_dir, job_id,
+                        status="failed", error="Cancelled on shutdown", finished_at=datetime.utcnow().isoformat()
+                    )
+
+
+export_jobs = ExportJobManager()
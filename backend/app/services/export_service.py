@@ -1,117 +1,298 @@
 from sqlalchemy.orm import Session
 from datetime import date, datetime
-from typing import Optional
+from enum import Enum
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from io import BytesIO
+from io import BytesIO, StringIO
+import csv
+import json
+import tempfile
+import xlsxwriter
 
 from ..models.room import Room
 from ..models.booking import Booking
+from ..models.user import User
 from ..services.analytics_service import AnalyticsService
+from ..services.room_service import RoomService
 
+# Сколько строк читать из БД за раз и каким куском отдавать файл клиенту
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
 
-class ExportService:
-    @staticmethod
-    def export_rooms_to_excel(db: Session) -> bytes:
-        """Export all rooms to Excel"""
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Xonalar"
+# Колонки выгрузок: (ключ для csv/jsonl/parquet, заголовок для Excel, тип для parquet)
+BOOKING_COLUMNS = [
+    ("id", "ID", "int"),
+    ("room_number", "Xona", "str"),
+    ("start_date", "Kirish sanasi", "date"),
+    ("end_date", "Chiqish sanasi", "date"),
+    ("guest_name", "Mehmon", "str"),
+    ("notes", "Izohlar", "str"),
+    ("created_at", "Yaratilgan", "datetime"),
+    ("created_by", "Yaratgan", "str"),
+]
 
-        # Headers
-        headers = ["ID", "Xona raqami", "Xona turi", "Holati", "Yaratilgan"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.font = Font(color="FFFFFF", bold=True)
-
-        # Data
-        rooms = db.query(Room).all()
-        for row, room in enumerate(rooms, 2):
-            ws.cell(row=row, column=1, value=room.id)
-            ws.cell(row=row, column=2, value=room.room_number)
-            ws.cell(row=row, column=3, value=room.room_type.value if room.room_type else "")
-            ws.cell(row=row, column=4, value="Bo'sh" if room.is_available else "Band")
-            ws.cell(row=row, column=5, value=room.created_at.strftime("%Y-%m-%d %H:%M"))
-
-        # Auto-adjust columns
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2) * 1.2
-            ws.column_dimensions[column_letter].width = adjusted_width
+ROOM_COLUMNS = [
+    ("id", "ID", "int"),
+    ("room_number", "Xona raqami", "str"),
+    ("room_type", "Xona turi", "str"),
+    ("status", "Holati", "str"),
+    ("created_at", "Yaratilgan", "datetime"),
+]
 
-        # Save to bytes
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.getvalue()
+OCCUPANCY_COLUMNS = [
+    ("date", "Sana", "date"),
+    ("occupied", "Band", "int"),
+    ("available", "Bo'sh", "int"),
+    ("occupancy_rate", "Bandlik %", "float"),
+]
+
+
+class ExportFormat(str, Enum):
+    xlsx = "xlsx"
+    csv = "csv"
+    jsonl = "jsonl"
+    parquet = "parquet"
+
+
+MEDIA_TYPES = {
+    ExportFormat.xlsx: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ExportFormat.csv: "text/csv; charset=utf-8",
+    ExportFormat.jsonl: "application/x-ndjson",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+
+def _plain(value):
+    """Значение для текстовых форматов: даты в ISO, None как есть"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _excel_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    return value
 
+
+def _stream_file(output) -> Iterator[bytes]:
+    output.seek(0)
+    while True:
+        chunk = output.read(EXPORT_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+class ExportService:
     @staticmethod
-    def export_bookings_to_excel(db: Session, start_date: Optional[date] = None,
-                                 end_date: Optional[date] = None) -> bytes:
-        """Export bookings to Excel"""
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Bronlar"
+    def parquet_available() -> bool:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
 
-        # Headers
-        headers = ["ID", "Xona", "Kirish sanasi", "Chiqish sanasi", "Mehmon", "Izohlar", "Yaratilgan", "Yaratgan"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            cell.font = Font(color="FFFFFF", bold=True)
+    # --- Источники строк ---
 
-        # Query bookings
-        query = db.query(Booking)
+    @staticmethod
+    def iter_booking_rows(db: Session, start_date: Optional[date] = None,
+                          end_date: Optional[date] = None) -> Iterator[Tuple]:
+        """
+        Брони плоской выборкой только нужных колонок, без ленивых загрузок
+        booking.room / booking.user на каждую строку, порциями через yield_per.
+        """
+        query = db.query(
+            Booking.id,
+            Room.room_number,
+            Booking.start_date,
+            Booking.end_date,
+            Booking.guest_name,
+            Booking.notes,
+            Booking.created_at,
+            User.first_name,
+            User.last_name
+        ).outerjoin(
+            Room, Booking.room_id == Room.id
+        ).outerjoin(
+            User, Booking.created_by == User.id
+        )
         if start_date:
             query = query.filter(Booking.end_date >= start_date)
         if end_date:
             query = query.filter(Booking.start_date <= end_date)
 
-        bookings = query.order_by(Booking.start_date).all()
-
-        # Data
-        for row, booking in enumerate(bookings, 2):
-            ws.cell(row=row, column=1, value=booking.id)
-            ws.cell(row=row, column=2, value=f"№{booking.room.room_number}" if booking.room else "")
-            ws.cell(row=row, column=3, value=booking.start_date.strftime("%Y-%m-%d"))
-            ws.cell(row=row, column=4, value=booking.end_date.strftime("%Y-%m-%d"))
-            ws.cell(row=row, column=5, value=booking.guest_name or "")
-            ws.cell(row=row, column=6, value=booking.notes or "")
-            ws.cell(row=row, column=7, value=booking.created_at.strftime("%Y-%m-%d %H:%M"))
-            ws.cell(row=row, column=8, value=booking.user.full_name if booking.user else "")
-
-        # Auto-adjust columns
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2) * 1.2
-            ws.column_dimensions[column_letter].width = adjusted_width
+        for booking in query.order_by(Booking.start_date).yield_per(EXPORT_BATCH_SIZE):
+            yield (
+                booking.id,
+                booking.room_number,
+                booking.start_date,
+                booking.end_date,
+                booking.guest_name,
+                booking.notes,
+                booking.created_at,
+                User.format_full_name(booking.first_name, booking.last_name)
+            )
 
-        # Save to bytes
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output.getvalue()
+    @staticmethod
+    def iter_room_rows(db: Session) -> Iterator[Tuple]:
+        for room in RoomService.get_rooms_with_status(db):
+            yield (
+                room.id,
+                room.room_number,
+                room.room_type or "",
+                "Bo'sh" if room.is_available else "Band",
+                room.created_at
+            )
+
+    @staticmethod
+    def iter_occupancy_rows(db: Session, start_date: date, end_date: date) -> Iterator[Tuple]:
+        for daily in AnalyticsService.get_occupancy_stats(db, start_date, end_date)["daily_stats"]:
+            yield (
+                date.fromisoformat(daily["date"]),
+                daily["occupied"],
+                daily["available"],
+                daily["occupancy_rate"]
+            )
+
+    # --- Форматы ---
 
     @staticmethod
-    def export_analytics_to_excel(db: Session, start_date: date, end_date: date) -> bytes:
-        """Export analytics report to Excel"""
+    def stream(export_format: ExportFormat, sheet_title: str, columns: List[Tuple],
+               rows: Iterable[Tuple]) -> Iterator[bytes]:
+        """Генератор файла в выбранном формате, строки читаются по одной"""
+        writers = {
+            ExportFormat.xlsx: lambda: ExportService.stream_excel(sheet_title, columns, rows),
+            ExportFormat.csv: lambda: ExportService.stream_csv(columns, rows),
+            ExportFormat.jsonl: lambda: ExportService.stream_jsonl(columns, rows),
+            ExportFormat.parquet: lambda: ExportService.stream_parquet(columns, rows),
+        }
+        return writers[export_format]()
+
+    @staticmethod
+    def stream_excel(sheet_title: str, columns: List[Tuple], rows: Iterable[Tuple]) -> Iterator[bytes]:
+        """
+        Excel через xlsxwriter в режиме constant_memory: строки сбрасываются во
+        временный файл, ширина колонок считается на лету — память не зависит
+        от числа строк. Клиенту файл отдаётся кусками после закрытия книги.
+        """
+        headers = [header for _, header, _ in columns]
+
+        with tempfile.TemporaryFile() as output:
+            wb = xlsxwriter.Workbook(output, {"constant_memory": True})
+            ws = wb.add_worksheet(sheet_title)
+            header_format = wb.add_format({"bold": True, "font_color": "#FFFFFF", "bg_color": "#366092"})
+            widths = [len(header) for header in headers]
+
+            def write_row(row: int, values: Iterable, cell_format=None):
+                for col, value in enumerate(values):
+                    value = _excel_value(value)
+                    ws.write(row, col, value, cell_format)
+                    widths[col] = max(widths[col], len(str(value)))
+
+            # Headers
+            write_row(0, headers, header_format)
+
+            # Data
+            for row, values in enumerate(rows, 1):
+                write_row(row, values)
+
+            # Auto-adjust columns (xlsxwriter пишет <cols> при закрытии книги)
+            for col, max_length in enumerate(widths):
+                ws.set_column(col, col, (max_length + 2) * 1.2)
+
+            wb.close()
+            yield from _stream_file(output)
+
+    @staticmethod
+    def stream_csv(columns: List[Tuple], rows: Iterable[Tuple]) -> Iterator[bytes]:
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([key for key, _, _ in columns])
+
+        for i, values in enumerate(rows, 1):
+            writer.writerow(["" if value is None else _plain(value) for value in values])
+            if i % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def stream_jsonl(columns: List[Tuple], rows: Iterable[Tuple]) -> Iterator[bytes]:
+        keys = [key for key, _, _ in columns]
+        lines = []
+        for values in rows:
+            record = {key: _plain(value) for key, value in zip(keys, values)}
+            lines.append(json.dumps(record, ensure_ascii=False))
+            if len(lines) >= EXPORT_BATCH_SIZE:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    @staticmethod
+    def stream_parquet(columns: List[Tuple], rows: Iterable[Tuple]) -> Iterator[bytes]:
+        """Parquet пачками по EXPORT_BATCH_SIZE строк (колоночные record batch)"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "str": pa.string(),
+            "date": pa.date32(),
+            "datetime": pa.timestamp("us"),
+        }
+        schema = pa.schema([(key, types[kind]) for key, _, kind in columns])
+
+        def write_batch(writer, batch: List[Tuple]):
+            arrays = [pa.array(list(column), type=field.type) for column, field in zip(zip(*batch), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+        with tempfile.TemporaryFile() as output:
+            with pq.ParquetWriter(output, schema) as writer:
+                batch = []
+                for values in rows:
+                    batch.append(values)
+                    if len(batch) >= EXPORT_BATCH_SIZE:
+                        write_batch(writer, batch)
+                        batch = []
+                if batch:
+                    write_batch(writer, batch)
+            yield from _stream_file(output)
+
+    # --- Готовые выгрузки ---
+
+    @staticmethod
+    def export_rooms_to_excel(db: Session) -> bytes:
+        """Export all rooms to Excel"""
+        return b"".join(ExportService.stream_excel("Xonalar", ROOM_COLUMNS, ExportService.iter_room_rows(db)))
+
+    @staticmethod
+    def stream_bookings_to_excel(db: Session, start_date: Optional[date] = None,
+                                 end_date: Optional[date] = None) -> Iterator[bytes]:
+        """Export bookings to Excel as a stream of chunks"""
+        return ExportService.stream_excel(
+            "Bronlar", BOOKING_COLUMNS, ExportService.iter_booking_rows(db, start_date, end_date)
+        )
+
+    @staticmethod
+    def export_bookings_to_excel(db: Session, start_date: Optional[date] = None,
+                                 end_date: Optional[date] = None) -> bytes:
+        """Export bookings to Excel"""
+        return b"".join(ExportService.stream_bookings_to_excel(db, start_date, end_date))
+
+    @staticmethod
+    def export_analytics_to_excel(db: Session, start_date: date, end_date: date,
+                                  progress: Optional[Callable[[int], None]] = None) -> bytes:
+        """Export analytics report to Excel. progress получает процент готовности."""
+        progress = progress or (lambda percent: None)
         wb = Workbook()
 
         # 1. Occupancy Stats
@@ -140,6 +321,8 @@ class ExportService:
             ws1.cell(row=i, column=3, value=daily['available'])
             ws1.cell(row=i, column=4, value=f"{daily['occupancy_rate']}%")
 
+        progress(30)
+
         # 2. Room Type Stats
         ws2 = wb.create_sheet("Xona turlari")
         room_type_stats = AnalyticsService.get_room_type_stats(db, start_date, end_date)
@@ -155,18 +338,21 @@ class ExportService:
             ws2.cell(row=row, column=4, value=stat['total_booked_days'])
             ws2.cell(row=row, column=5, value=f"{stat['occupancy_rate']}%")
 
+        progress(60)
+
         # 3. Trends
         ws3 = wb.create_sheet("Tendensiyalar")
         trends = AnalyticsService.get_booking_trends(db, 6)
 
-        ws3.cell(row=1, column=1, value="Oy")
+        ws3.cell(row=1, column=1, value="Sana")
         ws3.cell(row=1, column=2, value="Bronlar soni")
-        ws3.cell(row=1, column=3, value="O'rtacha muddat")
 
-        for row, trend in enumerate(trends, 2):
-            ws3.cell(row=row, column=1, value=trend['month'])
-            ws3.cell(row=row, column=2, value=trend['bookings_count'])
-            ws3.cell(row=row, column=3, value=trend['average_duration'])
+        # get_booking_trends возвращает {"labels": [...], "data": [...]}
+        for row, (label, count) in enumerate(zip(trends["labels"], trends["data"]), 2):
+            ws3.cell(row=row, column=1, value=label)
+            ws3.cell(row=row, column=2, value=count)
+
+        progress(80)
 
         # Format all sheets
         for ws in wb.worksheets:
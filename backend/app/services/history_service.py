@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta  # Добавьте timedelta здесь!
 from ..models.history import HistoryLog
+from .history_writer import history_writer
 
 
 class HistoryService:
@@ -15,17 +16,24 @@ class HistoryService:
             changes: Optional[Dict[str, Any]] = None,
             description: Optional[str] = None
     ):
-        """Log an action to history"""
-        history = HistoryLog(
-            user_id=user_id,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            action=action,
-            changes=changes,
-            description=description
-        )
-        db.add(history)
-        db.commit()
+        """
+        Log an action to history in the caller's unit of work.
+        Не коммитит: запись сохраняется коммитом самого изменения
+        (в буферизованном режиме — после него, пачкой).
+        """
+        values = {
+            "user_id": user_id,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "action": action,
+            "changes": changes,
+            "description": description,
+            "created_at": datetime.utcnow()
+        }
+        if history_writer.buffered:
+            history_writer.record(db, values)
+        else:
+            db.add(HistoryLog(**values))
 
     @staticmethod
     def get_entity_history(
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from ..config.settings import get_settings
+from ..database import SessionLocal, engine
+from ..models.history import HistoryLog
+from ..utils.concurrency import run_sync
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Ключ в Session.info для записей истории текущей транзакции
+_PENDING_KEY = "history_pending"
+
+
+class HistoryWriter:
+    """
+    Буферизованная запись истории (settings.history_buffered).
+
+    Записи копятся в Session.info и попадают в общий буфер только после
+    коммита транзакции изменения; при откате они отбрасываются. Буфер
+    сбрасывается в history_logs одним executemany-INSERT периодически,
+    при переполнении и при остановке приложения. Коммит изменения при этом
+    не пишет строку истории вовсе; цена — записи появляются в выборках
+    истории с задержкой до flush_interval_seconds и теряются при аварийном
+    завершении процесса.
+    """
+
+    def __init__(
+            self,
+            buffered: bool = settings.history_buffered,
+            flush_interval_seconds: float = settings.history_flush_interval_seconds,
+            max_buffer_size: int = settings.history_buffer_max_size
+    ):
+        self.buffered = buffered
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_buffer_size = max_buffer_size
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        if buffered:
+            event.listen(SessionLocal, "after_commit", self._after_commit)
+            event.listen(SessionLocal, "after_transaction_end", self._after_transaction_end)
+
+    def record(self, db: Session, values: Dict[str, Any]):
+        """Запись истории, которая станет видна после коммита транзакции db"""
+        db.info.setdefault(_PENDING_KEY, []).append(values)
+
+    def _after_commit(self, session: Session):
+        pending = session.info.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        with self._lock:
+            self._buffer.extend(pending)
+            overflow = len(self._buffer) >= self.max_buffer_size
+        if overflow:
+            # Коммиты идут в пуле потоков, так что сброс здесь не блокирует event loop
+            self.flush()
+
+    def _after_transaction_end(self, session: Session, transaction):
+        # Транзакция закончилась без коммита (откат, close) — её записи не нужны
+        if transaction.parent is None:
+            session.info.pop(_PENDING_KEY, None)
+
+    def flush(self) -> int:
+        """Пишет буфер в history_logs одним executemany, возвращает число строк"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                with engine.begin() as connection:
+                    connection.execute(insert(HistoryLog.__table__), rows)
+            except Exception as e:
+                logger.error(f"Could not write {len(rows)} history records: {e}")
+                with self._lock:
+                    # Вернём записи для следующей попытки, но не дадим буферу расти без предела
+                    self._buffer[:0] = rows[-self.max_buffer_size * 10:]
+                return 0
+            return len(rows)
+
+    async def run_flush_loop(self):
+        """Периодический сброс буфера, запускается из lifespan"""
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await run_sync(self.flush)
+            except Exception as e:
+                logger.error(f"History flush failed: {e}")
+
+
+history_writer = HistoryWriter()
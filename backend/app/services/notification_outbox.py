@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+
+from ..config.settings import get_settings
+from ..database import SessionLocal
+from ..models.notification_outbox import OutboxMessage
+from ..utils.concurrency import run_sync
+from .notification_service import DeliveryResult, notification_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class NotificationOutboxWorker:
+    """
+    Доставка notification_outbox. Воркер забирает пачку сообщений, у которых
+    наступил next_attempt_at, сдвигает их next_attempt_at на lease_seconds
+    (если процесс упадёт посреди отправки, сообщения снова станут доступны)
+    и отправляет параллельно. Повторы делает сам outbox: каждое сообщение
+    пачки получает одну попытку, и вся отправка ограничена send_timeout_seconds,
+    намного меньшим lease_seconds, — иначе аренда истекла бы посреди отправки
+    и сообщение ушло бы дважды. Неудачные откладываются с экспоненциальной
+    задержкой (или на retry_after из 429), после max_attempts попыток получают
+    статус dead; отказ Telegram, который повтор не исправит (бот заблокирован,
+    чат не найден), переводит сообщение в dead сразу.
+
+    В PostgreSQL пачка выбирается с FOR UPDATE SKIP LOCKED, поэтому воркеры
+    разных процессов не ждут друг друга; захват каждой строки к тому же
+    условный (по attempts), что защищает и SQLite, где FOR UPDATE нет.
+    """
+
+    def __init__(
+            self,
+            batch_size: int = settings.notification_outbox_batch_size,
+            poll_interval_seconds: float = settings.notification_outbox_poll_seconds,
+            max_attempts: int = settings.notification_outbox_max_attempts,
+            lease_seconds: float = settings.notification_outbox_lease_seconds,
+            send_timeout_seconds: float = settings.notification_outbox_send_timeout_seconds
+    ):
+        self.batch_size = batch_size
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.send_timeout_seconds = send_timeout_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def wake(self):
+        """Начать доставку, не дожидаясь интервала опроса (после коммита брони)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def claim_batch(self) -> List[Dict]:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            candidates = db.query(OutboxMessage.id, OutboxMessage.attempts).filter(
+                OutboxMessage.status == "pending",
+                OutboxMessage.next_attempt_at <= now
+            ).order_by(OutboxMessage.next_attempt_at, OutboxMessage.id).limit(self.batch_size).with_for_update(
+                skip_locked=True
+            ).all()
+
+            lease_until = now + timedelta(seconds=self.lease_seconds)
+            claimed_ids = []
+            for message_id, attempts in candidates:
+                result = db.execute(
+                    update(OutboxMessage.__table__)
+                    .where(OutboxMessage.id == message_id, OutboxMessage.attempts == attempts)
+                    .values(attempts=attempts + 1, next_attempt_at=lease_until)
+                )
+                if result.rowcount == 1:
+                    claimed_ids.append(message_id)
+            db.commit()
+
+            if not claimed_ids:
+                return []
+            rows = db.query(
+                OutboxMessage.id, OutboxMessage.chat_id, OutboxMessage.text, OutboxMessage.attempts
+            ).filter(OutboxMessage.id.in_(claimed_ids)).all()
+            return [row._asdict() for row in rows]
+        finally:
+            db.close()
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(5 * 2 ** (attempts - 1), 3600))
+
+    def finish_batch(self, batch: List[Dict], results: List[DeliveryResult]):
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            sent_ids = [message["id"] for message, result in zip(batch, results) if result.sent]
+            if sent_ids:
+                db.execute(
+                    update(OutboxMessage.__table__)
+                    .where(OutboxMessage.id.in_(sent_ids))
+                    .values(status="sent", sent_at=now, last_error=None)
+                )
+            for message, result in zip(batch, results):
+                if result.sent:
+                    continue
+                if result.permanent or message["attempts"] >= self.max_attempts:
+                    values = {"status": "dead", "last_error": result.error or "delivery failed"}
+                    logger.error(f"Notification {message['id']} to {message['chat_id']} moved to dead letters")
+                else:
+                    delay = self._retry_delay(message["attempts"])
+                    if result.retry_after:
+                        delay = max(delay, timedelta(seconds=result.retry_after))
+                    values = {"next_attempt_at": now + delay, "last_error": result.error or "delivery failed"}
+                db.execute(
+                    update(OutboxMessage.__table__).where(OutboxMessage.id == message["id"]).values(**values)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _send(self, message: Dict) -> DeliveryResult:
+        try:
+            return await asyncio.wait_for(
+                notification_service.send_once(message["chat_id"], message["text"]), self.send_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            return DeliveryResult(sent=False, error=f"no response in {self.send_timeout_seconds:g}s")
+
+    async def drain_once(self) -> int:
+        """Одна пачка: захват, отправка, фиксация результата. Возвращает размер пачки"""
+        batch = await run_sync(self.claim_batch)
+        if not batch:
+            return 0
+        # Таймаут отсчитывается для всей пачки сразу (wait_for стартует вместе
+        # с gather) и включает ожидание семафора клиента
+        results = await asyncio.gather(*(self._send(message) for message in batch))
+        await run_sync(self.finish_batch, batch, list(results))
+        return len(batch)
+
+    async def run_loop(self):
+        """Фоновая доставка, запускается из lifespan"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                # Полная пачка — вероятно, есть ещё: забираем следующую сразу
+                if await self.drain_once() == self.batch_size:
+                    continue
+            except Exception as e:
+                logger.error(f"Notification outbox delivery failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+notification_outbox = NotificationOutboxWorker()
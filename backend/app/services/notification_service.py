@@ -1,42 +1,180 @@
+import asyncio
+import logging
 import os
+import time
 import httpx
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import date, datetime
 
+from ..config.settings import get_settings
 from ..models.user import User
 from ..models.booking import Booking
 from ..models.room import Room
+from ..models.notification_outbox import OutboxMessage
+from ..utils.concurrency import run_sync
+from .daily_report import DailyReportService
+from .recipient_registry import recipient_registry
 
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class DeliveryResult:
+    """Итог одной попытки отправки"""
+    sent: bool
+    permanent: bool = False  # 4xx кроме 429: неверный chat_id, бот заблокирован — повтор не поможет
+    retry_after: Optional[float] = None  # сколько просит подождать Telegram (429)
+    error: str = ""
 
-class NotificationService:
-    def __init__(self):
-        self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN", "")
-        self.base_url = f"https://api.telegram.org/bot{self.bot_token}"
 
-    async def send_message(self, chat_id: int, text: str, parse_mode: str = "HTML"):
-        """Send message via Telegram Bot API"""
+class NotificationService:
+    """
+    Отправка сообщений в Telegram через один долгоживущий HTTP/2 клиент
+    (соединение и TLS переиспользуются). Рассылка нескольким получателям идёт
+    параллельно, не более max_concurrency запросов одновременно; на 429
+    ждём retry_after из ответа Telegram и повторяем.
+
+    Уведомления о бронях не отправляются из обработчиков API: они пишутся
+    в notification_outbox в транзакции брони, а доставляет их
+    services/notification_outbox.py.
+    """
+
+    def __init__(
+            self,
+            bot_token: Optional[str] = None,
+            api_url: str = settings.telegram_api_url,
+            max_concurrency: int = settings.notification_max_concurrency,
+            max_retries: int = settings.notification_max_retries,
+            timeout_seconds: float = settings.notification_timeout_seconds,
+            transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN", "") if bot_token is None else bot_token
+        self.base_url = f"{api_url.rstrip('/')}/bot{self.bot_token}"
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout_seconds = timeout_seconds
+        # Транспорт httpx вместо сетевого (в тестах — httpx.MockTransport)
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                transport=self.transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        try:
+            return float(response.json()["parameters"]["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            pass
+        header = response.headers.get("Retry-After")
+        return float(header) if header and header.isdigit() else None
+
+    async def send_once(self, chat_id: int, text: str, parse_mode: str = "HTML") -> DeliveryResult:
+        """
+        Одна попытка отправки, без повторов. Повторы решает вызывающий код:
+        send_message ниже или outbox, у которого своё расписание попыток.
+        """
         if not self.bot_token:
-            print("Telegram bot token not configured")
-            return
+            return DeliveryResult(sent=False, error="Telegram bot token not configured")
 
-        url = f"{self.base_url}/sendMessage"
+        client = self._get_client()
         data = {
             "chat_id": chat_id,
             "text": text,
             "parse_mode": parse_mode
         }
-
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=data)
-                if response.status_code != 200:
-                    print(f"Failed to send message: {response.text}")
-        except Exception as e:
-            print(f"Error sending message: {e}")
-
-    async def send_booking_created(self, db: Session, booking: Booking, room: Room, user: User):
-        """Send notification about new booking"""
+            async with self._semaphore:
+                response = await client.post(f"{self.base_url}/sendMessage", json=data)
+        except httpx.HTTPError as e:
+            logger.warning(f"Error sending message to {chat_id}: {e!r}")
+            return DeliveryResult(sent=False, error=repr(e))
+
+        if response.status_code == 200:
+            return DeliveryResult(sent=True)
+        if response.status_code == 429:
+            return DeliveryResult(sent=False, retry_after=self._retry_after(response), error=response.text)
+        if response.status_code < 500:
+            logger.warning(f"Failed to send message to {chat_id}: {response.text}")
+            return DeliveryResult(sent=False, permanent=True, error=response.text)
+        logger.warning(f"Telegram API error {response.status_code} for {chat_id}")
+        return DeliveryResult(sent=False, error=f"HTTP {response.status_code}")
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: str = "HTML") -> bool:
+        """Send message via Telegram Bot API (с повторами при 429/5xx)"""
+        if not self.bot_token:
+            print("Telegram bot token not configured")
+            return False
+
+        for attempt in range(self.max_retries + 1):
+            result = await self.send_once(chat_id, text, parse_mode)
+            if result.sent:
+                return True
+            if result.permanent:
+                return False
+            if attempt < self.max_retries:
+                # Ждём вне семафора, чтобы не занимать слот для других получателей
+                await asyncio.sleep(result.retry_after or 2 ** attempt * 0.5)
+
+        logger.error(f"Giving up sending message to {chat_id} after {self.max_retries + 1} attempts")
+        return False
+
+    async def send_many(self, chat_ids: Iterable[int], text: str) -> int:
+        """Параллельная рассылка одного сообщения, возвращает число доставленных"""
+        chat_ids = list(dict.fromkeys(chat_ids))
+        if not chat_ids:
+            return 0
+        results = await asyncio.gather(*(self.send_message(chat_id, text) for chat_id in chat_ids))
+        return sum(results)
+
+    @staticmethod
+    def enqueue(db: Session, event: str, text: str, exclude_chat_id: Optional[int] = None,
+                dedup_key: Optional[str] = None):
+        """
+        Кладёт сообщение для каждого получателя события в notification_outbox.
+        Получатели берутся из recipient_registry; в тихие часы получателя
+        доставка откладывается до их конца. Не коммитит: строки попадают
+        в БД вместе с транзакцией вызывающего кода. С dedup_key строка
+        получает ключ "<dedup_key>:<chat_id>", и повторная вставка того же
+        сообщения (из другого процесса) нарушит уникальный индекс.
+        """
+        now, utc_now = datetime.now(), datetime.utcnow()
+        for recipient in recipient_registry.recipients(db, event, exclude_chat_id):
+            db.add(OutboxMessage(
+                event=event,
+                chat_id=recipient.chat_id,
+                text=text,
+                next_attempt_at=utc_now + recipient.quiet_delay(now),
+                dedup_key=f"{dedup_key}:{recipient.chat_id}" if dedup_key else None
+            ))
+
+    async def close(self):
+        """Закрывает HTTP-клиент, вызывается из lifespan"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def enqueue_booking_created(self, db: Session, booking, room: Room, user: User):
+        """
+        Queue notification about new booking (in the booking's transaction).
+        booking — Booking или BookingCreate: нужны только даты и имя гостя.
+        """
         # Format dates
         start_date = booking.start_date.strftime("%d.%m.%Y")
         end_date = booking.end_date.strftime("%d.%m.%Y")
@@ -50,14 +188,11 @@ class NotificationService:
             f"🕐 Vaqt: {datetime.now().strftime('%H:%M')}"
         )
 
-        # Send to all admins
-        admins = db.query(User).filter(User.is_admin == True).all()
-        for admin in admins:
-            if admin.telegram_id and admin.telegram_id != user.telegram_id:
-                await self.send_message(admin.telegram_id, message)
+        # Send to all admins except the author
+        self.enqueue(db, "booking_created", message, exclude_chat_id=user.telegram_id)
 
-    async def send_booking_cancelled(self, db: Session, booking: Booking, room: Room, user: User):
-        """Send notification about cancelled booking"""
+    def enqueue_booking_cancelled(self, db: Session, booking: Booking, room: Room, user: User):
+        """Queue notification about cancelled booking (in the booking's transaction)"""
         # Format dates
         start_date = booking.start_date.strftime("%d.%m.%Y")
         end_date = booking.end_date.strftime("%d.%m.%Y")
@@ -72,58 +207,48 @@ class NotificationService:
         )
 
         # Send to all admins
-        admins = db.query(User).filter(User.is_admin == True).all()
-        for admin in admins:
-            if admin.telegram_id:
-                await self.send_message(admin.telegram_id, message)
-
-    async def send_daily_report(self, db: Session):
-        """Send daily report to admins"""
-        today = datetime.now().date()
-        tomorrow = today + timedelta(days=1)
-
-        # Get today's bookings
-        todays_bookings = db.query(Booking).filter(
-            Booking.start_date <= today,
-            Booking.end_date >= today
-        ).all()
-
-        # Get tomorrow's check-ins
-        tomorrows_checkins = db.query(Booking).filter(
-            Booking.start_date == tomorrow
-        ).all()
-
-        # Get tomorrow's check-outs
-        tomorrows_checkouts = db.query(Booking).filter(
-            Booking.end_date == tomorrow
-        ).all()
-
-        # Create report
-        report_lines = ["📊 <b>Kunlik hisobot</b>", ""]
-        report_lines.append(f"📅 Sana: {today.strftime('%d.%m.%Y')}")
-        report_lines.append("")
-
-        report_lines.append(f"🏠 Bugun band xonalar: {len(todays_bookings)}")
-        for booking in todays_bookings:
-            report_lines.append(f"  • №{booking.room.room_number} - {booking.guest_name or 'Mehmon'}")
-
-        report_lines.append("")
-        report_lines.append(f"➡️ Ertaga kirish: {len(tomorrows_checkins)}")
-        for booking in tomorrows_checkins:
-            report_lines.append(f"  • №{booking.room.room_number} - {booking.guest_name or 'Mehmon'}")
-
-        report_lines.append("")
-        report_lines.append(f"⬅️ Ertaga chiqish: {len(tomorrows_checkouts)}")
-        for booking in tomorrows_checkouts:
-            report_lines.append(f"  • №{booking.room.room_number} - {booking.guest_name or 'Mehmon'}")
-
-        message = "\n".join(report_lines)
-
-        # Send to all admins
-        admins = db.query(User).filter(User.is_admin == True).all()
-        for admin in admins:
-            if admin.telegram_id:
-                await self.send_message(admin.telegram_id, message)
+        self.enqueue(db, "booking_cancelled", message)
+
+    async def send_daily_report(self, db: Session, day: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Queue daily report for admins (delivered by the outbox worker).
+        Возвращает размеры и время этапов для журнала запусков планировщика.
+
+        Планировщик работает в каждом воркере и реплике, поэтому отчёт за день
+        ставится в очередь один раз на всех: ключ (daily_report, день, часть,
+        чат) уникален, и транзакция опоздавшего процесса откатывается целиком.
+        """
+        day = day or datetime.now().date()
+
+        def enqueue_report() -> Dict[str, Any]:
+            started = time.perf_counter()
+            report = DailyReportService.collect(db, day)
+            collected = time.perf_counter()
+            messages = DailyReportService.split(DailyReportService.render(report))
+            rendered = time.perf_counter()
+
+            # Send to all admins (длинный отчёт уходит несколькими сообщениями)
+            for part, message in enumerate(messages, 1):
+                self.enqueue(db, "daily_report", message, dedup_key=f"daily_report:{day.isoformat()}:{part}")
+            try:
+                db.commit()
+            except IntegrityError:
+                # Отчёт за этот день уже поставил в очередь другой процесс
+                db.rollback()
+                return {"day": day.isoformat(), "skipped": "already queued"}
+            finished = time.perf_counter()
+
+            return {
+                "day": day.isoformat(),
+                "bookings": len(report.in_house) + len(report.arrivals) + len(report.departures),
+                "messages": len(messages),
+                "query_ms": round((collected - started) * 1000, 3),
+                "render_ms": round((rendered - collected) * 1000, 3),
+                "enqueue_ms": round((finished - rendered) * 1000, 3),
+            }
+
+        # Отчёт читает брони и комнаты одним запросом — в пуле потоков
+        return await run_sync(enqueue_report)
 
 
 notification_service = NotificationService()
\ No newline at end of file
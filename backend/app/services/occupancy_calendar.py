@@ -0,0 +1,154 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..config.settings import get_settings
+from ..models.booking import Booking
+from ..models.room import Room
+from .availability_index import BookingMirror
+
+settings = get_settings()
+
+
+class OccupancyCalendar(BookingMirror):
+    """
+    Матрица занятости комнаты × дни на скользящем горизонте
+    [сегодня - past_days, сегодня + horizon_days).
+
+    Ячейка хранит число броней, занимающих ночь D (start_date <= D < end_date),
+    так что снятие одной брони не "освобождает" ночь, занятую другой.
+    Все запросы — векторные операции numpy без обращения к bookings.
+    """
+
+    def __init__(
+            self,
+            past_days: int = settings.occupancy_calendar_past_days,
+            horizon_days: int = settings.occupancy_calendar_horizon_days
+    ):
+        super().__init__()
+        self.past_days = past_days
+        self.horizon_days = horizon_days
+        self.origin: Optional[date] = None
+        self.room_ids: List[int] = []
+        self.room_types = np.array([], dtype=object)
+        self._room_rows: Dict[int, int] = {}
+        self._bookings: Dict[int, tuple] = {}  # booking_id -> (room_id, start, end)
+        self._counts = np.zeros((0, 0), dtype=np.uint16)
+
+    @property
+    def days(self) -> int:
+        return self.past_days + self.horizon_days
+
+    @property
+    def end(self) -> date:
+        return self.origin + timedelta(days=self.days)
+
+    def _is_current(self) -> bool:
+        # Горизонт сдвигается вместе с текущей датой
+        return self.origin == date.today() - timedelta(days=self.past_days)
+
+    def _build(self, db: Session):
+        rooms = db.query(Room.id, Room.room_type).order_by(Room.id).all()
+        bookings = db.query(Booking.id, Booking.room_id, Booking.start_date, Booking.end_date).all()
+
+        self.origin = date.today() - timedelta(days=self.past_days)
+        self.room_ids = [room_id for room_id, _ in rooms]
+        self.room_types = np.array([room_type for _, room_type in rooms], dtype=object)
+        self._room_rows = {room_id: row for row, room_id in enumerate(self.room_ids)}
+        self._counts = np.zeros((len(rooms), self.days), dtype=np.uint16)
+        self._bookings = {}
+        for booking_id, room_id, start, end in bookings:
+            self._mark(booking_id, room_id, start, end)
+
+    def _slice(self, start: date, end: date) -> slice:
+        first = max((start - self.origin).days, 0)
+        last = min((end - self.origin).days, self.days)
+        return slice(first, max(first, last))
+
+    def _mark(self, booking_id: int, room_id: int, start: date, end: date):
+        self._bookings[booking_id] = (room_id, start, end)
+        row = self._room_rows.get(room_id)
+        if row is not None:
+            self._counts[row, self._slice(start, end)] += 1
+
+    def _apply_add(self, booking: Booking):
+        if booking.room_id not in self._room_rows:
+            # Новая комната — проще перестроить матрицу (_remember перезагрузит)
+            self._version = None
+        self._apply_remove(booking.id)
+        self._mark(booking.id, booking.room_id, booking.start_date, booking.end_date)
+
+    def _apply_remove(self, booking_id: int):
+        previous = self._bookings.pop(booking_id, None)
+        if previous is None:
+            return
+        room_id, start, end = previous
+        row = self._room_rows.get(room_id)
+        if row is not None:
+            cells = self._counts[row, self._slice(start, end)]
+            cells -= (cells > 0).astype(np.uint16)
+
+    def covers(self, start: date, end: date) -> bool:
+        """Попадает ли период [start, end) в горизонт календаря"""
+        return self._loaded and self.origin <= start and end <= self.end
+
+    def ready(self, db: Session, start: date, end: date) -> bool:
+        """
+        Синхронизирует календарь с БД и сообщает, можно ли ответить на запрос
+        по периоду [start, end). Если нет — вызывающий код идёт в БД сам.
+        """
+        self.sync(db)
+        return self.covers(start, end)
+
+    def _occupied(self, start: date, end: date) -> np.ndarray:
+        return self._counts[:, self._slice(start, end)] > 0
+
+    def occupied_room_ids(self, day: date) -> set:
+        """Комнаты, занятые в ночь day"""
+        with self._lock:
+            occupied = self._occupied(day, day + timedelta(days=1)).any(axis=1)
+            return {self.room_ids[row] for row in np.flatnonzero(occupied)}
+
+    def free_room_ids(self, day: date) -> List[int]:
+        """Комнаты, свободные в ночь day"""
+        occupied = self.occupied_room_ids(day)
+        return [room_id for room_id in self.room_ids if room_id not in occupied]
+
+    def daily_occupancy(self, start: date, end: date) -> np.ndarray:
+        """Число занятых комнат на каждую ночь [start, end)"""
+        with self._lock:
+            return np.count_nonzero(self._occupied(start, end), axis=0)
+
+    def daily_occupancy_by_type(self, start: date, end: date) -> Dict[str, np.ndarray]:
+        """То же, что daily_occupancy, но отдельно по каждому типу комнат"""
+        with self._lock:
+            occupied = self._occupied(start, end)
+            return {
+                room_type: np.count_nonzero(occupied[self.room_types == room_type], axis=0)
+                for room_type in dict.fromkeys(self.room_types)
+            }
+
+    def free_runs(self, start: date, end: date, nights: int) -> Dict[int, List[date]]:
+        """
+        Для каждой комнаты — даты заезда в [start, end), с которых она
+        свободна nights ночей подряд (окно должно целиком лежать в периоде).
+        """
+        with self._lock:
+            occupied = self._occupied(start, end).astype(np.int32)
+            if nights <= 0 or occupied.shape[1] < nights:
+                return {}
+            # Сумма по скользящему окну через кумулятивную сумму
+            cumulative = np.pad(np.cumsum(occupied, axis=1), ((0, 0), (1, 0)))
+            windows = cumulative[:, nights:] - cumulative[:, :-nights]
+            first_day = self.origin + timedelta(days=self._slice(start, end).start)
+            runs = {}
+            for row, room_id in enumerate(self.room_ids):
+                offsets = np.flatnonzero(windows[row] == 0)
+                if offsets.size:
+                    runs[room_id] = [first_day + timedelta(days=int(offset)) for offset in offsets]
+            return runs
+
+
+occupancy_calendar = OccupancyCalendar()
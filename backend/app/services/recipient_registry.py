@@ -0,0 +1,108 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config.settings import get_settings
+from ..models.user import User
+
+settings = get_settings()
+
+# События, на которые можно подписаться в notification_preferences
+NOTIFICATION_EVENTS = ("booking_created", "booking_cancelled", "daily_report")
+
+
+@dataclass(frozen=True)
+class Recipient:
+    """Получатель уведомлений: чат администратора и его настройки"""
+    user_id: int
+    chat_id: int
+    events: Optional[frozenset] = None  # None — все события
+    quiet_start: Optional[dt_time] = None
+    quiet_end: Optional[dt_time] = None
+
+    @classmethod
+    def from_row(cls, user_id: int, chat_id: int, preferences: Optional[dict]) -> "Recipient":
+        preferences = preferences or {}
+        events = preferences.get("events")
+        quiet_start = preferences.get("quiet_hours_start")
+        quiet_end = preferences.get("quiet_hours_end")
+        return cls(
+            user_id=user_id,
+            chat_id=chat_id,
+            events=frozenset(events) if events is not None else None,
+            quiet_start=dt_time.fromisoformat(quiet_start) if quiet_start else None,
+            quiet_end=dt_time.fromisoformat(quiet_end) if quiet_end else None
+        )
+
+    def wants(self, event: str) -> bool:
+        return self.events is None or event in self.events
+
+    def quiet_delay(self, now: datetime) -> timedelta:
+        """
+        Сколько ждать до конца тихих часов (локальное время сервера, как в
+        текстах уведомлений). Окно может переходить через полночь: 22:00–08:00.
+        """
+        if self.quiet_start is None or self.quiet_end is None or self.quiet_start == self.quiet_end:
+            return timedelta(0)
+        current = now.time()
+        if self.quiet_start < self.quiet_end:
+            quiet = self.quiet_start <= current < self.quiet_end
+        else:
+            quiet = current >= self.quiet_start or current < self.quiet_end
+        if not quiet:
+            return timedelta(0)
+        end = datetime.combine(now.date(), self.quiet_end)
+        if end <= now:
+            end += timedelta(days=1)
+        return end - now
+
+
+class RecipientRegistry:
+    """
+    Снимок администраторов-получателей уведомлений. Загружается одним
+    запросом по трём колонкам и дальше отдаётся из памяти, так что рассылка
+    считается без обращения к БД. Сбрасывается при смене роли, статуса
+    и настроек пользователя; TTL ограничивает устаревание в других воркерах.
+    """
+
+    def __init__(self, ttl_seconds: float = settings.recipient_registry_ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._recipients: Optional[Tuple[Recipient, ...]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> Tuple[Recipient, ...]:
+        rows = db.query(User.id, User.telegram_id, User.notification_preferences).filter(
+            User.is_admin == True,
+            User.is_active == True,
+            User.telegram_id.isnot(None)
+        ).all()
+        recipients = tuple(Recipient.from_row(*row) for row in rows)
+        with self._lock:
+            self._recipients = recipients
+            self._expires_at = time.monotonic() + self.ttl_seconds
+        return recipients
+
+    def get(self, db: Session) -> Tuple[Recipient, ...]:
+        with self._lock:
+            if self._recipients is not None and self._expires_at > time.monotonic():
+                return self._recipients
+        return self.load(db)
+
+    def recipients(self, db: Session, event: str, exclude_chat_id: Optional[int] = None) -> List[Recipient]:
+        """Получатели события, кроме exclude_chat_id (автора изменения)"""
+        return [
+            recipient for recipient in self.get(db)
+            if recipient.wants(event) and recipient.chat_id != exclude_chat_id
+        ]
+
+    def invalidate(self):
+        with self._lock:
+            self._recipients = None
+
+
+recipient_registry = RecipientRegistry()
@@ -0,0 +1,90 @@
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from ..config.settings import get_settings
+from ..database import SessionLocal
+from .notification_outbox import notification_outbox
+from .notification_service import notification_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Сколько последних запусков хранить для GET /api/health/scheduler
+RUN_HISTORY_SIZE = 30
+
+
+class ReportScheduler:
+    """
+    Планировщик отчётов в event loop приложения (AsyncIOScheduler).
+    Запускается и останавливается в lifespan; каждый запуск с его временем
+    по этапам попадает в журнал runs.
+    """
+
+    def __init__(
+            self,
+            enabled: bool = settings.daily_report_enabled,
+            hour: int = settings.daily_report_hour,
+            minute: int = settings.daily_report_minute
+    ):
+        self.enabled = enabled
+        self.hour = hour
+        self.minute = minute
+        self.runs: Deque[Dict[str, Any]] = deque(maxlen=RUN_HISTORY_SIZE)
+        self._scheduler: Optional[AsyncIOScheduler] = None
+
+    async def run_daily_report(self) -> Dict[str, Any]:
+        run = {"job": "daily_report", "started_at": datetime.utcnow().isoformat()}
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            run.update(await notification_service.send_daily_report(db))
+            notification_outbox.wake()
+        except Exception as e:
+            logger.exception("Daily report failed")
+            run["error"] = str(e)
+        finally:
+            db.close()
+        run["total_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self.runs.append(run)
+        logger.info(f"Daily report run: {run}")
+        return run
+
+    def start(self):
+        if not self.enabled or self._scheduler is not None:
+            return
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(
+            self.run_daily_report,
+            CronTrigger(hour=self.hour, minute=self.minute),
+            id="daily_report",
+            # Пропущенный (например, во время рестарта) запуск выполняется
+            # один раз, если опоздание не больше часа
+            misfire_grace_time=60 * 60,
+            coalesce=True,
+            max_instances=1
+        )
+        self._scheduler.start()
+
+    def shutdown(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+    def status(self) -> Dict[str, Any]:
+        jobs: List[Dict[str, Any]] = []
+        if self._scheduler is not None:
+            for job in self._scheduler.get_jobs():
+                jobs.append({
+                    "id": job.id,
+                    "next_run_at": job.next_run_time.isoformat() if job.next_run_time else None
+                })
+        return {"enabled": self.enabled, "jobs": jobs, "runs": list(self.runs)}
+
+
+report_scheduler = ReportScheduler()
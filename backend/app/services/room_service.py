@@ -1,11 +1,28 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import exists
 from typing import List, Optional
-from datetime import date
+from datetime import date, timedelta
 from ..models.room import Room
 from ..models.booking import Booking
+from .booking_service import BookingService
+from .occupancy_calendar import occupancy_calendar
 
 
 class RoomService:
+    @staticmethod
+    def _occupied_room_ids(db: Session, day: date) -> set:
+        """ID комнат, занятых в ночь day: из календаря занятости, иначе из БД"""
+        if occupancy_calendar.ready(db, day, day + timedelta(days=1)):
+            return occupancy_calendar.occupied_room_ids(day)
+
+        occupied_room_ids_query = db.query(Booking.room_id).filter(
+            Booking.start_date <= day,
+            Booking.end_date > day  # > чтобы не считать день выезда
+        ).distinct()
+
+        # Преобразуем в set для быстрой проверки (например, `if room_id in occupied_ids`)
+        return {room_id for (room_id,) in occupied_room_ids_query}
+
     @staticmethod
     def get_rooms_with_status(
             db: Session,
@@ -26,14 +43,7 @@ class RoomService:
         all_rooms = query.order_by(Room.id).all()
 
         # Получаем ID всех комнат, которые заняты СЕГОДНЯ
-        today = date.today()
-        occupied_room_ids_query = db.query(Booking.room_id).filter(
-            Booking.start_date <= today,
-            Booking.end_date > today  # > чтобы не считать день выезда
-        ).distinct()
-
-        # Преобразуем в set для быстрой проверки (например, `if room_id in occupied_ids`)
-        occupied_ids = {room_id for (room_id,) in occupied_room_ids_query}
+        occupied_ids = RoomService._occupied_room_ids(db, date.today())
 
         result_rooms = []
         for room in all_rooms:
@@ -62,17 +72,50 @@ class RoomService:
         if not room:
             return None
 
-        today = date.today()
         # Проверяем, занята ли конкретно эта комната
-        is_occupied = db.query(Booking).filter(
-            Booking.room_id == room_id,
-            Booking.start_date <= today,
-            Booking.end_date > today
-        ).first() is not None
+        is_occupied = room_id in RoomService._occupied_room_ids(db, date.today())
 
         room.is_available = not is_occupied
         return room
 
+    @staticmethod
+    def get_available_rooms(
+            db: Session,
+            start_date: date,
+            end_date: date,
+            room_type: Optional[str] = None,
+            min_capacity: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Все свободные на период комнаты одним запросом (anti-join по bookings)
+        вместе с ценой и стоимостью проживания.
+        """
+        has_conflict = exists().where(
+            Booking.room_id == Room.id,
+            BookingService.overlap_filter(start_date, end_date)
+        )
+        query = db.query(Room).filter(~has_conflict)
+
+        if room_type:
+            query = query.filter(Room.room_type == room_type)
+        if min_capacity:
+            query = query.filter(Room.capacity >= min_capacity)
+
+        nights = (end_date - start_date).days
+        result = []
+        for room in query.order_by(Room.id).all():
+            price = room.price_per_night or 0
+            result.append({
+                "id": room.id,
+                "room_number": room.room_number,
+                "room_type": room.room_type,
+                "capacity": room.capacity,
+                "price_per_night": price,
+                "nights": nights,
+                "total_price": price * nights
+            })
+        return result
+
     # --- Остальные ваши методы остаются без изменений ---
 
     @staticmethod
@@ -0,0 +1,26 @@
+# file: backend/app/utils/concurrency.py
+"""
+Единая модель выполнения: синхронная работа с Session и openpyxl
+не выполняется в event loop, а уходит в ограниченный пул потоков.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from ..config.settings import get_settings
+
+settings = get_settings()
+T = TypeVar("T")
+
+_executor = ThreadPoolExecutor(max_workers=settings.sync_worker_threads, thread_name_prefix="sync-worker")
+
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Выполняет синхронную функцию в пуле потоков и ждёт результат, не блокируя event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_sync_executor():
+    _executor.shutdown(wait=True)
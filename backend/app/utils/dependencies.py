@@ -7,13 +7,24 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 from ..database import get_db
-from ..models.user import User, UserRole
+from ..models.booking import Booking
+from ..models.user import User, UserRole, Permission
 from ..config.settings import get_settings
+from ..services.auth_cache import UserPrincipal, auth_cache
+from ..services.booking_service import BookingService
+from .concurrency import run_sync
 
 settings = get_settings()
 security = HTTPBearer()
 
 
+def _get_active_user(db: Session, user_id: int) -> Optional[User]:
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Создание JWT токена"""
     to_encode = data.copy()
@@ -27,28 +38,62 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(
-        credentials: HTTPAuthorizationCredentials = Depends(security),
-        db: Session = Depends(get_db)
-) -> User:
-    """Получает пользователя из HTTP Bearer токена."""
-    token = credentials.credentials
-    credentials_exception = HTTPException(
+def _decode_user_id(token: str) -> Optional[int]:
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+    return payload.get("user_id")
+
+
+async def _get_principal(db: Session, user_id: int) -> Optional[UserPrincipal]:
+    """Принципал из кэша; в БД идём только при промахе"""
+    principal = auth_cache.get(user_id)
+    if principal is None:
+        generation = auth_cache.generation
+        user = await run_sync(_get_active_user, db, user_id)
+        if user is None:
+            return None
+        principal = UserPrincipal.from_user(user)
+        auth_cache.put(principal, generation)
+    return principal
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None or not user.is_active:
-        raise credentials_exception
+
+async def get_current_user(
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: Session = Depends(get_db)
+) -> UserPrincipal:
+    """Получает пользователя из HTTP Bearer токена (из кэша, без запроса к БД на горячем пути)."""
+    user_id = _decode_user_id(credentials.credentials)
+    if user_id is None:
+        raise _credentials_exception()
+
+    principal = await _get_principal(db, user_id)
+    if principal is None:
+        raise _credentials_exception()
+    return principal
+
+
+async def get_current_user_model(
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db: Session = Depends(get_db)
+) -> User:
+    """ORM-объект пользователя — для эндпоинтов, которые читают или меняют его профиль."""
+    user_id = _decode_user_id(credentials.credentials)
+    if user_id is None:
+        raise _credentials_exception()
+
+    user = await run_sync(_get_active_user, db, user_id)
+    if user is None:
+        raise _credentials_exception()
     return user
 
 
@@ -56,37 +101,61 @@ async def get_current_user(
 async def get_current_user_ws(
         token: str = Query(...),
         db: Session = Depends(get_db)
-) -> User:
+) -> Optional[UserPrincipal]:
     """Получает пользователя для WebSocket соединения из токена в query параметрах."""
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        user_id: int = payload.get("user_id")
-        if user_id is None:
-            raise JWTError()
-    except JWTError:
+    user_id = _decode_user_id(token)
+    if user_id is None:
         # В WebSocket мы не можем выбросить HTTPException, поэтому просто вернем None,
         # а вызывающий код обработает это.
         return None
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None or not user.is_active:
-        return None
-
-    return user
+    return await _get_principal(db, user_id)
 
 
 # ✅ КОНЕЦ НОВОЙ ФУНКЦИИ
 
 
-async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+async def require_admin(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """Требует роль админа или выше"""
     if current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
     return current_user
 
 
-async def require_super_admin(current_user: User = Depends(get_current_user)) -> User:
+async def require_super_admin(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """Требует роль только супер-администратора"""
     if current_user.role != UserRole.SUPER_ADMIN:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Super Admin access required")
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def require_permission(permission: Permission):
+    """Фабрика зависимостей: пользователь с разрешением permission"""
+    async def dependency(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
+        if not current_user.has_permission(permission):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+        return current_user
+
+    return dependency
+
+
+def require_booking_permission(action: str):
+    """
+    Фабрика зависимостей для /{booking_id}: бронь существует, и пользователь —
+    администратор (is_admin) или её создатель. Это правило маршрутов, а не
+    разрешения роли: маски ролей в models/user.py его не меняют.
+    Возвращает бронь, чтобы обработчик не загружал её повторно.
+    """
+    async def dependency(
+            booking_id: int,
+            db: Session = Depends(get_db),
+            current_user: UserPrincipal = Depends(get_current_user)
+    ) -> Booking:
+        booking = await run_sync(BookingService.get_booking, db, booking_id)
+        if not booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        if not current_user.can_change_booking(booking):
+            raise HTTPException(status_code=403, detail=f"Not authorized to {action} this booking")
+        return booking
+
+    return dependency
@@ -0,0 +1,66 @@
+# file: backend/app/utils/sql.py
+"""
+SQL-функции, которые пишутся по-разному в SQLite и PostgreSQL.
+Используются в аналитике, чтобы одни и те же запросы работали на обеих БД.
+"""
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Date, Integer
+
+
+class days_between(FunctionElement):
+    """Количество дней между двумя датами: days_between(end, start)"""
+    type = Integer()
+    name = "days_between"
+    inherit_cache = True
+
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    # PostgreSQL: date - date уже даёт целое число дней
+    end, start = list(element.clauses)
+    return f"({compiler.process(end, **kw)} - {compiler.process(start, **kw)})"
+
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return (
+        f"CAST(julianday({compiler.process(end, **kw)}) - "
+        f"julianday({compiler.process(start, **kw)}) AS INTEGER)"
+    )
+
+
+class greatest(FunctionElement):
+    """Наибольшая из дат"""
+    type = Date()
+    name = "greatest"
+    inherit_cache = True
+
+
+@compiles(greatest)
+def _greatest_default(element, compiler, **kw):
+    return f"GREATEST({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(greatest, "sqlite")
+def _greatest_sqlite(element, compiler, **kw):
+    # В SQLite многоаргументный MAX — скалярная функция
+    return f"MAX({compiler.process(element.clauses, **kw)})"
+
+
+class least(FunctionElement):
+    """Наименьшая из дат"""
+    type = Date()
+    name = "least"
+    inherit_cache = True
+
+
+@compiles(least)
+def _least_default(element, compiler, **kw):
+    return f"LEAST({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(least, "sqlite")
+def _least_sqlite(element, compiler, **kw):
+    return f"MIN({compiler.process(element.clauses, **kw)})"
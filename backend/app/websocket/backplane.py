@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ..config.settings import get_settings
+from ..utils.concurrency import run_sync
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Ограничение PostgreSQL на размер payload в NOTIFY
+PG_NOTIFY_MAX_BYTES = 8000
+
+Deliver = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Backplane:
+    """
+    Шина событий WebSocket между процессами. Каждый воркер публикует событие
+    один раз, а получает события всех воркеров и раздаёт их своим сокетам.
+    """
+
+    async def start(self, deliver: Deliver):
+        """deliver вызывается в event loop для каждого полученного события"""
+
+    async def publish(self, event: Dict[str, Any]):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+
+class LocalBackplane(Backplane):
+    """
+    Шина внутри одного процесса (по умолчанию, один воркер). Один экземпляр
+    можно отдать нескольким ConnectionManager, например в тестах, —
+    они будут получать события друг друга, как воркеры через PostgreSQL.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Deliver] = []
+
+    async def start(self, deliver: Deliver):
+        self._subscribers.append(deliver)
+
+    async def publish(self, event: Dict[str, Any]):
+        for deliver in list(self._subscribers):
+            await deliver(event)
+
+    async def stop(self):
+        self._subscribers.clear()
+
+
+class PostgresBackplane(Backplane):
+    """
+    LISTEN/NOTIFY в PostgreSQL. psycopg2 блокирующий, поэтому LISTEN
+    слушает отдельный поток (с переподключением), а NOTIFY уходит через
+    пул потоков utils.concurrency.
+    """
+
+    def __init__(self, dsn: str, channel: str = settings.websocket_backplane_channel):
+        # psycopg2 понимает postgresql://, но не postgresql+psycopg2://
+        self.dsn = dsn.replace("postgresql+psycopg2://", "postgresql://", 1)
+        self.channel = channel
+        self._deliver: Optional[Deliver] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._publish_connection = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self):
+        import psycopg2
+
+        connection = psycopg2.connect(self.dsn)
+        connection.autocommit = True
+        return connection
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="ws-backplane", daemon=True)
+        self._thread.start()
+
+    def _listen_forever(self):
+        retry_delay = 1.0
+        while not self._stopped.is_set():
+            try:
+                connection = self._connect()
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'LISTEN "{self.channel}"')
+                    retry_delay = 1.0
+                    self._listen(connection)
+                finally:
+                    connection.close()
+            except Exception as e:
+                logger.error(f"WebSocket backplane connection failed: {e}")
+                self._stopped.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, 30.0)
+
+    def _listen(self, connection):
+        while not self._stopped.is_set():
+            # Таймаут, чтобы периодически проверять _stopped
+            if select.select([connection], [], [], 1.0) == ([], [], []):
+                continue
+            connection.poll()
+            while connection.notifies:
+                notify = connection.notifies.pop(0)
+                try:
+                    event = json.loads(notify.payload)
+                except ValueError:
+                    logger.warning("Skipping malformed backplane event")
+                    continue
+                asyncio.run_coroutine_threadsafe(self._deliver(event), self._loop)
+
+    def _notify(self, payload: str):
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publish_connection is None or self._publish_connection.closed:
+                        self._publish_connection = self._connect()
+                    with self._publish_connection.cursor() as cursor:
+                        cursor.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                    return
+                except Exception:
+                    # Соединение могло оборваться — одна попытка с новым
+                    self._publish_connection = None
+                    if attempt:
+                        raise
+
+    async def publish(self, event: Dict[str, Any]):
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        if len(payload.encode()) >= PG_NOTIFY_MAX_BYTES:
+            logger.warning("Backplane event is too large for NOTIFY, delivered to local sockets only")
+            return
+        try:
+            await run_sync(self._notify, payload)
+        except Exception as e:
+            logger.error(f"WebSocket backplane publish failed: {e}")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            await run_sync(self._thread.join, 5)
+            self._thread = None
+        with self._publish_lock:
+            if self._publish_connection is not None:
+                self._publish_connection.close()
+                self._publish_connection = None
+
+
+def create_backplane(name: str, database_url: str) -> Backplane:
+    """Backplane по имени из настроек: local или postgres"""
+    if name == "postgres":
+        if not database_url.startswith("postgresql"):
+            raise ValueError("websocket_backplane=postgres requires a PostgreSQL DATABASE_URL")
+        return PostgresBackplane(database_url)
+    if name == "local":
+        return LocalBackplane()
+    raise ValueError(f"Unknown websocket backplane: {name}")
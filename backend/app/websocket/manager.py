@@ -1,34 +1,243 @@
-from typing import Dict, Set
-from fastapi import WebSocket
+import asyncio
 import json
-from datetime import datetime
+import logging
+import re
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from fastapi import WebSocket
+from datetime import date, datetime
+
+from ..config.settings import get_settings
+from ..database import SQLALCHEMY_DATABASE_URL
+from .backplane import Backplane, LocalBackplane, create_backplane
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# 1013 Try Again Later: клиент не успевает читать, пусть переподключится и перечитает состояние
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Темы подписки: room:12, bookings:2026-10 (месяц), а также bookings, rooms, analytics целиком
+TOPIC_PATTERN = re.compile(r"^(room:\d+|bookings:\d{4}-\d{2}|bookings|rooms|analytics)$")
+MAX_TOPICS_PER_CONNECTION = 100
+
+
+def _as_date(value) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def booking_topics(room_id: Optional[int], periods: Iterable[Tuple] = ()) -> Set[str]:
+    """
+    Темы события брони: комната, каждый месяц, который задевают периоды
+    (включая месяц дня выезда), и общие bookings/analytics.
+    """
+    topics = {"bookings", "analytics"}
+    if room_id is not None:
+        topics.add(f"room:{room_id}")
+    for start, end in periods:
+        start, end = _as_date(start), _as_date(end)
+        if start is None or end is None:
+            continue
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            topics.add(f"bookings:{year:04d}-{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return topics
+
+
+class _Connection:
+    """Сокет с ограниченной очередью исходящих сообщений и своей задачей-писателем"""
+
+    __slots__ = ("websocket", "user_id", "queue", "writer", "topics")
+
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.topics: Set[str] = set()
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, Set[WebSocket]] = {}
+    """
+    Рассылка по WebSocket: сообщение сериализуется один раз и кладётся
+    в очереди соединений без ожидания отправки. Каждое соединение отправляет
+    из своей очереди само, поэтому медленный клиент не задерживает ни
+    остальных, ни вызывающий обработчик API. Переполнение очереди или ошибка
+    отправки отключают только это соединение.
+
+    События с темами получают только подписчики этих тем (индекс тема ->
+    соединения) и соединения без подписок — они, как раньше, получают всё.
+
+    Каждое событие раздаётся своим сокетам сразу и один раз публикуется
+    в backplane; события других воркеров приходят оттуда же (свои
+    отсеиваются по origin).
+    """
+
+    def __init__(self, queue_size: int = settings.websocket_queue_size,
+                 send_timeout_seconds: float = settings.websocket_send_timeout_seconds,
+                 backplane: Optional[Backplane] = None):
+        self.origin = uuid.uuid4().hex
+        self.backplane = backplane or LocalBackplane()
+        self.queue_size = queue_size
+        self.send_timeout_seconds = send_timeout_seconds
+        self.active_connections: Dict[int, Set[_Connection]] = {}
+        self._connections: Dict[WebSocket, _Connection] = {}
+        self._topics: Dict[str, Set[_Connection]] = {}
+        self._unsubscribed: Set[_Connection] = set()
+        self.slow_consumers_dropped = 0
+        # In-process подписчики на события броней (например, сброс кэшей)
+        self.booking_listeners: List[Callable[[int, str, dict], None]] = []
+
+    def add_booking_listener(self, listener: Callable[[int, str, dict], None]):
+        self.booking_listeners.append(listener)
 
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = set()
-        self.active_connections[user_id].add(websocket)
+        connection = _Connection(websocket, user_id, self.queue_size)
+        connection.writer = asyncio.create_task(self._writer(connection))
+        self._connections[websocket] = connection
+        self._unsubscribed.add(connection)
+        self.active_connections.setdefault(user_id, set()).add(connection)
 
     def disconnect(self, websocket: WebSocket, user_id: int):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].discard(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
+        connection = self._connections.get(websocket)
+        if connection is not None:
+            self._remove(connection)
+
+    def _remove(self, connection: _Connection):
+        if self._connections.pop(connection.websocket, None) is None:
+            return
+        self._unsubscribed.discard(connection)
+        self._unindex(connection, connection.topics)
+        user_connections = self.active_connections.get(connection.user_id)
+        if user_connections is not None:
+            user_connections.discard(connection)
+            if not user_connections:
+                del self.active_connections[connection.user_id]
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    def _unindex(self, connection: _Connection, topics: Iterable[str]):
+        for topic in list(topics):
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def subscribe(self, websocket: WebSocket, topics: Sequence[str]) -> Set[str]:
+        """Добавляет темы соединению; неизвестные темы — ValueError"""
+        connection = self._connections.get(websocket)
+        if connection is None:
+            return set()
+        invalid = [topic for topic in topics if not isinstance(topic, str) or not TOPIC_PATTERN.match(topic)]
+        if invalid:
+            raise ValueError(f"Unknown topics: {invalid}")
+        if len(connection.topics | set(topics)) > MAX_TOPICS_PER_CONNECTION:
+            raise ValueError(f"At most {MAX_TOPICS_PER_CONNECTION} topics per connection")
+
+        for topic in topics:
+            self._topics.setdefault(topic, set()).add(connection)
+        connection.topics.update(topics)
+        if connection.topics:
+            self._unsubscribed.discard(connection)
+        return connection.topics
+
+    def unsubscribe(self, websocket: WebSocket, topics: Sequence[str]) -> Set[str]:
+        connection = self._connections.get(websocket)
+        if connection is None:
+            return set()
+        removed = connection.topics.intersection(topics)
+        self._unindex(connection, removed)
+        connection.topics.difference_update(removed)
+        if not connection.topics:
+            self._unsubscribed.add(connection)
+        return connection.topics
+
+    async def _writer(self, connection: _Connection):
+        try:
+            while True:
+                text = await connection.queue.get()
+                await asyncio.wait_for(connection.websocket.send_text(text), self.send_timeout_seconds)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Сокет закрыт или не принимает данные — убираем его из рассылки
+            logger.info(f"WebSocket of user {connection.user_id} removed: {e!r}")
+            self._remove(connection)
+
+    async def _drop_slow_consumer(self, connection: _Connection):
+        try:
+            await connection.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _encode(message: dict) -> str:
+        return json.dumps(message, ensure_ascii=False, default=str)
+
+    def _enqueue(self, connection: _Connection, text: str):
+        try:
+            connection.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.slow_consumers_dropped += 1
+            logger.warning(f"WebSocket of user {connection.user_id} is too slow, disconnecting")
+            self._remove(connection)
+            asyncio.create_task(self._drop_slow_consumer(connection))
+
+    def _fan_out(self, text: str, connections):
+        # list(): _enqueue может удалять соединения во время обхода
+        for connection in list(connections):
+            self._enqueue(connection, text)
+
+    async def send(self, websocket: WebSocket, message: dict):
+        """Сообщение одному сокету через его очередь (ответы на ping и т.п.)"""
+        connection = self._connections.get(websocket)
+        if connection is not None:
+            self._enqueue(connection, self._encode(message))
 
     async def send_personal_message(self, message: dict, user_id: int):
-        if user_id in self.active_connections:
-            for websocket in self.active_connections[user_id]:
-                await websocket.send_json(message)
+        self._fan_out(self._encode(message), self.active_connections.get(user_id, ()))
+        await self.backplane.publish({"origin": self.origin, "message": message, "user_id": user_id})
+
+    def _recipients(self, topics: Optional[Iterable[str]]) -> Set[_Connection]:
+        if topics is None:
+            return set(self._connections.values())
+        recipients = set(self._unsubscribed)
+        for topic in topics:
+            recipients.update(self._topics.get(topic, ()))
+        return recipients
+
+    def _broadcast_local(self, message: dict, topics: Optional[Iterable[str]]):
+        recipients = self._recipients(topics)
+        if recipients:
+            self._fan_out(self._encode(message), recipients)
+
+    async def broadcast(self, message: dict, topics: Optional[Iterable[str]] = None):
+        """Всем соединениям или, если заданы topics, только заинтересованным"""
+        topics = None if topics is None else sorted(topics)
+        self._broadcast_local(message, topics)
+        await self.backplane.publish({"origin": self.origin, "message": message, "topics": topics})
+
+    def _notify_booking_listeners(self, booking_id: int, action: str, data: dict):
+        for listener in self.booking_listeners:
+            listener(booking_id, action, data)
 
-    async def broadcast(self, message: dict):
-        for user_connections in self.active_connections.values():
-            for websocket in user_connections:
-                await websocket.send_json(message)
+    async def _on_backplane_event(self, event: dict):
+        """Событие другого воркера: слушатели броней и раздача своим сокетам"""
+        if event.get("origin") == self.origin:
+            return
+        message = event.get("message") or {}
+        if message.get("type") == "booking_update":
+            # Кэши этого процесса (например, дашборд) тоже должны сброситься
+            self._notify_booking_listeners(message.get("booking_id"), message.get("action"), message.get("data"))
+        if "user_id" in event:
+            self._fan_out(self._encode(message), self.active_connections.get(event["user_id"], ()))
+        else:
+            self._broadcast_local(message, event.get("topics"))
 
     async def broadcast_room_update(self, room_id: int, action: str, data: dict):
         message = {
@@ -38,9 +247,16 @@ class ConnectionManager:
             "data": data,
             "timestamp": datetime.utcnow().isoformat()
         }
-        await self.broadcast(message)
+        await self.broadcast(message, {"rooms", f"room:{room_id}"})
+
+    async def broadcast_booking_update(self, booking_id: int, action: str, data: dict,
+                                       room_id: Optional[int] = None, periods: Iterable[Tuple] = ()):
+        """
+        Событие брони для подписчиков комнаты room_id и месяцев из periods
+        ((start_date, end_date) до и после изменения).
+        """
+        self._notify_booking_listeners(booking_id, action, data)
 
-    async def broadcast_booking_update(self, booking_id: int, action: str, data: dict):
         message = {
             "type": "booking_update",
             "action": action,
@@ -48,7 +264,20 @@ class ConnectionManager:
             "data": data,
             "timestamp": datetime.utcnow().isoformat()
         }
-        await self.broadcast(message)
+        await self.broadcast(message, booking_topics(room_id, periods))
+
+    async def start(self):
+        await self.backplane.start(self._on_backplane_event)
+
+    async def stop(self):
+        await self.backplane.stop()
+        self.shutdown()
+
+    def shutdown(self):
+        for connection in list(self._connections.values()):
+            self._remove(connection)
 
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager(
+    backplane=create_backplane(settings.websocket_backplane, SQLALCHEMY_DATABASE_URL)
+)
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Отдельная SQLite-база для тестов: URL читается при импорте app.database
+_db_dir = tempfile.mkdtemp(prefix="oqtoshsoy-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app.models import room, booking, user, history, daily_stats, notification_outbox  # noqa: E402,F401
+from app.models.room import Room  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services.availability_index import availability_index  # noqa: E402
+from app.services.occupancy_calendar import occupancy_calendar  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Чистая схема и загруженные in-process копии bookings на каждый тест"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    availability_index.load(session)
+    occupancy_calendar.load(session)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def rooms(db):
+    items = [
+        Room(room_number=str(100 + i), room_type="standard", capacity=2, price_per_night=500000)
+        for i in range(1, 6)
+    ]
+    db.add_all(items)
+    db.commit()
+    return items
+
+
+def make_user(db, telegram_id: int, role: UserRole = UserRole.OPERATOR, is_admin: bool = False) -> User:
+    db_user = User(telegram_id=telegram_id, first_name=f"User {telegram_id}", role=role, is_admin=is_admin)
+    db.add(db_user)
+    db.commit()
+    return db_user
+
+
+@pytest.fixture
+def operator(db):
+    return make_user(db, 1001)
+
+
+def day(offset: int) -> date:
+    """Дата относительно фиксированного дня, внутри горизонта календаря занятости"""
+    return date.today().replace(day=1) + timedelta(days=offset)
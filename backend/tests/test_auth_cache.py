@@ -0,0 +1,27 @@
+import asyncio
+
+from app.models.user import UserRole
+from app.services.auth_cache import auth_cache
+from app.utils import dependencies
+
+from conftest import make_user
+
+
+def test_principal_loaded_during_invalidation_is_not_cached(db, monkeypatch):
+    user = make_user(db, 501, role=UserRole.OPERATOR)
+    auth_cache.clear()
+    load_active_user = dependencies._get_active_user
+
+    def get_active_user(session, user_id):
+        loaded = load_active_user(session, user_id)
+        # Роль сменили, пока принципал читался из БД
+        auth_cache.invalidate(user_id)
+        return loaded
+
+    monkeypatch.setattr(dependencies, "_get_active_user", get_active_user)
+    assert asyncio.run(dependencies._get_principal(db, user.id)).id == user.id
+    assert auth_cache.get(user.id) is None
+
+    monkeypatch.setattr(dependencies, "_get_active_user", load_active_user)
+    assert asyncio.run(dependencies._get_principal(db, user.id)).id == user.id
+    assert auth_cache.get(user.id).id == user.id
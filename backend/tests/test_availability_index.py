@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models.booking import Booking
+from app.schemas.booking import BookingCreate
+from app.services.availability_index import availability_index, bump_bookings_version
+from app.services.booking_service import BookingService, BookingConflictError
+from app.services.occupancy_calendar import occupancy_calendar
+
+from conftest import day
+
+
+def _create(db, room, start, end, user_id):
+    return BookingService.create_booking(
+        db, BookingCreate(room_id=room.id, start_date=day(start), end_date=day(end), guest_name="Guest"), user_id
+    )
+
+
+def _in_other_worker(*moves):
+    """Изменения другого процесса: мимо копий этого, с увеличением версии, как в BookingService"""
+    db = SessionLocal()
+    try:
+        for booking_id, start, end in moves:
+            db.execute(
+                update(Booking.__table__).where(Booking.id == booking_id).values(start_date=day(start), end_date=day(end))
+            )
+        bump_bookings_version(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def long_ttl(monkeypatch):
+    # Сверка по TTL не должна маскировать ошибку: копии обновляются только через _remember
+    monkeypatch.setattr(availability_index, "ttl_seconds", 3600)
+    monkeypatch.setattr(occupancy_calendar, "ttl_seconds", 3600)
+
+
+def test_foreign_move_is_picked_up_after_own_delete(db, rooms, operator, long_ttl):
+    moved = _create(db, rooms[0], 1, 3, operator.id)
+    unrelated = _create(db, rooms[1], 1, 3, operator.id)
+
+    _in_other_worker((moved.id, 20, 22))
+    BookingService.delete_booking(db, unrelated.id)
+
+    assert availability_index.find_conflicts(db, rooms[0].id, day(1), day(3)) == []
+    assert [c[2] for c in availability_index.find_conflicts(db, rooms[0].id, day(20), day(22))] == [moved.id]
+    assert rooms[0].id not in occupancy_calendar.occupied_room_ids(day(1))
+    assert rooms[0].id in occupancy_calendar.occupied_room_ids(day(20))
+
+
+def test_swapped_dates_are_picked_up(db, rooms, operator, long_ttl):
+    """Обмен датами двух броней не меняет ни числа броней, ни сумм по колонкам"""
+    first = _create(db, rooms[0], 1, 3, operator.id)
+    second = _create(db, rooms[1], 10, 12, operator.id)
+
+    _in_other_worker((first.id, 10, 12), (second.id, 1, 3))
+
+    # Запись проверяется по БД, даже пока копия ещё не сверялась
+    with pytest.raises(BookingConflictError):
+        _create(db, rooms[0], 10, 12, operator.id)
+
+    _create(db, rooms[2], 1, 3, operator.id)
+    assert [c[2] for c in availability_index.find_conflicts(db, rooms[0].id, day(10), day(12))] == [first.id]
+    assert availability_index.find_conflicts(db, rooms[0].id, day(1), day(3)) == []
+    assert rooms[1].id in occupancy_calendar.occupied_room_ids(day(1))
+
+
+def test_write_path_checks_against_database(db, rooms, operator, long_ttl):
+    moved = _create(db, rooms[0], 1, 3, operator.id)
+
+    _in_other_worker((moved.id, 10, 12))
+
+    with pytest.raises(BookingConflictError):
+        _create(db, rooms[0], 10, 12, operator.id)
+    assert _create(db, rooms[0], 1, 3, operator.id).id != moved.id
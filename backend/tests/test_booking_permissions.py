@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.bookings import editable_booking, deletable_booking
+from app.models.user import UserRole
+from app.schemas.booking import BookingCreate
+from app.services.auth_cache import UserPrincipal
+from app.services.booking_service import BookingService
+
+from conftest import day, make_user
+
+
+def _check(dependency, db, booking, user):
+    return asyncio.run(dependency(booking_id=booking.id, db=db, current_user=UserPrincipal.from_user(user)))
+
+
+@pytest.fixture
+def booking(db, rooms, operator):
+    return BookingService.create_booking(
+        db, BookingCreate(room_id=rooms[0].id, start_date=day(1), end_date=day(3), guest_name="Guest"), operator.id
+    )
+
+
+@pytest.mark.parametrize("dependency", [editable_booking, deletable_booking])
+def test_operator_can_change_own_booking(db, booking, operator, dependency):
+    assert _check(dependency, db, booking, operator).id == booking.id
+
+
+@pytest.mark.parametrize("dependency", [editable_booking, deletable_booking])
+def test_plain_user_can_change_own_booking(db, rooms, dependency):
+    owner = make_user(db, 2001, role=UserRole.USER)
+    own = BookingService.create_booking(
+        db, BookingCreate(room_id=rooms[1].id, start_date=day(1), end_date=day(3), guest_name="Guest"), owner.id
+    )
+    assert _check(dependency, db, own, owner).id == own.id
+
+
+@pytest.mark.parametrize("role", list(UserRole))
+@pytest.mark.parametrize("dependency", [editable_booking, deletable_booking])
+def test_other_users_booking_is_forbidden(db, booking, role, dependency):
+    other = make_user(db, 3001, role=role)
+    with pytest.raises(HTTPException) as error:
+        _check(dependency, db, booking, other)
+    assert error.value.status_code == 403
+
+
+@pytest.mark.parametrize("dependency", [editable_booking, deletable_booking])
+def test_is_admin_can_change_any_booking(db, booking, dependency):
+    admin = make_user(db, 4001, role=UserRole.OPERATOR, is_admin=True)
+    assert _check(dependency, db, booking, admin).id == booking.id
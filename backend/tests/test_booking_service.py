@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.models.booking import Booking, BOOKING_NO_OVERLAP_CONSTRAINT
+from app.models.history import HistoryLog
+from app.schemas.booking import BookingCreate
+from app.services.booking_service import BookingService, BookingConflictError
+from app.services.history_service import HistoryService
+
+from conftest import day
+
+
+def _booking(room, start, end):
+    return BookingCreate(room_id=room.id, start_date=day(start), end_date=day(end), guest_name="Guest")
+
+
+def test_create_booking_logs_history_in_same_transaction(db, rooms, operator):
+    def log(new_booking):
+        HistoryService.log_action(db, operator.id, "booking", new_booking.id, "create")
+
+    created = BookingService.create_booking(db, _booking(rooms[0], 1, 3), operator.id, before_commit=log)
+
+    entry = db.query(HistoryLog).one()
+    assert entry.entity_id == created.id
+
+
+def test_overlap_on_flush_becomes_conflict(db, rooms, operator, monkeypatch):
+    """В PostgreSQL EXCLUDE-ограничение срабатывает на flush перед before_commit"""
+    def failing_flush(*args, **kwargs):
+        raise IntegrityError("INSERT INTO bookings", {}, Exception(BOOKING_NO_OVERLAP_CONSTRAINT))
+
+    monkeypatch.setattr(db, "flush", failing_flush)
+    hook_calls = []
+
+    with pytest.raises(BookingConflictError):
+        BookingService.create_booking(
+            db, _booking(rooms[0], 1, 3), operator.id, before_commit=hook_calls.append
+        )
+
+    monkeypatch.undo()
+    assert hook_calls == []
+    assert db.query(Booking).count() == 0
+    assert db.query(HistoryLog).count() == 0
+
+
+def test_other_integrity_errors_on_flush_are_not_conflicts(db, rooms, operator, monkeypatch):
+    def failing_flush(*args, **kwargs):
+        raise IntegrityError("INSERT INTO bookings", {}, Exception("NOT NULL constraint failed"))
+
+    monkeypatch.setattr(db, "flush", failing_flush)
+    with pytest.raises(IntegrityError):
+        BookingService.create_booking(db, _booking(rooms[0], 1, 3), operator.id, before_commit=lambda b: None)
@@ -0,0 +1,28 @@
+import asyncio
+from datetime import date
+
+from app.models.notification_outbox import OutboxMessage
+from app.services.notification_service import notification_service
+from app.services.recipient_registry import recipient_registry
+
+from conftest import make_user
+
+
+def test_daily_report_is_queued_once_per_day(db, rooms):
+    make_user(db, 5001, is_admin=True)
+    make_user(db, 5002, is_admin=True)
+    recipient_registry.invalidate()
+    report_day = date(2026, 10, 17)
+
+    first = asyncio.run(notification_service.send_daily_report(db, report_day))
+    # Тот же запуск в другом воркере или реплике
+    second = asyncio.run(notification_service.send_daily_report(db, report_day))
+    next_day = asyncio.run(notification_service.send_daily_report(db, date(2026, 10, 18)))
+
+    assert "skipped" not in first and "skipped" not in next_day
+    assert second["skipped"] == "already queued"
+    keys = sorted(key for (key,) in db.query(OutboxMessage.dedup_key))
+    assert keys == [
+        "daily_report:2026-10-17:1:5001", "daily_report:2026-10-17:1:5002",
+        "daily_report:2026-10-18:1:5001", "daily_report:2026-10-18:1:5002",
+    ]
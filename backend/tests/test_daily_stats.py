@@ -0,0 +1,35 @@
+from app.models.daily_stats import DailyRoomStat
+from app.schemas.booking import BookingCreate, BookingUpdate
+from app.services.booking_service import BookingService
+from app.services.daily_stats_service import DailyStatsService
+
+from conftest import day
+
+
+def _revenue(db):
+    db.expire_all()
+    return {
+        (stat.date, stat.room_id): stat.revenue
+        for stat in db.query(DailyRoomStat) if stat.revenue or stat.occupied
+    }
+
+
+def test_room_price_change_does_not_drift_revenue(db, rooms, operator):
+    room = rooms[0]
+    booking = BookingService.create_booking(
+        db, BookingCreate(room_id=room.id, start_date=day(1), end_date=day(4), guest_name="Guest"), operator.id
+    )
+    assert booking.price_per_night == 500000
+
+    room.price_per_night = 900000
+    db.commit()
+    BookingService.update_booking(db, booking.id, BookingUpdate(start_date=day(2), end_date=day(4)))
+
+    # Бронь остаётся в выручке по своей цене, без остатка от прежних дат
+    assert _revenue(db) == {(day(2), room.id): 500000, (day(3), room.id): 500000}
+    incremental = _revenue(db)
+    DailyStatsService.rebuild(db)
+    assert _revenue(db) == incremental
+
+    BookingService.delete_booking(db, booking.id)
+    assert _revenue(db) == {}
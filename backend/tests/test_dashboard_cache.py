@@ -0,0 +1,21 @@
+from app.services.analytics_service import AnalyticsService
+from app.services.dashboard_cache import DashboardCache
+
+
+def test_stats_computed_during_invalidation_are_not_cached(db, monkeypatch):
+    cache = DashboardCache(ttl_seconds=60)
+    computed = []
+
+    def get_dashboard_stats(session):
+        computed.append(len(computed))
+        if len(computed) == 1:
+            # Бронь изменилась, пока снимок считался
+            cache.invalidate()
+        return {"version": computed[-1]}
+
+    monkeypatch.setattr(AnalyticsService, "get_dashboard_stats", staticmethod(get_dashboard_stats))
+
+    assert cache.get_stats(db) == {"version": 0}
+    assert cache.get_stats(db) == {"version": 1}
+    assert cache.get_stats(db) == {"version": 1}
+    assert len(computed) == 2
@@ -0,0 +1,75 @@
+import os
+import time
+from concurrent.futures import Future
+
+from app.services.export_jobs import ExportJobManager, ABANDONED_JOB_SECONDS, _read_state, _write_state
+from app.services.export_service import ExportFormat
+
+
+def _job(jobs_dir, job_id, status, files, age):
+    _write_state(jobs_dir, {"id": job_id, "status": status, "format": "csv"})
+    paths = [os.path.join(jobs_dir, f"{job_id}.json")]
+    for name in files:
+        path = os.path.join(jobs_dir, name)
+        with open(path, "wb") as f:
+            f.write(b"data")
+        paths.append(path)
+    past = time.time() - age
+    for path in paths:
+        os.utime(path, (past, past))
+
+
+def test_cleanup_skips_running_jobs(tmp_path):
+    jobs_dir = str(tmp_path)
+    manager = ExportJobManager(jobs_dir=jobs_dir, max_workers=1, ttl_seconds=60)
+    _job(jobs_dir, "running", "running", ["running.csv.part"], age=120)
+    _job(jobs_dir, "queued", "queued", [], age=120)
+    _job(jobs_dir, "done", "done", ["done.csv"], age=120)
+    _job(jobs_dir, "fresh", "done", ["fresh.csv"], age=0)
+
+    assert manager.cleanup_expired() == 2
+    assert sorted(os.listdir(jobs_dir)) == [
+        "fresh.csv", "fresh.json", "queued.json", "running.csv.part", "running.json"
+    ]
+
+
+def test_cleanup_removes_abandoned_jobs(tmp_path):
+    jobs_dir = str(tmp_path)
+    manager = ExportJobManager(jobs_dir=jobs_dir, max_workers=1, ttl_seconds=60)
+    _job(jobs_dir, "stuck", "running", ["stuck.csv.part"], age=ABANDONED_JOB_SECONDS + 60)
+
+    assert manager.cleanup_expired() == 2
+    assert os.listdir(jobs_dir) == []
+
+
+class _QueuedExecutor:
+    """Пул, в котором задачи ещё ждут свободного процесса"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        if cancel_futures:
+            for future in self.futures:
+                future.cancel()
+
+
+def test_shutdown_fails_jobs_that_never_started(tmp_path):
+    jobs_dir = str(tmp_path)
+    manager = ExportJobManager(jobs_dir=jobs_dir, max_workers=1, ttl_seconds=60)
+    executor = _QueuedExecutor()
+    manager._executor = executor
+    started = manager.submit("rooms", ExportFormat.csv, {}, user_id=1)
+    queued = manager.submit("rooms", ExportFormat.csv, {}, user_id=1)
+    executor.futures[0].set_running_or_notify_cancel()
+
+    manager.shutdown()
+
+    assert _read_state(jobs_dir, started["id"])["status"] == "queued"
+    assert _read_state(jobs_dir, queued["id"])["status"] == "failed"
+    assert manager._pending == {started["id"]: executor.futures[0]}
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+
+
+def _upgrade(url):
+    config = Config(str(Path(__file__).parent.parent / "alembic.ini"))
+    config.set_main_option("script_location", str(Path(__file__).parent.parent / "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+
+def test_upgrade_head_on_empty_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    _upgrade(url)
+
+    engine = create_engine(url)
+    try:
+        inspector = inspect(engine)
+        assert set(Base.metadata.tables) <= set(inspector.get_table_names())
+        for name, table in Base.metadata.tables.items():
+            columns = {column["name"] for column in inspector.get_columns(name)}
+            assert set(table.columns.keys()) <= columns, name
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT version FROM bookings_version WHERE id = 1")).scalar() == 0
+    finally:
+        engine.dispose()
+
+
+def test_upgrade_head_over_create_all(tmp_path):
+    """Базы, созданные через create_all до появления миграций, поднимаются до head"""
+    url = f"sqlite:///{tmp_path / 'existing.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    _upgrade(url)
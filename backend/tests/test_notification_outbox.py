@@ -0,0 +1,78 @@
+import asyncio
+import json
+from datetime import datetime
+
+import httpx
+import pytest
+
+from app.models.notification_outbox import OutboxMessage
+from app.services import notification_outbox as outbox_module
+from app.services.notification_outbox import NotificationOutboxWorker
+from app.services.notification_service import NotificationService
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """Фейковый Bot API: ответ на каждый чат задаёт тест"""
+    responses = {}
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        chat_id = json.loads(request.content)["chat_id"]
+        requests.append(chat_id)
+        respond = responses[chat_id]
+        return await respond() if asyncio.iscoroutinefunction(respond) else respond()
+
+    service = NotificationService(
+        bot_token="test-token", api_url="https://bot.test", max_retries=3, transport=httpx.MockTransport(handler)
+    )
+    monkeypatch.setattr(outbox_module, "notification_service", service)
+    yield responses, requests
+    asyncio.run(service.close())
+
+
+def _queue(db, *chat_ids):
+    db.add_all(OutboxMessage(event="booking_created", chat_id=chat_id, text="text") for chat_id in chat_ids)
+    db.commit()
+
+
+def _messages(db):
+    db.expire_all()
+    return {message.chat_id: message for message in db.query(OutboxMessage)}
+
+
+def test_outbox_makes_one_attempt_per_claim(db, telegram):
+    responses, requests = telegram
+    responses[1] = lambda: httpx.Response(200, json={"ok": True})
+    responses[2] = lambda: httpx.Response(500, json={"ok": False})
+    responses[3] = lambda: httpx.Response(403, json={"ok": False, "description": "bot was blocked by the user"})
+    responses[4] = lambda: httpx.Response(400, json={"ok": False, "description": "chat not found"})
+    _queue(db, 1, 2, 3, 4)
+
+    assert asyncio.run(NotificationOutboxWorker().drain_once()) == 4
+
+    assert sorted(requests) == [1, 2, 3, 4]
+    messages = _messages(db)
+    assert messages[1].status == "sent"
+    assert messages[2].status == "pending" and messages[2].next_attempt_at > datetime.utcnow()
+    # Повтор не поможет — в dead сразу, не дожидаясь max_attempts
+    assert messages[3].status == "dead" and "blocked" in messages[3].last_error
+    assert messages[4].status == "dead" and messages[4].attempts == 1
+
+
+def test_outbox_send_timeout_is_below_lease(db, telegram):
+    responses, requests = telegram
+
+    async def slow():
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={"ok": True})
+
+    responses[1] = slow
+    _queue(db, 1)
+    worker = NotificationOutboxWorker(lease_seconds=120, send_timeout_seconds=0.05)
+
+    assert asyncio.run(worker.drain_once()) == 1
+
+    message = _messages(db)[1]
+    assert message.status == "pending" and message.attempts == 1
+    assert message.last_error.startswith("no response")
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services.notification_service import NotificationService
+
+
+def _service(handler, **options) -> NotificationService:
+    return NotificationService(
+        bot_token="test-token", api_url="https://bot.test", transport=httpx.MockTransport(handler), **options
+    )
+
+
+def test_send_many_respects_concurrency_limit():
+    in_flight = 0
+    peak = 0
+    chats = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        chats.append(json.loads(request.content)["chat_id"])
+        return httpx.Response(200, json={"ok": True})
+
+    async def scenario():
+        service = _service(handler, max_concurrency=3)
+        try:
+            return await service.send_many(list(range(20)) + [0, 1], "report")
+        finally:
+            await service.close()
+
+    assert asyncio.run(scenario()) == 20
+    assert sorted(chats) == list(range(20))
+    assert peak == 3
+
+
+def test_send_message_waits_retry_after_on_429(monkeypatch):
+    requests = []
+    delays = []
+    sleep = asyncio.sleep
+
+    async def recording_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", recording_sleep)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if len(requests) == 1:
+            return httpx.Response(429, json={"ok": False, "parameters": {"retry_after": 7}})
+        return httpx.Response(200, json={"ok": True})
+
+    async def scenario():
+        service = _service(handler, max_retries=3)
+        try:
+            return await service.send_message(42, "text")
+        finally:
+            await service.close()
+
+    assert asyncio.run(scenario()) is True
+    assert requests == ["/bottest-token/sendMessage"] * 2
+    assert delays == [7.0]
+
+
+def test_send_message_does_not_retry_client_errors():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(403, json={"ok": False, "description": "bot was blocked by the user"})
+
+    async def scenario():
+        service = _service(handler, max_retries=3)
+        try:
+            return await service.send_message(42, "text")
+        finally:
+            await service.close()
+
+    assert asyncio.run(scenario()) is False
+    assert len(requests) == 1
@@ -0,0 +1,74 @@
+import asyncio
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.api.bookings import get_bookings
+from app.database import engine, SessionLocal
+from app.models.booking import Booking
+from app.schemas.booking import Booking as BookingSchema
+from app.services.export_service import ExportService
+
+from conftest import day, make_user
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def many_bookings(db, rooms, operator):
+    other = make_user(db, 1002)
+    db.add_all(
+        Booking(
+            room_id=room.id, start_date=day(week * 7), end_date=day(week * 7 + 3),
+            guest_name="Guest", created_by=(operator if week % 2 else other).id
+        )
+        for room in rooms for week in range(6)
+    )
+    db.commit()
+    return db.query(Booking).count()
+
+
+@pytest.fixture
+def fresh_session(db):
+    # Новая сессия с пустой identity map: иначе ленивые загрузки брали бы комнаты оттуда без SQL
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_booking_export_is_one_query(fresh_session, many_bookings):
+    with count_statements() as statements:
+        rows = list(ExportService.iter_booking_rows(fresh_session))
+
+    assert len(rows) == many_bookings
+    assert all(row[1] and row[7] for row in rows)
+    assert len(statements) == 1
+
+
+def test_booking_list_loads_rooms_in_one_query(fresh_session, many_bookings):
+    with count_statements() as statements:
+        bookings = asyncio.run(get_bookings(
+            skip=0, limit=100, room_id=None, start_date=None, end_date=None,
+            db=fresh_session, current_user=None
+        ))
+        response = [BookingSchema.model_validate(booking) for booking in bookings]
+
+    assert len(response) == many_bookings
+    assert all(item.room is not None for item in response)
+    # Брони и одна selectin-выборка комнат, независимо от числа броней
+    assert len(statements) == 2
@@ -0,0 +1,5 @@
+from app.query_plans import check_query_plans
+
+
+def test_key_queries_use_indexes(db, rooms, operator):
+    assert check_query_plans() == 0
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.user import Permission, User, UserRole
+from app.services.auth_cache import UserPrincipal
+
+# Таблица из User.has_permission до перехода на битовые маски
+LEGACY_PERMISSIONS = {
+    UserRole.SUPER_ADMIN: [
+        "view_all", "create_booking", "edit_booking", "delete_booking",
+        "view_analytics", "manage_users", "system_settings", "export_data"
+    ],
+    UserRole.ADMIN: [
+        "view_all", "create_booking", "edit_booking", "delete_booking",
+        "view_analytics", "manage_users", "export_data"
+    ],
+    UserRole.MANAGER: [
+        "view_all", "create_booking", "edit_booking", "delete_own_booking",
+        "view_analytics", "export_data"
+    ],
+    UserRole.OPERATOR: [
+        "view_all", "create_booking", "edit_own_booking"
+    ],
+    UserRole.USER: [
+        "view_own", "create_booking"
+    ]
+}
+
+
+def _legacy_can_delete(user, booking):
+    if user.role in [UserRole.SUPER_ADMIN, UserRole.ADMIN]:
+        return True
+    elif user.role == UserRole.MANAGER:
+        return booking.created_by == user.id
+    return False
+
+
+def _legacy_can_edit(user, booking):
+    if user.role in [UserRole.SUPER_ADMIN, UserRole.ADMIN, UserRole.MANAGER]:
+        return True
+    elif user.role == UserRole.OPERATOR:
+        return booking.created_by == user.id
+    return False
+
+
+def _user(role, is_admin):
+    return User(id=7, telegram_id=7, first_name="User", role=role, is_admin=is_admin, is_active=True)
+
+
+@pytest.mark.parametrize("is_admin", [False, True])
+@pytest.mark.parametrize("role", list(UserRole))
+def test_masks_match_legacy_table(role, is_admin):
+    user = _user(role, is_admin)
+    principal = UserPrincipal.from_user(user)
+    for permission in Permission:
+        expected = permission.name.lower() in LEGACY_PERMISSIONS[role]
+        assert user.has_permission(permission.name.lower()) is expected, permission
+        assert user.has_permission(permission) is expected, permission
+        assert principal.has_permission(permission) is expected, permission
+
+
+@pytest.mark.parametrize("is_admin", [False, True])
+@pytest.mark.parametrize("role", list(UserRole))
+@pytest.mark.parametrize("created_by", [7, 8])
+def test_booking_checks_match_legacy_methods(role, is_admin, created_by):
+    user = _user(role, is_admin)
+    booking = SimpleNamespace(created_by=created_by)
+    assert user.can_edit_booking(booking) is _legacy_can_edit(user, booking)
+    assert user.can_delete_booking(booking) is _legacy_can_delete(user, booking)
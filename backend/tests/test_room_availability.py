@@ -0,0 +1,32 @@
+import random
+
+from app.models.booking import Booking
+from app.services.availability_index import availability_index
+from app.services.booking_service import BookingService
+from app.services.room_service import RoomService
+
+from conftest import day
+
+
+def test_batched_availability_matches_per_room_checks(db, rooms, operator):
+    rng = random.Random(3)
+    db.add_all(
+        Booking(room_id=room.id, start_date=day(start), end_date=day(start + rng.randint(1, 5)), created_by=operator.id)
+        for room in rooms for start in rng.sample(range(0, 60), 8)
+    )
+    db.commit()
+    availability_index.load(db)
+
+    # Случайные периоды и периоды, касающиеся границ существующих броней
+    periods = [(start, start + rng.randint(1, 7)) for start in (rng.randint(0, 65) for _ in range(150))]
+    for booking in db.query(Booking).limit(20):
+        offset = (booking.start_date - day(0)).days
+        length = (booking.end_date - booking.start_date).days
+        periods += [(offset - 2, offset), (offset + length, offset + length + 2), (offset, offset + length)]
+
+    for start, end in periods:
+        batched = [room["id"] for room in RoomService.get_available_rooms(db, day(start), day(end))]
+        # Прежний путь: отдельная проверка каждой комнаты
+        per_room = [room.id for room in rooms if BookingService.check_availability(db, room.id, day(start), day(end))]
+        per_room_sql = [room.id for room in rooms if not BookingService.get_conflicts(db, room.id, day(start), day(end))]
+        assert batched == per_room == per_room_sql, (start, end)